@@ -0,0 +1,7 @@
+"""
+Automate ISODISTORT - a python interface to ISODISTORT method 4 (mode decomposition) and FINDSYM.
+
+Importing the package has no side effects and does not load a browser: the Selenium backend is
+imported only when a session with backend='selenium' is started. Run the command line interface
+with python -m automate_isodistort <decompose|scale|symmetrise|inspect> ...
+"""
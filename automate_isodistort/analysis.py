@@ -0,0 +1,166 @@
+import os
+import csv
+import sys
+import argparse
+from pathlib import Path
+import numpy as np # type: ignore
+import yaml # type: ignore
+from .mode_store import read_store
+
+
+"""
+Array based analysis of mode amplitudes of many structures.
+
+Any number of results (read_mode_amplitudes() dicts, mode amplitude YAML files, batch files keyed
+by structure, or mode amplitude stores) are loaded into one table:
+    names     one name per structure (row)
+    columns   (irrep, component) of every column, in order of first appearance
+    matrix    (n_structures x n_components) amplitudes, NaN where a structure lacks a component
+All further analysis works on whole arrays, with irreps identified by an index per column.
+"""
+
+def is_results(data) -> bool:
+    '''True for a single read_mode_amplitudes() results dict'''
+    return isinstance(data, dict) and bool(data) and all(isinstance(v, dict) and 'components' in v for v in data.values())
+
+def amplitude_table(series : dict[str,dict]) -> tuple[list[str], list[tuple[str,str]], np.ndarray]:
+    '''aligned (names, columns, matrix) of results dicts keyed by structure name'''
+    index : dict = {}
+    for results in series.values():
+        for irrep, entry in results.items():
+            for component in entry['components'].keys():
+                index.setdefault((irrep, component), len(index))
+    matrix = np.full((len(series), len(index)), np.nan)
+    for row, results in enumerate(series.values()):
+        keys = [(irrep, component) for irrep, entry in results.items() for component in entry['components'].keys()]
+        values = [value for entry in results.values() for value in entry['components'].values()]
+        matrix[row, [index[key] for key in keys]] = values
+    return list(series.keys()), list(index.keys()), matrix
+
+def read_results_file(path : str) -> dict[str,dict]:
+    '''results dicts keyed by structure name from a mode amplitude YAML file (single structure or batch)'''
+    data = yaml.safe_load(Path(path).read_text())
+    if is_results(data):
+        return {path : data}
+    if isinstance(data, dict) and all(is_results(v) for v in data.values()):
+        return data
+    raise ValueError(f'{path} does not contain mode amplitudes.')
+
+def concatenate(tables : list[tuple[list[str], list[tuple[str,str]], np.ndarray]]) -> tuple[list[str], list[tuple[str,str]], np.ndarray]:
+    '''stacks the rows of several tables, aligned to the union of their columns'''
+    columns : dict = {}
+    for _, table_columns, _ in tables:
+        for column in table_columns:
+            columns.setdefault(tuple(column), len(columns))
+    names : list[str] = []
+    matrix = np.full((sum(len(t[0]) for t in tables), len(columns)), np.nan)
+    row = 0
+    for table_names, table_columns, table_matrix in tables:
+        matrix[row:row+len(table_names), [columns[tuple(c)] for c in table_columns]] = table_matrix
+        names += table_names
+        row += len(table_names)
+    return names, list(columns.keys()), matrix
+
+def load_results(paths : list[str]) -> tuple[list[str], list[tuple[str,str]], np.ndarray]:
+    '''one aligned table of all structures in the given YAML files and store directories'''
+    tables : list = []
+    for path in paths:
+        if os.path.isdir(path):
+            names, columns, matrix = read_store(path)
+            tables.append((names, [tuple(c) for c in columns], matrix))
+        else:
+            tables.append(amplitude_table(read_results_file(path)))
+    return concatenate(tables)
+
+def irrep_index(columns : list[tuple[str,str]]) -> tuple[list[str], np.ndarray]:
+    '''irreps in order of first appearance and the irrep index of every column'''
+    irreps = list(dict.fromkeys(irrep for irrep, _ in columns))
+    position = {irrep : k for k, irrep in enumerate(irreps)}
+    return irreps, np.array([position[irrep] for irrep, _ in columns], dtype=int)
+
+def is_strain(component : str) -> bool:
+    '''strain components are dimensionless, displacive ones in Angstrom'''
+    return 'strain' in component
+
+def amplitude_groups(columns : list[tuple[str,str]]) -> tuple[list[str], np.ndarray]:
+    '''names of the displacive and strain parts of every irrep ('<irrep>' and '<irrep> strain') and the group index of every column'''
+    groups = list(dict.fromkeys(f'{irrep} strain' if is_strain(component) else irrep for irrep, component in columns))
+    position = {group : k for k, group in enumerate(groups)}
+    return groups, np.array([position[f'{irrep} strain' if is_strain(component) else irrep] for irrep, component in columns], dtype=int)
+
+def irrep_totals(columns : list[tuple[str,str]], matrix : np.ndarray) -> tuple[list[str], np.ndarray]:
+    '''displacive and strain amplitudes of every irrep (n_structures x n_groups), sqrt(sum of squared components), NaN if a structure has no components of a group
+    the displacive (Angstrom) and strain (dimensionless) components are summed separately, as in the ISODISTORT output, see amplitude_groups()
+    '''
+    groups, index = amplitude_groups(columns)
+    membership = np.zeros((len(columns), len(groups)))
+    membership[np.arange(len(columns)), index] = 1
+    present = ~np.isnan(matrix)
+    squares = np.where(present, matrix, 0.0)**2 @ membership
+    counts = present @ membership
+    return groups, np.where(counts > 0, np.sqrt(squares), np.nan)
+
+def opd_directions(columns : list[tuple[str,str]], matrix : np.ndarray) -> np.ndarray:
+    '''components divided by the displacive or strain amplitude of their irrep, i.e. the normalised order parameter directions (NaN for zero amplitudes)'''
+    _, index = amplitude_groups(columns)
+    _, totals = irrep_totals(columns, matrix)
+    scale = totals[:, index]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(scale > 0, matrix / scale, np.nan)
+
+def align_columns(table : tuple, columns : list[tuple[str,str]]) -> np.ndarray:
+    '''matrix of a table rearranged to the given columns, NaN for columns the table lacks'''
+    _, table_columns, table_matrix = table
+    position = {tuple(c) : k for k, c in enumerate(table_columns)}
+    aligned = np.full((len(table_matrix), len(columns)), np.nan)
+    found = [k for k, c in enumerate(columns) if tuple(c) in position]
+    aligned[:, found] = table_matrix[:, [position[tuple(columns[k])] for k in found]]
+    return aligned
+
+def series_difference(a : tuple, b : tuple, by_name : bool = False) -> tuple[list[str], list[tuple[str,str]], np.ndarray]:
+    '''b - a for two tables, on the union of their columns
+    rows are matched by position (e.g. two scans with the same steps), or by structure name if by_name
+    '''
+    _, columns, _ = concatenate([a, b])
+    matrix_a = align_columns(a, columns)
+    matrix_b = align_columns(b, columns)
+    if by_name:
+        rows_b = {name : k for k, name in enumerate(b[0])}
+        names = [name for name in a[0] if name in rows_b]
+        return names, columns, matrix_b[[rows_b[n] for n in names]] - matrix_a[[a[0].index(n) for n in names]]
+    n = min(len(matrix_a), len(matrix_b))
+    return [f'{x} -> {y}' for x, y in zip(a[0][:n], b[0][:n])], columns, matrix_b[:n] - matrix_a[:n]
+
+def write_csv(out, names : list[str], headers : list[str], values : np.ndarray) -> None:
+    writer = csv.writer(out)
+    writer.writerow(['structure'] + headers)
+    for name, row in zip(names, values):
+        writer.writerow([name] + ['' if np.isnan(v) else f'{v:.6g}' for v in row])
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='analysis',
+        description='Tabulate irrep amplitudes, order parameter directions or mode amplitudes of many structures as CSV',
+    )
+    parser.add_argument('paths', nargs='+', type=str, help='mode amplitude YAML files and/or store directories')
+    parser.add_argument('--quantity', choices=['totals', 'components', 'directions'], default='totals')
+    parser.add_argument('--minus', nargs='+', type=str, default=None, help='subtract this series (matched by position, or by name with --by-name)')
+    parser.add_argument('--by-name', action='store_true')
+    parser.add_argument('--output', type=str, default=None, help='CSV file (default: standard output)')
+    args = parser.parse_args()
+
+    names, columns, matrix = load_results(args.paths)
+    if args.minus is not None:
+        names, columns, matrix = series_difference(load_results(args.minus), (names, columns, matrix), args.by_name)
+    if args.quantity == 'totals':
+        headers, values = irrep_totals(columns, matrix)
+    elif args.quantity == 'directions':
+        headers, values = [f'{i} {c}' for i, c in columns], opd_directions(columns, matrix)
+    else:
+        headers, values = [f'{i} {c}' for i, c in columns], matrix
+    if args.output is None:
+        write_csv(sys.stdout, names, headers, values)
+    else:
+        with open(args.output, 'w', newline='') as ff:
+            write_csv(ff, names, headers, values)
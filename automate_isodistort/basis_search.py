@@ -0,0 +1,91 @@
+import argparse
+import numpy as np # type: ignore
+from .cif_tools import read_cif, cell_parameters, lattice_vectors
+
+
+"""
+Search for the basis transformation matrix P between a parent and a child structure.
+
+All integer matrices with entries between -max_entry and max_entry are candidates. Their rows
+are the child basis vectors in terms of the parent basis, so the child metric tensor should equal
+P G P^T with the parent metric tensor G. The products r_i G r_j^T of all candidate rows are
+computed once, and every candidate (i, j, k) is scored from these by broadcasting.
+"""
+
+MAX_ENTRY : int = 2
+
+def metric_tensor(cell : np.ndarray) -> np.ndarray:
+    vectors = lattice_vectors(cell)
+    return vectors @ vectors.T
+
+def candidate_rows(max_entry : int = MAX_ENTRY) -> np.ndarray:
+    '''all non-zero integer vectors with entries between -max_entry and max_entry'''
+    values = np.arange(-max_entry, max_entry + 1)
+    rows = np.array(np.meshgrid(values, values, values, indexing='ij')).reshape(3, -1).T
+    return rows[np.any(rows != 0, axis=1)]
+
+def score_candidates(parent_cell : np.ndarray, child_cell : np.ndarray, max_entry : int = MAX_ENTRY, index : int | None = None, chunk_size : int = 16) -> tuple[np.ndarray, np.ndarray]:
+    '''indices (n x 3) into candidate_rows() of all right-handed candidates with det(P) == index and their scores
+    the score is the relative deviation between P G P^T and the child metric tensor
+    '''
+    rows = candidate_rows(max_entry)
+    parent_metric = metric_tensor(parent_cell)
+    child_metric = metric_tensor(child_cell)
+    if index is None: # supercell index from the cell volumes
+        index = max(1, int(round(np.sqrt(np.linalg.det(child_metric) / np.linalg.det(parent_metric)))))
+    products = rows @ parent_metric @ rows.T # r_i G r_j^T for all pairs of rows
+    diagonal = np.diag(products)
+    cross = np.cross(rows[:, None, :], rows[None, :, :]) # r_j x r_k
+    norm = np.linalg.norm(child_metric)
+    n = len(rows)
+    found : list = []
+    scores : list = []
+    for start in range(0, n, chunk_size): # first rows in chunks to keep memory bounded
+        i = np.arange(start, min(start + chunk_size, n))
+        det = np.einsum('ia,jka->ijk', rows[i], cross)
+        deviation = (
+            (diagonal[i][:, None, None] - child_metric[0,0])**2
+            + (diagonal[None, :, None] - child_metric[1,1])**2
+            + (diagonal[None, None, :] - child_metric[2,2])**2
+            + 2 * (products[i][:, :, None] - child_metric[0,1])**2
+            + 2 * (products[i][:, None, :] - child_metric[0,2])**2
+            + 2 * (products[None, :, :] - child_metric[1,2])**2
+            )
+        ii, jj, kk = np.nonzero(det == index)
+        found.append(np.stack([i[ii], jj, kk], axis=1))
+        scores.append(np.sqrt(deviation[ii, jj, kk]) / norm)
+    return np.concatenate(found), np.concatenate(scores)
+
+def find_basis(parent_struct : str, child_struct : str, max_entry : int = MAX_ENTRY, top : int = 10) -> list[tuple[np.ndarray, float]]:
+    '''ranked (matrix, score) candidates for BASIS_TRANSFORM, best first
+    candidates with equal scores are ordered by simplicity (fewest non-zero entries, closest to the identity)
+    '''
+    parent_cell = cell_parameters(read_cif(parent_struct))
+    child_cell = cell_parameters(read_cif(child_struct))
+    rows = candidate_rows(max_entry)
+    found, scores = score_candidates(parent_cell, child_cell, max_entry)
+    if len(found) == 0:
+        return []
+    matrices = rows[found] # (n, 3, 3)
+    nonzero = np.count_nonzero(matrices, axis=(1,2))
+    distance = np.abs(matrices - np.eye(3, dtype=int)).sum(axis=(1,2))
+    order = np.lexsort((distance, nonzero, np.round(scores, 6)))[:top]
+    return [(matrices[k], float(scores[k])) for k in order]
+
+def print_candidates(candidates : list[tuple[np.ndarray, float]]) -> None:
+    for matrix, score in candidates:
+        print(f"{' '.join(str(x) for x in matrix.flatten()):>30}   deviation {score:.2%}")
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='basis_search',
+        description='Find candidates for the basis transformation matrix between a parent and a child structure',
+    )
+    parser.add_argument('parent', type=str, help='parent structure CIF')
+    parser.add_argument('child', type=str, help='child structure CIF')
+    parser.add_argument('--max-entry', type=int, default=MAX_ENTRY, help='largest absolute matrix element')
+    parser.add_argument('--top', type=int, default=10, help='number of candidates to list')
+    args = parser.parse_args()
+
+    print_candidates(find_basis(args.parent, args.child, args.max_entry, args.top))
@@ -0,0 +1,152 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import threading
+import tracemalloc
+import contextlib
+import numpy as np # type: ignore
+from . import decompose
+from .mock_server import serve_synthetic
+from .mode_scaling import read_mode_basis, generate_scaled_structures_local, scan_points
+from .scan_output import ScanOutput
+from .timing import span, set_trace_file, run_records, summarise
+
+
+"""
+Benchmarks of the automation against the synthetic mock server (see mock_server.py).
+
+Each scenario (single structure, batch, parallel batch, scaled structures and, with the Selenium
+backend, FINDSYM symmetrisation) is run against a
+local server with a configurable latency and number of modes, and the throughput in structures
+per minute, the time spent in every stage and the peak Python memory are reported. The numbers
+are repeatable, so they can be compared before and after changes to the hot paths.
+"""
+
+SCENARIOS : list[str] = ['single', 'batch', 'parallel', 'scaled', 'symmetrise']
+
+def write_structures(directory : str, num_children : int) -> tuple[str, list[str]]:
+    '''parent and child CIF's for the mock server, which only looks at the contents of the child files'''
+    parent = os.path.join(directory, 'parent.cif')
+    with open(parent, 'w') as ff:
+        ff.write('data_parent\n_cell_length_a 10\n')
+    children : list[str] = []
+    for i in range(num_children):
+        child = os.path.join(directory, f'child_{i:04d}.cif')
+        with open(child, 'w') as ff:
+            ff.write(f'data_child_{i}\n_cell_length_a 10\n# frame {i}\n')
+        children.append(child)
+    return parent, children
+
+def run_scenario(name : str, function, num_structures : int, trace_file : str, verbose : bool = False) -> dict:
+    '''runs one scenario and collects throughput, stage timings and peak memory'''
+    if os.path.isfile(trace_file):
+        os.remove(trace_file)
+    set_trace_file(trace_file)
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        function()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'scenario' : name,
+        'structures' : num_structures,
+        'seconds' : seconds,
+        'per_minute' : 60 * num_structures / seconds,
+        'peak_mb' : peak / 1e6,
+        'stages' : summarise(run_records()),
+    }
+
+def scaled_run(main_page : str, parent : str, child : str, backend : str, webdrv_path : str | None, destination : str, num_points : int) -> None:
+    '''decomposition of one structure, download of the mode definitions and local generation of the scaled structures'''
+    matrix = np.eye(3, dtype=int)
+    session = None
+    try: # same path as SCALEMODES_ENGINE : local in run_config
+        session = decompose.start_session(parent, main_page, webdrv_path, backend, download_dir=None)
+        basis_file, mode_amplitudes, box_labels = decompose.mode_basis_in_session(child, matrix, None, session, destination)
+    finally:
+        decompose.end_session(session)
+    irreps = list(mode_amplitudes.keys())
+    ranges = {irreps[0] : (0.0, 1.0, num_points)}
+    with ScanOutput(destination, list(ranges.keys()), mode_amplitudes, overwrite=True) as output, span('local_scaling'):
+        generate_scaled_structures_local(read_mode_basis(basis_file), box_labels, scan_points(ranges), output)
+    return None
+
+def print_results(results : list[dict]) -> None:
+    for r in results:
+        print(f"\n{r['scenario']}: {r['structures']} structures in {r['seconds']:.2f} s, {r['per_minute']:.1f} structures/min, peak memory {r['peak_mb']:.1f} MB")
+        print(f"    {'stage':<20}{'count':>7}{'total/s':>10}{'mean/s':>9}{'p50/s':>9}{'p90/s':>9}")
+        for stage, s in r['stages'].items():
+            print(f"    {stage:<20}{s['count']:>7}{s['total']:>10.2f}{s['mean']:>9.3f}{s['p50']:>9.3f}{s['p90']:>9.3f}")
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='benchmark',
+        description='Benchmark the mode decomposition and structure generation against a local mock ISODISTORT server',
+    )
+    parser.add_argument('--backend', choices=['http', 'selenium'], default='http')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--structures', type=int, default=20, help='number of child structures in the batch scenarios')
+    parser.add_argument('--points', type=int, default=1000, help='number of scaled structures in the scaled scenario')
+    parser.add_argument('--workers', type=int, default=2, help='number of sessions in the parallel scenario')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock server response latency in s')
+    parser.add_argument('--irreps', type=int, default=3, help='number of irreps on the distortion page')
+    parser.add_argument('--modes', type=int, default=12, help='number of displacive modes on the distortion page')
+    parser.add_argument('--webdriver-path', type=str, default=None)
+    parser.add_argument('--json', type=str, default=None, help='also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='show the output of the automation')
+    args = parser.parse_args()
+
+    server = serve_synthetic(0, latency=args.latency, num_irreps=args.irreps, num_modes=args.modes) # any free port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    main_page = f'http://127.0.0.1:{server.server_address[1]}/iso/isodistort.php'
+    workdir = tempfile.mkdtemp(prefix='isodistort_benchmark_')
+    trace_file = os.path.join(workdir, 'trace.jsonl')
+    parent, children = write_structures(workdir, args.structures)
+    matrix = np.eye(3, dtype=int)
+    print(f'Mock server: {args.irreps} irreps, {args.modes} modes, {args.latency} s latency; backend: {args.backend}')
+    if 'symmetrise' in args.scenarios and args.backend != 'selenium':
+        print('Skipping the symmetrise scenario, symmetrising only works with the selenium backend.')
+        args.scenarios = [scenario for scenario in args.scenarios if scenario != 'symmetrise']
+
+    results : list[dict] = []
+    try:
+        for scenario in args.scenarios:
+            if scenario == 'single':
+                function = lambda: decompose.decompose_with_retries(children[:1], parent, matrix, None, main_page, args.webdriver_path, args.backend, max_attempts=1)
+                count = 1
+            elif scenario == 'batch':
+                function = lambda: decompose.decompose_with_retries(children, parent, matrix, None, main_page, args.webdriver_path, args.backend, max_attempts=1)
+                count = len(children)
+            elif scenario == 'parallel':
+                function = lambda: decompose.decompose_parallel(children, parent, matrix, None, main_page, args.webdriver_path, args.workers, args.backend, stagger=0)
+                count = len(children)
+            elif scenario == 'symmetrise':
+                findsym_page = f'http://127.0.0.1:{server.server_address[1]}/iso/findsym.php'
+                from .findsym import symmetrise_files
+                function = lambda: symmetrise_files(children, args.webdriver_path, main_page=findsym_page, overwrite=True)
+                count = len(children)
+            else:
+                scaled_dir = os.path.join(workdir, 'scaled')
+                os.makedirs(scaled_dir, exist_ok=True)
+                function = lambda: scaled_run(main_page, parent, children[0], args.backend, args.webdriver_path, scaled_dir, args.points)
+                count = args.points
+            results.append(run_scenario(scenario, function, count, trace_file, args.verbose))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    maxrss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(f'\nPeak resident memory of a single process: {maxrss / 1e3:.1f} MB')
+    if args.json is not None:
+        with open(args.json, 'w') as ff:
+            json.dump({'settings' : vars(args), 'results' : results}, ff, indent=2)
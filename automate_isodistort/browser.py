@@ -0,0 +1,53 @@
+import os
+import shutil
+import atexit
+import tempfile
+from selenium import webdriver # type: ignore
+#from webdriver_manager.chrome import ChromeDriverManager
+#from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait # type: ignore
+from selenium.common.exceptions import WebDriverException # type: ignore
+from .timing import timed
+
+
+"""
+Chrome sessions for the ISODISTORT and FINDSYM browser backends (imported only when one of them is used).
+"""
+
+@timed('browser_start')
+def webdriver_setup(webdrv_win : bool, webdrv_path : str, download_dir : str | None = None):
+    '''helper function for setting up the webdriver, downloads go to download_dir (a new private temporary directory by default)'''
+    options = webdriver.ChromeOptions()
+    if download_dir is None: # private download directory, removed again when python exits
+        download_dir = tempfile.mkdtemp(prefix='isodistort_downloads_')
+        atexit.register(shutil.rmtree, download_dir, True)
+    download_dir = os.path.abspath(os.path.expanduser(download_dir))
+    os.makedirs(download_dir, exist_ok=True)
+    options.add_experimental_option("prefs", {
+        "download.default_directory" : download_dir,
+        "download.prompt_for_download" : False,
+        "download.directory_upgrade" : True,
+    })
+    if not webdrv_win:
+        options.add_argument("--headless=new") # don't open window
+    else:
+        print('opening remote window')
+        options.add_experimental_option("detach", True)  # Keep the window open
+        options.add_argument("--start-maximized")
+        options.add_argument("--remote-allow-origins=*")
+    driver = webdriver.Chrome(
+        #service=Service(ChromeDriverManager().install()), # optional: install Chrome driver if not present
+        #service=Service(webdrv_path), # optional: look for Chrome driver at specific location (uncomment if driver cannot be found)
+        options=options
+        )
+    driver.download_dir = download_dir # directory where files downloaded in this session end up
+    try: # allow downloads in headless mode
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior" : "allow", "downloadPath" : download_dir})
+    except WebDriverException:
+        pass
+    # Set up webdriver waiting function
+    wait = WebDriverWait(
+        driver, 
+        10 # default timeout
+        )
+    return driver, wait
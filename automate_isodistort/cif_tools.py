@@ -0,0 +1,183 @@
+import re
+from pathlib import Path
+import numpy as np # type: ignore
+
+
+"""
+Minimal CIF reading and writing (no external dependencies)
+"""
+
+def tokenize_cif(text : str) -> list[tuple[str,int,int]]:
+    '''splits CIF text into (token, start, end) triplets, handling quotes, comments and semicolon text fields'''
+    tokens : list = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in ' \t\r\n':
+            i += 1
+        elif c == '#': # comment until end of line
+            while i < n and text[i] != '\n':
+                i += 1
+        elif c == ';' and (i == 0 or text[i-1] == '\n'): # semicolon delimited text field
+            end = text.find('\n;', i+1)
+            end = n if end == -1 else end
+            tokens.append((text[i+1:end].strip('\r\n'), i, min(end+2, n)))
+            i = end + 2
+        elif c in '\'"':
+            j = i + 1
+            while j < n and not (text[j] == c and (j+1 == n or text[j+1] in ' \t\r\n')):
+                j += 1
+            tokens.append((text[i+1:j], i, j+1))
+            i = j + 1
+        else:
+            j = i
+            while j < n and text[j] not in ' \t\r\n':
+                j += 1
+            tokens.append((text[i:j], i, j))
+            i = j
+    return tokens
+
+def read_cif(source : str, block : int = 0) -> dict:
+    '''reads one data block of a CIF (file path or CIF text)
+    returns a dict with the single valued 'tags', the 'loops' (each a dict of columns) and the original 'text'
+    '''
+    return read_cif_blocks(source)[block]
+
+def read_cif_blocks(source : str) -> list[dict]:
+    '''reads all data blocks of a CIF (file path or CIF text)'''
+    text = source if '\n' in source else Path(source).read_text()
+    tokens = tokenize_cif(text)
+    blocks : list = []
+    cif : dict | None = None
+    i = 0
+    while i < len(tokens):
+        token, start, end = tokens[i]
+        if token.lower().startswith('data_'):
+            cif = {'name' : token[5:], 'tags' : {}, 'loops' : [], 'text' : text, 'span' : [start, len(text)]}
+            if blocks:
+                blocks[-1]['span'][1] = start
+            blocks.append(cif)
+            i += 1
+        elif cif is None:
+            i += 1
+        elif token.lower() == 'loop_':
+            columns : list = []
+            headers : list = []
+            i += 1
+            while i < len(tokens) and tokens[i][0].startswith('_'):
+                headers.append(tokens[i][0])
+                columns.append(tokens[i][0].lower())
+                i += 1
+            end = tokens[i-1][2]
+            values : list = []
+            while i < len(tokens):
+                value = tokens[i][0]
+                if value.startswith('_') or value.lower() in ['loop_'] or value.lower().startswith('data_'):
+                    break
+                values.append(value)
+                end = tokens[i][2]
+                i += 1
+            rows = [values[k:k+len(columns)] for k in range(0, len(values), len(columns))] if columns else []
+            cif['loops'].append({
+                'columns' : columns, # lower case, for look ups
+                'headers' : headers, # as written in the file
+                'rows' : rows,
+                'span' : (start, end), # position of the loop in the text, used for rewriting it
+                })
+        elif token.startswith('_') and i + 1 < len(tokens):
+            cif['tags'][token.lower()] = tokens[i+1][0]
+            i += 2
+        else:
+            i += 1
+    if not blocks:
+        raise ValueError('No data block found in CIF')
+    return blocks
+
+def cif_float(value : str) -> float:
+    '''converts a CIF number (possibly with standard uncertainty, e.g. 5.4321(3)) to float'''
+    value = value.split('(')[0]
+    if value in ['.', '?']:
+        return float('nan')
+    if '/' in value: # fractions as used in coordinate formulas
+        num, den = value.split('/')
+        return float(num) / float(den)
+    return float(value)
+
+def find_loop(cif : dict, tag : str) -> dict | None:
+    '''returns the loop containing the column tag'''
+    for loop in cif['loops']:
+        if tag.lower() in loop['columns']:
+            return loop
+    return None
+
+def loop_columns(cif : dict, tag : str) -> dict[str,list] | None:
+    '''returns the loop containing the column tag as a dict of columns'''
+    loop = find_loop(cif, tag)
+    if loop is None:
+        return None
+    return {name : [row[k] for row in loop['rows']] for k, name in enumerate(loop['columns'])}
+
+def cell_parameters(cif : dict) -> np.ndarray:
+    '''lattice parameters a, b, c, alpha, beta, gamma'''
+    names = ['_cell_length_a', '_cell_length_b', '_cell_length_c', '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma']
+    missing = [n for n in names if n not in cif['tags']]
+    if missing:
+        raise KeyError(f"CIF does not contain {', '.join(missing)}")
+    return np.array([cif_float(cif['tags'][n]) for n in names])
+
+def lattice_vectors(cell : np.ndarray) -> np.ndarray:
+    '''lattice vectors as rows of a 3x3 matrix (a along x, b in the xy plane)'''
+    a, b, c = cell[:3]
+    alpha, beta, gamma = np.radians(cell[3:])
+    cx = c * np.cos(beta)
+    cy = c * (np.cos(alpha) - np.cos(beta) * np.cos(gamma)) / np.sin(gamma)
+    cz = np.sqrt(c**2 - cx**2 - cy**2)
+    return np.array([
+        [a, 0, 0],
+        [b * np.cos(gamma), b * np.sin(gamma), 0],
+        [cx, cy, cz],
+        ])
+
+def cell_from_vectors(vectors : np.ndarray) -> np.ndarray:
+    '''lattice parameters from lattice vectors (rows)'''
+    lengths = np.linalg.norm(vectors, axis=1)
+    def angle(i, j):
+        return np.degrees(np.arccos(np.dot(vectors[i], vectors[j]) / (lengths[i] * lengths[j])))
+    return np.array([*lengths, angle(1,2), angle(0,2), angle(0,1)])
+
+def atom_sites(cif : dict) -> tuple[list[str], np.ndarray]:
+    '''site labels and fractional coordinates (n_sites x 3) of the atom_site loop'''
+    columns = loop_columns(cif, '_atom_site_fract_x')
+    if columns is None:
+        raise KeyError('CIF does not contain an atom_site loop with fractional coordinates')
+    labels = columns.get('_atom_site_label', [str(i+1) for i in range(len(columns['_atom_site_fract_x']))])
+    xyz = np.array([[cif_float(v) for v in columns[f'_atom_site_fract_{x}']] for x in 'xyz']).T
+    return labels, xyz
+
+def format_loop(columns : list[str], rows : list[list[str]]) -> str:
+    '''writes a CIF loop with aligned columns'''
+    quoted = [[quote_value(v) for v in row] for row in rows]
+    widths = [max([len(row[k]) for row in quoted] + [1]) for k in range(len(columns))]
+    lines = ['loop_'] + columns
+    lines += [' '.join(v.ljust(widths[k]) for k, v in enumerate(row)).rstrip() for row in quoted]
+    return '\n'.join(lines)
+
+def quote_value(value : str) -> str:
+    if value == '' or any(c in value for c in ' \t') or value[0] in '_#$\'";[]':
+        return f"'{value}'" if "'" not in value else f'"{value}"'
+    return value
+
+def replace_loops(cif : dict, new_loops : list[tuple[dict, list[list[str]]]]) -> str:
+    '''returns the CIF text with the rows of the given loops replaced, e.g. to write new atom positions into a template'''
+    text = cif['text']
+    for loop, rows in sorted(new_loops, key = lambda l: l[0]['span'][0], reverse=True): # back to front keeps the spans valid
+        start, end = loop['span']
+        text = text[:start] + format_loop(loop['headers'], rows) + text[end:]
+    return text
+
+def replace_tags(text : str, values : dict[str,str]) -> str:
+    '''replaces the values of single valued tags in CIF text'''
+    for tag, value in values.items():
+        text = re.sub(rf'(^{re.escape(tag)}[ \t]+)\S+', lambda m: m.group(1) + value, text, flags=re.MULTILINE | re.IGNORECASE)
+    return text
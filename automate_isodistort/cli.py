@@ -0,0 +1,109 @@
+import sys
+import argparse
+from pathlib import Path
+from .constants import FINDSYM_PAGE, MAX_WORKERS, SYM_TOLERANCE, DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE
+
+
+"""
+Command line interface: python -m automate_isodistort <subcommand> ...
+
+Every subcommand imports what it needs when it runs, so the browser backends (and spglib) are
+only loaded by the subcommands and settings that use them.
+"""
+
+def check_infofile(infofile : str) -> str:
+    if Path(infofile).is_file() is False:
+        raise FileNotFoundError(f'Your infofile {infofile} does not exist')
+    return infofile
+
+def run_decompose(args) -> None:
+    from .workflow import run
+    run(check_infofile(args.infofile), args.resume)
+    return None
+
+def run_scale(args) -> None:
+    from .workflow import run
+    run(check_infofile(args.infofile), args.resume, scale=True)
+    return None
+
+def run_manifest(args) -> None:
+    from .manifest import run_manifest
+    run_manifest(check_infofile(args.manifest), args.resume, args.dry_run)
+    return None
+
+def run_symmetrise(args) -> None:
+    from .files import expand_file_list
+    from .symmetrise import symmetrise_files_locally, symmetrise_parallel, print_summary
+    struct_files = expand_file_list(args.files)
+    if args.backend == 'spglib':
+        try:
+            summary = symmetrise_files_locally(struct_files, args.tolerance, args.overwrite)
+        except ImportError as err: # spglib missing, nothing has been written
+            sys.exit(str(err))
+    else:
+        summary = symmetrise_parallel(struct_files, args.webdriver_path, args.workers, args.window, args.main_page, args.overwrite)
+    print_summary(summary)
+    return None
+
+def run_inspect(args) -> None:
+    from .inspection import inspect_path
+    for path in args.paths:
+        inspect_path(path, args.run, args.all)
+    return None
+
+def run_cache(args) -> None:
+    from .mode_cache import cache_command
+    cache_command(args.action, args.cache_dir, args.max_size)
+    return None
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='automate_isodistort',
+        description='Automatically operate ISODISTORT method 4 (mode decomposition) and FINDSYM',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    decompose = subparsers.add_parser('decompose', help='run the mode decomposition (and scaling, if requested) configured in an infofile')
+    decompose.add_argument('infofile', type=str, help='input file')
+    decompose.add_argument('--resume', action='store_true', help='skip structures recorded as finished in the job journal and retry the others')
+    decompose.set_defaults(function=run_decompose)
+
+    scale = subparsers.add_parser('scale', help='generate structures with scaled mode amplitudes as configured in an infofile (SCALEMODES is implied)')
+    scale.add_argument('infofile', type=str, help='input file')
+    scale.add_argument('--resume', action='store_true', help='skip structures recorded as finished in the job journal and retry the others')
+    scale.set_defaults(function=run_scale)
+
+    manifest = subparsers.add_parser('manifest', help='run all jobs of a YAML job manifest (shared defaults, parameter sweeps)')
+    manifest.add_argument('manifest', type=str, help='job manifest')
+    manifest.add_argument('--resume', action='store_true', help='skip structures recorded as finished in the job journals and retry the others')
+    manifest.add_argument('--dry-run', action='store_true', help='only check the manifest and list the jobs')
+    manifest.set_defaults(function=run_manifest)
+
+    symmetrise = subparsers.add_parser('symmetrise', help='symmetrise CIF files, the results are saved as <name>_sym.cif next to the input files')
+    symmetrise.add_argument('files', nargs='+', type=str, help='CIF files and/or glob patterns (quoted)')
+    symmetrise.add_argument('--backend', choices=['findsym', 'spglib'], default='findsym', help='symmetrise with the FINDSYM web page or locally with spglib')
+    symmetrise.add_argument('--tolerance', type=float, default=SYM_TOLERANCE, help='symmetry tolerance in Angstrom (spglib backend)')
+    symmetrise.add_argument('--workers', type=int, default=1, help=f'number of parallel browser sessions (at most {MAX_WORKERS})')
+    symmetrise.add_argument('--window', action='store_true', help='show the browser window')
+    symmetrise.add_argument('--overwrite', action='store_true', help='overwrite existing symmetrised files without asking')
+    symmetrise.add_argument('--webdriver-path', type=str, default=None, help='path to chromedriver')
+    symmetrise.add_argument('--main-page', type=str, default=FINDSYM_PAGE, help='link to the FINDSYM main page')
+    symmetrise.set_defaults(function=run_symmetrise)
+
+    inspect = subparsers.add_parser('inspect', help='show mode amplitude files, stores, journals, traces, CIFs or infofiles')
+    inspect.add_argument('paths', nargs='+', type=str, help='files or store directories')
+    inspect.add_argument('--run', type=str, default=None, help='trace files: only summarise this run (default: the last run in the file)')
+    inspect.add_argument('--all', action='store_true', help='trace files: summarise all runs in the file together')
+    inspect.set_defaults(function=run_inspect)
+
+    cache = subparsers.add_parser('cache', help='list, prune or clear the cache of decomposition results (USE_CACHE)')
+    cache.add_argument('action', choices=['list', 'prune', 'clear'])
+    cache.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='CACHE_DIR of the runs')
+    cache.add_argument('--max-size', type=float, default=DEFAULT_MAX_SIZE, help='maximum cache size in MB (prune)')
+    cache.set_defaults(function=run_cache)
+    return parser
+
+def main(argv : list[str] | None = None) -> None:
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    args.function(args)
+    return None
@@ -0,0 +1,12 @@
+"""
+Defaults the command line interface needs to build its parser. This module imports nothing, so
+building the parser (e.g. for --help) does not load numpy or the backends; every subcommand only
+imports the modules it needs when it runs.
+"""
+
+FINDSYM_PAGE : str = 'https://stokes.byu.edu/iso/findsym.php'
+MAX_WORKERS : int = 4 # be nice to the public FINDSYM server
+SYM_SUFFIX : str = '_sym.cif' # symmetrised structures are saved as <name>_sym.cif
+SYM_TOLERANCE : float = 0.01 # Angstrom, for the local backend
+DEFAULT_CACHE_DIR : str = '~/.cache/automate_isodistort/'
+DEFAULT_MAX_SIZE : float = 100 # MB, cache
@@ -0,0 +1,187 @@
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np # type: ignore
+from .isodistort_http import decompose_series_http, IsodistortSession, upload_parent_struct_http, upload_child_struct_http, transform_basis_http, read_mode_amplitudes_http, download_structure_http
+from .job_journal import journal_record, backoff_delay
+from .results_archive import archive_text, archive_file
+from .timing import span, job
+
+
+"""
+Decomposition sessions with either backend: restarts and retries, and parallel worker processes.
+"""
+
+MAX_WORKERS : int = 4 # upper limit of parallel sessions, keeps the load on the public ISODISTORT server polite
+
+def selenium_backend():
+    '''the Selenium backend, imported on first use so that the HTTP backend and the offline paths start without a browser'''
+    from . import isodistort_selenium
+    return isodistort_selenium
+
+def start_session(parent_struct : str, main_page : str, webdrv_path : str, backend : str = 'selenium', webdrv_win : bool = False, download_dir : str | None = None, debug : bool = False, archive_dir : str | None = None, record_dir : str | None = None) -> dict:
+    '''opens a session (browser or HTTP) and uploads the parent structure, record_dir only applies to the HTTP backend'''
+    if backend == 'http':
+        session = IsodistortSession(main_page, record_dir=record_dir)
+        return {'backend' : 'http', 'session' : session, 'method4_page' : upload_parent_struct_http(parent_struct, session), 'debug' : debug, 'parent' : parent_struct, 'archive' : archive_dir}
+    from .browser import webdriver_setup # needs selenium, not imported for the HTTP backend
+    selenium = selenium_backend()
+    driver, wait = webdriver_setup(webdrv_win, webdrv_path, download_dir)
+    try:
+        with span('main_page'):
+            driver.get(main_page)
+        selenium.upload_parent_struct(parent_struct, driver)
+    except Exception:
+        driver.quit()
+        raise
+    return {'backend' : 'selenium', 'driver' : driver, 'wait' : wait, 'debug' : debug, 'parent' : parent_struct, 'archive' : archive_dir}
+
+def decompose_in_session(child_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, session : dict) -> tuple[dict,dict]:
+    '''decomposes one child structure against the parent uploaded in the session'''
+    if session['backend'] == 'http':
+        basis_page = upload_child_struct_http(child_struct, session['method4_page'], session['session'])
+        results_page = transform_basis_http(transformation_matrix, origin_shift, basis_page, session['session'])
+        if session['archive'] is not None:
+            archive_text(session['archive'], session['parent'], child_struct, transformation_matrix, origin_shift, results_page.html)
+        return read_mode_amplitudes_http(results_page, debug=session['debug'])
+    selenium = selenium_backend()
+    driver = session['driver']
+    selenium.upload_child_struct(child_struct, driver, session['wait'])
+    selenium.transform_basis(transformation_matrix, origin_shift, driver)
+    if session['archive'] is not None:
+        archive_text(session['archive'], session['parent'], child_struct, transformation_matrix, origin_shift, driver.page_source)
+    mode_amplitudes, box_labels = selenium.read_mode_amplitudes(driver, debug=session['debug'])
+    selenium.close_child_tab(driver)
+    return mode_amplitudes, box_labels
+
+def mode_basis_in_session(child_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, session : dict, destination : str) -> tuple[str,dict,dict]:
+    '''decomposes one child structure and saves the CIF with its mode definitions (mode_basis.cif in destination)
+    returns the path of the CIF and the (results, labels) pair of the child, in page order
+    '''
+    if session['backend'] == 'http':
+        basis_page = upload_child_struct_http(child_struct, session['method4_page'], session['session'])
+        results_page = transform_basis_http(transformation_matrix, origin_shift, basis_page, session['session'])
+        if session['archive'] is not None:
+            archive_text(session['archive'], session['parent'], child_struct, transformation_matrix, origin_shift, results_page.html)
+        mode_amplitudes, box_labels = read_mode_amplitudes_http(results_page, debug=session['debug'])
+        basis_file = download_structure_http(results_page, session['session'], os.path.join(destination, 'mode_basis.cif'))
+    else:
+        selenium = selenium_backend()
+        driver = session['driver']
+        selenium.upload_child_struct(child_struct, driver, session['wait'])
+        selenium.transform_basis(transformation_matrix, origin_shift, driver)
+        if session['archive'] is not None:
+            archive_text(session['archive'], session['parent'], child_struct, transformation_matrix, origin_shift, driver.page_source)
+        mode_amplitudes, box_labels = selenium.read_mode_amplitudes(driver, debug=session['debug'])
+        basis_file = selenium.fetch_mode_basis(destination, driver, session['wait'])
+        selenium.close_child_tab(driver)
+    if session['archive'] is not None:
+        archive_file(session['archive'], session['parent'], child_struct, transformation_matrix, origin_shift, basis_file)
+    return basis_file, mode_amplitudes, box_labels
+
+def end_session(session : dict | None) -> None:
+    if session is not None and session['backend'] == 'selenium':
+        from selenium.common.exceptions import WebDriverException # type: ignore
+        try:
+            session['driver'].quit()
+        except WebDriverException: # session already gone
+            pass
+    return None
+
+def decompose_with_retries(child_structs : list[str], parent_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, main_page : str, webdrv_path : str, backend : str = 'selenium', journal : str | None = None, max_attempts : int = 3, backoff : float = 10.0, download_dir : str | None = None, debug : bool = False, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''decomposes the child structures, recording every outcome in the journal
+    a failure does not stop the series: the session is restarted and failed structures are retried with exponential backoff
+    '''
+    series_results : dict = {}
+    series_labels : dict = {}
+    remaining : list[str] = list(child_structs)
+    for attempt in range(1, max_attempts + 1):
+        if not remaining:
+            break
+        if attempt > 1:
+            delay = backoff_delay(attempt, backoff)
+            print(f'Retrying {len(remaining)} failed structures in {delay:.0f} s (attempt {attempt}/{max_attempts})...')
+            time.sleep(delay)
+        failed : list[str] = []
+        session = None
+        for i, child in enumerate(remaining):
+            print(f"child structure {i+1}/{len(remaining)}: {child}")
+            if journal is not None: journal_record(journal, child, 'started', attempt=attempt)
+            try:
+                with job(child):
+                    if session is None:
+                        session = start_session(parent_struct, main_page, webdrv_path, backend, download_dir=download_dir, debug=debug, archive_dir=archive_dir)
+                    mode_amplitudes, box_labels = decompose_in_session(child, transformation_matrix, origin_shift, session)
+            except Exception as err:
+                print(f'\nDecomposition of {child} failed: {type(err).__name__}: {err}')
+                if journal is not None: journal_record(journal, child, 'failed', attempt=attempt, error=f'{type(err).__name__}: {err}')
+                failed.append(child)
+                end_session(session) # start from a fresh session for the next structure
+                session = None
+                continue
+            series_results[child] = mode_amplitudes
+            series_labels[child] = box_labels
+            if journal is not None: journal_record(journal, child, 'done', attempt=attempt, results=mode_amplitudes, labels=box_labels)
+        end_session(session)
+        remaining = failed
+    if remaining:
+        warnings.warn(f"{len(remaining)} structures could not be decomposed after {max_attempts} attempts: {', '.join(remaining)}")
+    return series_results, series_labels
+
+"""
+Functions for parallel batch processing
+"""
+
+def split_jobs(items : list, num_chunks : int) -> list[list]:
+    '''distributes items round-robin over num_chunks lists'''
+    return [items[i::num_chunks] for i in range(num_chunks) if items[i::num_chunks]]
+
+def decompose_worker(child_structs : list[str], parent_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, main_page : str, webdrv_path : str, backend : str, debug : bool, start_delay : float = 0, journal : str | None = None, max_attempts : int = 3, backoff : float = 10.0, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''runs in a worker process: decomposes a share of the child structures in its own session'''
+    time.sleep(start_delay) # stagger the session starts
+    if journal is not None:
+        return decompose_with_retries(child_structs, parent_struct, transformation_matrix, origin_shift, main_page, webdrv_path, backend, journal, max_attempts, backoff, debug=debug, archive_dir=archive_dir)
+    if backend == 'http':
+        return decompose_series_http(main_page, parent_struct, child_structs, transformation_matrix, origin_shift, debug=debug, archive_dir=archive_dir)
+    from .browser import webdriver_setup
+    selenium = selenium_backend()
+    driver, wait = webdriver_setup(False, webdrv_path)
+    try:
+        with span('main_page'):
+            driver.get(main_page)
+        selenium.upload_parent_struct(parent_struct, driver)
+        return selenium.decompose_series(child_structs, transformation_matrix, origin_shift, driver, wait, debug, parent_struct, archive_dir)
+    finally:
+        driver.quit()
+
+def decompose_parallel(child_structs : list[str], parent_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, main_page : str, webdrv_path : str, num_workers : int, backend : str = 'selenium', stagger : float = 2.0, journal : str | None = None, max_attempts : int = 3, backoff : float = 10.0, debug : bool = False, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''spreads the child structures over several worker processes with one session each, returns results and labels keyed by child file'''
+    if num_workers > MAX_WORKERS:
+        warnings.warn(f"{num_workers} workers requested, limiting to {MAX_WORKERS} parallel sessions.")
+    num_workers = max(1, min(num_workers, MAX_WORKERS, len(child_structs)))
+    chunks = split_jobs(child_structs, num_workers)
+    print(f'Decomposing {len(child_structs)} child structures using {len(chunks)} worker processes...')
+    merged_results : dict = {}
+    merged_labels : dict = {}
+    failed : list[str] = []
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [
+            pool.submit(decompose_worker, chunk, parent_struct, transformation_matrix, origin_shift, main_page, webdrv_path, backend, debug, i*stagger, journal, max_attempts, backoff, archive_dir)
+            for i, chunk in enumerate(chunks)
+            ]
+        for chunk, future in zip(chunks, futures):
+            try:
+                series_results, series_labels = future.result()
+            except Exception as err: # keep the results of the other workers
+                print(f'\nWorker for {len(chunk)} structures failed: {type(err).__name__}: {err}')
+                failed += chunk
+                continue
+            merged_results.update(series_results)
+            merged_labels.update(series_labels)
+    if failed:
+        warnings.warn(f"{len(failed)} structures could not be decomposed because their worker failed: {', '.join(failed)}")
+    # keep the order of the input files (failed structures are missing)
+    merged_results = {child : merged_results[child] for child in child_structs if child in merged_results}
+    merged_labels = {child : merged_labels[child] for child in child_structs if child in merged_labels}
+    return merged_results, merged_labels
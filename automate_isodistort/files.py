@@ -0,0 +1,90 @@
+import os
+import glob
+import time
+import shutil
+from pathlib import Path
+import yaml # type: ignore
+
+
+"""
+File handling shared by the decomposition, scaling and symmetrisation workflows.
+"""
+
+def file_check(filepath) -> str:
+    '''check if file is existent and if path is absolute, return full path if provided path is relative'''
+    if not os.path.isfile(filepath): # check if files exists
+        raise FileNotFoundError(f"The file {filepath.split('/')[-1]} could not be found.")
+    elif Path(filepath).is_absolute():
+        path = filepath
+    else:
+        path = os.path.abspath(filepath)
+    return path
+
+def expand_file_list(usr_text : str | list[str]) -> list[str]:
+    '''splits a space separated list (or takes a list) of file paths and/or glob patterns into a sorted list of full paths'''
+    paths : list[str] = []
+    for entry in (usr_text.split() if isinstance(usr_text, str) else usr_text):
+        matches = sorted(glob.glob(os.path.expanduser(entry))) if glob.has_magic(entry) else [entry]
+        if not matches:
+            raise FileNotFoundError(f"No files match the pattern {entry}.")
+        for match in matches:
+            path = file_check(os.path.expanduser(match))
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def save_to_file(result : dict, filename : str = 'modeamplitudes') -> str:
+    '''save mode amplitude dict to YAML file without overwriting existing files, returns the name of the file
+    if <filename>.yaml exists, the first free <filename>_<i>.yaml is used
+    '''
+    path = f'{filename}.yaml'
+    i = 0
+    while os.path.isfile(path): # check if file exists
+        i += 1
+        path = f'{filename}_{i}.yaml'
+
+    with open(path, 'w+') as ff:
+        yaml.dump(result, ff, sort_keys=False) # keep the page order of irreps and modes
+    print(f'Saved results to file {path}')
+    return path
+    
+def read_from_file(name : str) -> dict | None:
+    '''reading mode amplitude dict from YAML file'''
+    if not os.path.isfile(f'{name}'): # check if file exists
+        raise FileNotFoundError(f'File {name} could not be found')
+    else:   
+        conf = yaml.safe_load(Path(name).read_text())
+        print(f'Reading data from file {name}')
+        return conf
+
+PARTIAL_DOWNLOAD_SUFFIXES : tuple = ('.crdownload', '.tmp', '.part') # files Chrome is still writing to
+
+def wait_for_download(downloads_dir : str, since : float = 0, timeout : float = 30.0, poll_interval : float = 0.1) -> str:
+    '''waits until a finished file (modified after the time stamp since) shows up in the download directory, returns its path'''
+    directory = os.path.expanduser(downloads_dir)
+    deadline = time.monotonic() + timeout
+    last_size : dict = {}
+    while time.monotonic() < deadline:
+        entries = os.listdir(directory)
+        if not any(e.endswith(PARTIAL_DOWNLOAD_SUFFIXES) for e in entries): # no download in progress
+            for entry in entries:
+                path = os.path.join(directory, entry)
+                if entry.startswith('.') or not os.path.isfile(path) or os.path.getmtime(path) < since - 1:
+                    continue
+                size = os.path.getsize(path)
+                if size > 0 and last_size.get(path) == size: # size unchanged since the last check
+                    return path
+                last_size[path] = size
+        time.sleep(poll_interval)
+    raise TimeoutError(f"No finished download appeared in {directory} within {timeout} s")
+
+def move_file_atomic(source : str, destination : str) -> None:
+    '''moves a file such that the destination never holds a partially written file'''
+    try:
+        os.replace(source, destination)
+    except OSError: # different file systems: copy next to the destination first
+        tmp = destination + '.part'
+        shutil.copy2(source, tmp)
+        os.replace(tmp, destination)
+        os.remove(source)
+    return None
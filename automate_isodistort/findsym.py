@@ -0,0 +1,109 @@
+import os
+import time
+import warnings
+from selenium.common.exceptions import WebDriverException # type: ignore
+from selenium.webdriver.common.by import By # type: ignore
+from .files import file_check, wait_for_download, move_file_atomic
+from .browser import webdriver_setup
+from .page_waits import PageLoadError, wait_for_page_load
+from .constants import FINDSYM_PAGE, SYM_SUFFIX
+
+
+"""
+Symmetrisation with the FINDSYM web page in a Chrome session (imported only for the findsym backend).
+"""
+
+def move_downloaded_file(downloads_dir : str, destination: str, name : str, driver, since : float = 0, timeout : float = 30.0, overwrite : bool = False) -> None:
+    # moving and renaming downloaded file
+    if not os.path.isdir(os.path.expanduser(downloads_dir)):
+        raise IOError(f"The Downloads directory could not be found at {os.path.expanduser(downloads_dir)}")
+    latest_file = wait_for_download(downloads_dir, since, timeout) # only this session downloads into this directory
+    suffix = SYM_SUFFIX
+    filepath = destination+name+suffix
+    if os.path.isfile(filepath) and not overwrite: # check if file exists
+        warnings.warn(f'A file with the name {name+suffix} already exists in this directory.')
+        while True:
+            try:
+                answer = input(f"\n Continue moving {latest_file} and overwrite existing file? (y/n) ")
+            except EOFError: # no terminal, e.g. in a worker process
+                raise FileExistsError(f'A file with the name {name+suffix} already exists, use --overwrite to replace it.')
+            if answer.lower() in ["y","yes"]:
+                move_file_atomic(latest_file,filepath)
+                break
+            elif answer.lower() in ["n","no"]:
+                raise FileExistsError(f'A file with the name {name+suffix} already exists.')
+            else:
+                print('invalid input')
+                continue
+    else: move_file_atomic(latest_file,filepath)
+    return None
+
+def upload_struct(struct : str, driver) -> None:
+    '''uploads parent structure file to main page'''
+    filepath = file_check(struct)
+    print('Uploading structure file...', end="")
+    upload_struct_button = driver.find_element(By.XPATH, "/html/body/div[2]/div[1]/form/input[3]")
+    upload_struct_button.send_keys(filepath) # upload parent file on first page
+    wait_for_page_load('/html/body/div[2]/div[1]/form/input[2]', driver, 'findsym_upload') # wait for 'OK' button to be clickable
+    OK_button = driver.find_element(By.XPATH, "/html/body/div[2]/div[1]/form/input[2]")
+    OK_button.click() #click OK on first page
+    wait_for_page_load('/html/body/form[1]/input[3]', driver, 'findsym_result') # wait for 'download cif' button to be clickable
+    print("Done!")
+    return None
+
+def symmetrise_using_findsym(structure_file_path : str, downloads_dir : str, driver, download_timeout : float = 60, main_page : str = FINDSYM_PAGE, overwrite : bool = False) -> None:
+    '''wrapper function for automating the findsym workflow, the driver stays open for the next file'''
+
+    destination : str = '/'.join(structure_file_path.split('/')[:-1])+'/' # get full path of directory
+    str_name : str = '.'.join(structure_file_path.split('/')[-1].split('.')[:-1]) # get file name without file extension
+
+    # load findsym main page
+    print('Opening FINDSYM...', end="")
+    driver.get(main_page)
+    print('Done!')
+
+    upload_struct(structure_file_path, driver)
+
+    print('Downloading CIF...', end="")
+    download_cif_button = driver.find_element(By.XPATH, "/html/body/form[1]/input[3]")
+    started = time.time()
+    download_cif_button.click()
+    print('Done!')
+
+    print('Moving symmetrised CIF to destination...', end="")
+    move_downloaded_file(downloads_dir,destination,str_name,driver,since=started,timeout=download_timeout,overwrite=overwrite) # polls until the download has finished
+    print('Done!')
+
+    # close tabs opened by the download and return to the first one
+    for handle in driver.window_handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+
+    return None
+
+def symmetrise_files(struct_files : list[str], webdrv_path : str, webdrv_win : bool = False, main_page : str = FINDSYM_PAGE, overwrite : bool = False, start_delay : float = 0) -> list[dict]:
+    '''symmetrises the files one after the other in a single browser session, returns one summary entry per file'''
+    time.sleep(start_delay) # stagger the session starts
+    summary : list[dict] = []
+    driver = None
+    for i, struct_file in enumerate(struct_files):
+        print(f"symmetrising file {i+1}/{len(struct_files)}: {struct_file}")
+        started = time.perf_counter()
+        try:
+            if driver is None:
+                driver, wait = webdriver_setup(webdrv_win, webdrv_path)
+            symmetrise_using_findsym(struct_file, driver.download_dir, driver, main_page=main_page, overwrite=overwrite)
+            summary.append({'file' : struct_file, 'success' : True, 'time' : time.perf_counter() - started, 'error' : ''})
+        except (WebDriverException, PageLoadError, TimeoutError, IOError, FileExistsError) as err:
+            print(f'\nSymmetrising {struct_file} failed: {type(err).__name__}: {err}')
+            summary.append({'file' : struct_file, 'success' : False, 'time' : time.perf_counter() - started, 'error' : f'{type(err).__name__}: {err}'.splitlines()[0]})
+            if driver is not None: # the browser state is unknown, start from a fresh session
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
+                driver = None
+    if driver is not None:
+        driver.quit()
+    return summary
@@ -0,0 +1,147 @@
+import warnings
+import numpy as np # type: ignore
+
+
+"""
+Reading the infofile: one tag per line, e.g. PARENT_FILE : parent.cif
+"""
+
+text_tags : list = [
+    # infofile text tags (i.e. initialise)
+    'PARENT_FILE', 'DISTORTED_FILE', 'BASIS_TRANSFORM'
+]
+option_tags_bool : dict = {
+    # infofile optional boolean tags and default values
+    'READ_MODE' : True, 
+    'WRITE_FILE' : False,
+    'DEBUG' : False,
+    'WEBDRV_WINDOW' : False,
+    'SCALEMODES' : False,
+    'USE_CACHE' : False,
+    'SCALE_STRAINS' : False,
+    'OVERWRITE' : False,
+    'PREFLIGHT' : True,
+}
+option_tags_other : dict = {
+    # infofile optional tags (non-boolean) and default values
+    'ORIGIN_SHIFT' : None,
+    'SCALEMODES_LABELS' : None,
+    'SCALEMODES_MIN' : 0,
+    'SCALEMODES_MAX' : 1,
+    'SCALEMODES_STEPS' : 5,
+    'DOWNLOAD_DIR' : None,
+    'BACKEND' : 'selenium',
+    'RECORD_DIR' : None,
+    'NUM_WORKERS' : 1,
+    'CACHE_DIR' : '~/.cache/automate_isodistort/',
+    'CACHE_MAX_SIZE' : 100,
+    'SCALEMODES_ENGINE' : 'isodistort',
+    'SCALEMODES_RANGES' : None,
+    'SCALEMODES_GRID' : 'linear',
+    'SCALEMODES_GRID_FILE' : None,
+    'SCALEMODES_OUTPUT' : 'files',
+    'STORE_DIR' : None,
+    'JOURNAL_FILE' : None,
+    'MAX_ATTEMPTS' : 3,
+    'RETRY_BACKOFF' : 10,
+    'CELL_TOLERANCE' : 0.05,
+    'TRACE_FILE' : None,
+    'ARCHIVE_DIR' : None,
+    'OUTPUT_DIR' : None,
+    'DECOMPOSE_ENGINE' : 'isodistort',
+    'LOCAL_SAMPLE' : 3,
+    'LOCAL_TOLERANCE' : 0.001,
+}
+
+def read_bool_tag(usr_input : str) -> bool|None:
+    '''helper function to convert user text into boolean value (or None)'''
+    try:
+        if usr_input.upper() in ['TRUE', 'T']:
+            return True
+        elif usr_input.upper() in ['FALSE', 'F']:
+            return False
+        else:
+            return None
+    except AttributeError:
+        return None  
+
+def parse_tags(lines : list[str]) -> dict[str,str]:
+    '''reads all tags of the input file in one pass, {TAG (upper case) : value text}, the first occurrence of a tag counts'''
+    tags : dict = {}
+    for line in lines:
+        split_line = line.split()
+        if not split_line: # blank line
+            continue
+        # HACK Assuming colon is the second element in string after the field name ignoring space
+        tags.setdefault(split_line[0].upper(), ' '.join(split_line[2:]))
+    return tags
+
+def required_tag(tags : dict[str,str], myfield : str) -> str:
+    if myfield.upper() not in tags:
+        raise KeyError(f'Unable to find the required tag {myfield} from infofile')
+    return tags[myfield.upper()]
+
+def convert_tags(tags : dict[str,str], tags_text : list[str] = text_tags, tags_bool : dict = option_tags_bool, tags_other : dict = option_tags_other):
+    '''converts the tag values of one job (as from parse_tags) into the settings used by the workflow, the default dicts are not changed'''
+    # Initialise the user data with garbage values
+    walker_text = dict.fromkeys(tags_text, -1)
+    tags_bool = dict(tags_bool)
+    tags_other = dict(tags_other)
+
+    # Get the main page link
+    webdrv_path = required_tag(tags, 'WEBDRIVER_PATH')
+
+    # Get the path to the google form
+    main_page = required_tag(tags, 'MAIN_PAGE')
+
+    # Now get the required info.
+    for tag in tags_text:
+        usr_text = required_tag(tags, tag)
+        if tag == 'BASIS_TRANSFORM' and usr_text.strip().lower() == 'auto': # searched for later
+            usr_text = 'auto'
+        elif tag == 'BASIS_TRANSFORM': # this will be a string of 9 numbers
+            try:
+                basis_list = list(map(int,usr_text.split()))
+            except ValueError:
+                raise KeyError(f"{usr_text} is not a valid basis transformation matrix ")
+            if len(basis_list) != 9:
+                raise KeyError(f"{usr_text} is not a valid basis transformation matrix ")
+            usr_text = np.reshape(basis_list, (-1,3))
+        walker_text[tag] = usr_text
+
+    
+    # Get optional info
+    for opt_tag_b in tags_bool.keys():
+        usr_value = tags.get(opt_tag_b.upper())
+        value = read_bool_tag(usr_value)
+        if value == None:
+            warnings.warn(f"invalid input value for {opt_tag_b}: {usr_value}. Falling back to default value ({tags_bool[opt_tag_b]}).")
+            continue
+        else:
+            tags_bool[opt_tag_b] = value
+
+    for opt_tag_o in tags_other.keys():
+        usr_value_o = tags.get(opt_tag_o.upper())
+        if usr_value_o == None:
+            warnings.warn(f"invalid input value for {opt_tag_o}: {usr_value_o}. Falling back to default value ({tags_other[opt_tag_o]}).")
+            continue
+        else:
+            if opt_tag_o == 'ORIGIN_SHIFT' and usr_value_o.strip().lower() == 'auto': # searched for later
+                usr_value_o = 'auto'
+            elif opt_tag_o == 'ORIGIN_SHIFT':
+                try:
+                    origin_arr = np.array(list(map(float, usr_value_o.split()))) # generate 1x3 numpy array from input
+                except ValueError:
+                    raise KeyError(f"{usr_value_o} is not a valid origin shift")
+                if origin_arr is not None and len(origin_arr) != 3:
+                    raise KeyError(f"{usr_value_o} is not a valid origin shift")
+                usr_value_o = origin_arr
+            tags_other[opt_tag_o] = usr_value_o
+    return webdrv_path, main_page, walker_text, tags_bool, tags_other
+
+def read_usr_info(filename : str,  tags_text : list[str] = text_tags, tags_bool : dict = option_tags_bool, tags_other : dict = option_tags_other):
+    '''reads lines from input file and assigns use values to relevant variables'''
+    # Read the input file
+    with open(filename, 'r', encoding='ASCII') as file:
+        lines = file.readlines()
+    return convert_tags(parse_tags(lines), tags_text, tags_bool, tags_other)
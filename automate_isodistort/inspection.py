@@ -0,0 +1,112 @@
+import os
+import json
+from pathlib import Path
+import yaml # type: ignore
+
+
+"""
+Quick look at the files written by a run, without starting a browser.
+
+Recognised are mode amplitude files (YAML, single structure or batch), job manifests, mode amplitude stores,
+job journals and timing traces (JSON lines), CIF's and infofiles.
+"""
+
+def print_results(results : dict, indent : str = '') -> None:
+    '''irreps with their info and mode amplitudes'''
+    for irrep, entry in results.items():
+        info = entry.get('info', {})
+        print(f"{indent}{irrep}  {info.get('parent', '')} -> {info.get('child', '')}  OPD {info.get('OPD', '')}")
+        for component, value in entry.get('components', {}).items():
+            print(f"{indent}    {value:>10.5f}  {component}")
+    return None
+
+def inspect_results(path : str) -> None:
+    data = yaml.safe_load(Path(path).read_text())
+    if not isinstance(data, dict) or not data:
+        print(f'{path} holds no mode amplitudes.')
+        return None
+    if isinstance(data.get('jobs'), list): # job manifest
+        from .manifest import plan_jobs, print_plan
+        print_plan(plan_jobs(path))
+        return None
+    first = next(iter(data.values()))
+    if isinstance(first, dict) and 'components' in first:
+        print_results(data)
+    elif isinstance(first, dict) and all(isinstance(v, dict) and 'components' in v for v in first.values()): # batch: keyed by child file
+        for child, results in data.items():
+            print(child)
+            print_results(results, indent='    ')
+    else: # box labels
+        for irrep, labels in data.items():
+            print(f"{irrep}: {', '.join(f'{component} ({label})' for component, label in labels.items())}")
+    return None
+
+def inspect_store(path : str) -> None:
+    from .mode_store import read_store_meta, read_store_rows
+    meta = read_store_meta(path)
+    rows = read_store_rows(path)
+    print(f"Mode amplitude store {path}: {len(rows)} structures, {len(meta['columns'])} mode components")
+    for irrep, info in meta['info'].items():
+        components = [column for column in meta['columns'] if column[0] == irrep]
+        print(f"    {irrep}  {info.get('parent', '')} -> {info.get('child', '')}  {len(components)} components")
+    return None
+
+def inspect_jsonl(path : str, run : str | None = None, all_runs : bool = False) -> None:
+    '''job journal or timing trace'''
+    with open(path, 'r') as ff:
+        first = next((line for line in ff if line.strip()), '')
+    record = json.loads(first) if first else {}
+    if 'stage' in record:
+        from .timing import read_trace, print_summary
+        records = read_trace(path)
+        if not all_runs:
+            run = run if run is not None else (records[-1].get('run') if records else None)
+            records = [r for r in records if r.get('run') == run]
+            print(f'run {run}')
+        print_summary(records)
+    else:
+        from .job_journal import read_journal, journal_summary
+        print(f'Job journal {path}: {journal_summary(path)}')
+        for job, last in read_journal(path).items():
+            if last['state'] != 'done':
+                print(f"    {last['state']:<8} {job}  {last.get('error', '')}")
+    return None
+
+def inspect_cif(path : str) -> None:
+    from .cif_tools import read_cif, cell_parameters
+    from .preflight import symmetry_operations, count_atoms
+    cif = read_cif(path)
+    rotations, _ = symmetry_operations(cif)
+    print(f"{path}")
+    print(f"    cell      {' '.join(f'{x:.4f}' for x in cell_parameters(cif))}")
+    print(f"    symmetry  {len(rotations)} operations")
+    print(f"    atoms     {', '.join(f'{element} {n}' for element, n in count_atoms(cif).items())}")
+    return None
+
+def inspect_infofile(path : str) -> None:
+    '''tags as they are read by the decompose and scale subcommands'''
+    import pprint
+    from .infofile import text_tags, option_tags_bool, option_tags_other, read_usr_info
+    webdrv_path, main_page, walker_text, tags_bool, tags_other = read_usr_info(path, text_tags, option_tags_bool, option_tags_other)
+    print(f'MAIN_PAGE : {main_page}')
+    print(f'WEBDRIVER_PATH : {webdrv_path}')
+    pprint.pprint(walker_text)
+    pprint.pprint(tags_bool)
+    pprint.pprint(tags_other)
+    return None
+
+def inspect_path(path : str, run : str | None = None, all_runs : bool = False) -> None:
+    '''prints an overview of path, depending on what kind of file it is'''
+    if os.path.isdir(path):
+        inspect_store(path)
+    elif not os.path.isfile(path):
+        raise FileNotFoundError(f'{path} does not exist.')
+    elif path.endswith(('.yaml', '.yml')):
+        inspect_results(path)
+    elif path.endswith('.jsonl'):
+        inspect_jsonl(path, run, all_runs)
+    elif path.lower().endswith('.cif'):
+        inspect_cif(path)
+    else:
+        inspect_infofile(path)
+    return None
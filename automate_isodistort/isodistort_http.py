@@ -0,0 +1,386 @@
+import os
+import uuid
+import mimetypes
+import urllib.request
+import urllib.parse
+import http.cookiejar
+from html.parser import HTMLParser
+from pathlib import Path
+from .results_parser import parse_mode_amplitudes
+from .timing import timed, job
+from .results_archive import archive_text
+
+
+"""
+Browserless backend: submits the ISODISTORT Method 4 forms directly over HTTP.
+
+The pages are parsed with the standard library HTML parser. Inputs on the basis
+transformation page are addressed by their position among the direct children of
+the form, so the same indices as in the XPaths of the Selenium backend are used
+(e.g. /html/body/div[2]/form/input[71] -> BASIS_SPECIFY_INPUT = 71).
+"""
+
+# hidden 'input' field values identifying the ISODISTORT forms
+PARENT_FORM_ID : str = 'uploadparentcif'
+METHOD4_FORM_ID : str = 'uploadsubgroupcif'
+
+# positions of the inputs on the basis transformation page (see transform_basis() in isodistort_selenium.py)
+BASIS_SPECIFY_INPUT : int = 71
+BASIS_MATRIX_INPUTS : range = range(72,81)
+ORIGIN_SPECIFY_INPUT : int = 82
+ORIGIN_SHIFT_INPUTS : range = range(83,86)
+# positions of the inputs on the distortion page (see generate_scaled_structures() in isodistort_selenium.py)
+CIF_OUTPUT_INPUT : int = 81
+DISTORT_OK_INPUT : int = 91
+
+BLOCK_TAGS : list = ['p', 'div', 'form', 'h1', 'h2', 'h3', 'h4', 'table', 'ul', 'ol', 'li', 'pre'] # tags implicitly closing an open <p>
+USER_AGENT : str = 'AUTOMATE_ISODISTORT (python urllib)'
+
+
+class PageParser(HTMLParser):
+    '''collects the forms, inputs and paragraph texts of an ISODISTORT page'''
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms : list[dict] = []
+        self.paragraphs : list[str] = []
+        self.text_boxes : list[dict] = [] # inputs with class 'span1' (mode amplitude boxes)
+        self._form : dict | None = None
+        self._stack : list[str] = [] # open elements inside the current form
+        self._child_counts : list[int] = [] # number of input children seen for each open element
+        self._paragraph : list[str] | None = None
+        self._select : dict | None = None
+        self._option : dict | None = None
+        self._textarea : dict | None = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k : (v if v is not None else '') for k,v in attrs}
+        if tag in BLOCK_TAGS and self._paragraph is not None:
+            self._close_paragraph()
+        if tag == 'p':
+            self._paragraph = []
+        elif tag == 'br' and self._paragraph is not None:
+            self._paragraph.append('\n')
+
+        if tag == 'form':
+            self._form = {
+                'action' : attrs.get('action', ''),
+                'method' : attrs.get('method', 'get').lower(),
+                'enctype' : attrs.get('enctype', 'application/x-www-form-urlencoded').lower(),
+                'fields' : [],
+            }
+            self.forms.append(self._form)
+            self._stack = []
+            self._child_counts = [0]
+            return
+
+        if tag == 'input':
+            field = self._new_field('input', attrs)
+            field['type'] = attrs.get('type', 'text').lower()
+            field['value'] = attrs.get('value', '')
+            field['checked'] = 'checked' in attrs
+            if 'span1' in attrs.get('class', '').split():
+                self.text_boxes.append(field)
+            if self._form is not None:
+                field['direct'] = not self._stack # direct child of the form element
+                self._child_counts[-1] += 1
+                field['position'] = self._child_counts[-1] # 1-based, as in XPath input[n]
+                self._form['fields'].append(field)
+            return
+        if tag == 'select':
+            self._select = self._new_field('select', attrs)
+            self._select['options'] = []
+            if self._form is not None:
+                self._form['fields'].append(self._select)
+            return
+        if tag == 'option' and self._select is not None:
+            self._option = {'value' : attrs.get('value'), 'selected' : 'selected' in attrs, 'text' : ''}
+            self._select['options'].append(self._option)
+            return
+        if tag == 'textarea':
+            self._textarea = self._new_field('textarea', attrs)
+            self._textarea['value'] = ''
+            if self._form is not None:
+                self._form['fields'].append(self._textarea)
+            return
+
+        if self._form is not None and tag not in ['br', 'img', 'hr', 'meta', 'link']:
+            if tag in BLOCK_TAGS and self._stack and self._stack[-1] == 'p': # <p> is closed implicitly
+                self._stack.pop()
+                self._child_counts.pop()
+            self._stack.append(tag)
+            self._child_counts.append(0)
+
+    def handle_endtag(self, tag):
+        if tag == 'p' or (tag in BLOCK_TAGS and self._paragraph is not None):
+            self._close_paragraph()
+        if tag == 'form':
+            self._form = None
+            self._stack = []
+            return
+        if tag == 'select':
+            self._select = None
+            return
+        if tag == 'option':
+            self._option = None
+            return
+        if tag == 'textarea':
+            self._textarea = None
+            return
+        if self._form is not None and tag in self._stack:
+            while self._stack: # also close elements that were left open
+                self._child_counts.pop()
+                if self._stack.pop() == tag:
+                    break
+
+    def handle_data(self, data):
+        if self._paragraph is not None:
+            self._paragraph.append(data)
+        if self._option is not None:
+            self._option['text'] += data
+        if self._textarea is not None:
+            self._textarea['value'] += data
+
+    def close(self):
+        super().close()
+        if self._paragraph is not None:
+            self._close_paragraph()
+
+    def _new_field(self, tag : str, attrs : dict) -> dict:
+        return {'tag' : tag, 'name' : attrs.get('name'), 'attrs' : attrs}
+
+    def _close_paragraph(self):
+        '''store the rendered text of a paragraph the way the browser reports it (one line per <br>)'''
+        lines = ''.join(self._paragraph).split('\n')
+        lines = [' '.join(line.split()) for line in lines]
+        self.paragraphs.append('\n'.join(lines).strip())
+        self._paragraph = None
+
+
+def parse_page(html : str) -> PageParser:
+    '''parse an ISODISTORT page'''
+    page = PageParser()
+    page.feed(html)
+    page.close()
+    return page
+
+def find_form(page : PageParser, form_id : str | None = None, predicate = None) -> dict:
+    '''returns the form whose hidden 'input' field matches form_id, or else the first form satisfying predicate'''
+    if form_id is not None:
+        for form in page.forms:
+            for field in form['fields']:
+                if field['name'] == 'input' and field.get('type') == 'hidden' and field.get('value') == form_id:
+                    return form
+    if predicate is not None:
+        for form in page.forms:
+            if predicate(form):
+                return form
+    raise LookupError(f"Could not find the form '{form_id}' on the ISODISTORT page")
+
+def has_file_input(form : dict) -> bool:
+    return any(f.get('type') == 'file' for f in form['fields'])
+
+def direct_input(form : dict, position : int) -> dict:
+    '''returns the input at XPath position form/input[position]'''
+    for field in form['fields']:
+        if field.get('direct') and field.get('position') == position:
+            return field
+    raise LookupError(f"The form has no input at position {position}")
+
+def click_radio(form : dict, field : dict) -> None:
+    '''select a radio button (unselecting the others of its group)'''
+    for other in form['fields']:
+        if other.get('type') == 'radio' and other['name'] == field['name']:
+            other['checked'] = False
+    field['checked'] = True
+    return None
+
+def form_data(form : dict, submit : dict | None = None) -> list[tuple[str,str]]:
+    '''collects (name, value) pairs the browser would send when submitting the form'''
+    data : list = []
+    for field in form['fields']:
+        name = field['name']
+        if not name or 'disabled' in field['attrs']:
+            continue
+        if field['tag'] == 'select':
+            options = field['options']
+            selected = [o for o in options if o['selected']] or options[:1]
+            for o in selected:
+                data.append((name, o['value'] if o['value'] is not None else o['text'].strip()))
+            continue
+        if field['tag'] == 'textarea':
+            data.append((name, field['value']))
+            continue
+        ftype = field['type']
+        if ftype in ['submit', 'button', 'image', 'reset', 'file']:
+            if ftype in ['submit', 'image'] and field is submit:
+                data.append((name, field['value']))
+            continue
+        if ftype in ['radio', 'checkbox'] and not field['checked']:
+            continue
+        data.append((name, field['value'] if (field['value'] or ftype not in ['radio', 'checkbox']) else 'on'))
+    return data
+
+def encode_multipart(data : list[tuple[str,str]], files : list[tuple[str,str]]) -> tuple[bytes,str]:
+    '''encodes form fields and (field name, file path) uploads as multipart/form-data'''
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for name, value in data:
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+        body += str(value).encode() + b'\r\n'
+    for name, path in files:
+        filename = os.path.basename(path)
+        ctype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'.encode()
+        body += f'Content-Type: {ctype}\r\n\r\n'.encode()
+        body += Path(path).read_bytes() + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode()
+    return bytes(body), f'multipart/form-data; boundary={boundary}'
+
+
+class IsodistortSession():
+    '''minimal browser stand-in that keeps cookies and the URL of the last page'''
+
+    def __init__(self, main_page : str, timeout : float = 60, record_dir : str | None = None):
+        self.main_page = main_page
+        self.url = main_page
+        self.timeout = timeout
+        self.record_dir = record_dir
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.opener.addheaders = [('User-Agent', USER_AGENT)]
+
+    @timed('main_page')
+    def open_main_page(self) -> PageParser:
+        return self._request(urllib.request.Request(self.main_page), 'index')
+
+    def submit(self, form : dict, files : list[tuple[str,str]] = [], submit : dict | None = None) -> PageParser:
+        '''submits a form as the browser would and parses the returned page'''
+        data = form_data(form, submit)
+        url = urllib.parse.urljoin(self.url, form['action'])
+        if form['method'] == 'post':
+            if files or form['enctype'] == 'multipart/form-data':
+                body, ctype = encode_multipart(data, files)
+            else:
+                body, ctype = urllib.parse.urlencode(data).encode(), 'application/x-www-form-urlencoded'
+            request = urllib.request.Request(url, data=body, headers={'Content-Type' : ctype})
+        else:
+            request = urllib.request.Request(url + '?' + urllib.parse.urlencode(data))
+        form_id = dict(data).get('input', 'page')
+        return self._request(request, form_id)
+
+    def _request(self, request, name : str) -> PageParser:
+        with self.opener.open(request, timeout=self.timeout) as response:
+            self.url = response.geturl()
+            charset = response.headers.get_content_charset() or 'latin-1'
+            html = response.read().decode(charset, errors='replace')
+        if self.record_dir is not None: # keep a copy of the page, e.g. for replaying it with mock_server.py
+            os.makedirs(self.record_dir, exist_ok=True)
+            Path(self.record_dir, f'{name}.html').write_text(html)
+        page = parse_page(html)
+        page.html = html
+        return page
+
+
+"""
+Functions for walking through Method 4
+"""
+
+@timed('parent_upload')
+def upload_parent_struct_http(parent_struct : str, session : IsodistortSession) -> PageParser:
+    '''uploads parent structure file to main page, returns the page with the Method 4 form'''
+    print('Uploading parent structure file...', end="")
+    main = session.open_main_page()
+    form = find_form(main, PARENT_FORM_ID, has_file_input)
+    file_field = [f for f in form['fields'] if f.get('type') == 'file'][0]
+    page = session.submit(form, files=[(file_field['name'], parent_struct)])
+    print("Done!")
+    return page
+
+@timed('child_upload')
+def upload_child_struct_http(child_struct : str, method4_page : PageParser, session : IsodistortSession) -> PageParser:
+    '''uploads child structure file to Method 4, returns the basis transformation page'''
+    print('Uploading child structure file...', end="")
+    forms_with_upload = [f for f in method4_page.forms if has_file_input(f)]
+    form = find_form(method4_page, METHOD4_FORM_ID, lambda f: f is forms_with_upload[-1])
+    file_field = [f for f in form['fields'] if f.get('type') == 'file'][0]
+    page = session.submit(form, files=[(file_field['name'], child_struct)])
+    if not page.forms:
+        raise RuntimeError("No basis transformation page returned - probably some error while uploading the child structure.")
+    print("Done!")
+    return page
+
+@timed('basis_page')
+def transform_basis_http(transformation_matrix, origin_shift, basis_page : PageParser, session : IsodistortSession) -> PageParser:
+    '''fills in the basis transformation matrix (and origin shift) explicitly, returns the distortion results page'''
+    matrix = [str(x) for x in transformation_matrix.flatten()]
+    print('Transforming basis...', end="")
+    form = [f for f in basis_page.forms if sum(1 for i in f['fields'] if i.get('direct')) >= ORIGIN_SHIFT_INPUTS[-1]][0]
+    click_radio(form, direct_input(form, BASIS_SPECIFY_INPUT)) # 'specify basis as'
+    for i,el in enumerate(BASIS_MATRIX_INPUTS):
+        direct_input(form, el)['value'] = matrix[i]
+    if origin_shift is not None:
+        print("Done!")
+        print('Shifting origin...', end="")
+        click_radio(form, direct_input(form, ORIGIN_SPECIFY_INPUT))
+        for i,x in enumerate(ORIGIN_SHIFT_INPUTS):
+            direct_input(form, x)['value'] = str(origin_shift[i])
+    submit = [f for f in form['fields'] if f.get('type') == 'submit' and not f.get('direct')]
+    page = session.submit(form, submit=submit[0] if submit else None)
+    if not page.text_boxes:
+        raise RuntimeError("No mode amplitudes returned - check the basis transformation matrix and origin shift.")
+    print("Done!")
+    return page
+
+@timed('results_parsing')
+def read_mode_amplitudes_http(results_page : PageParser, debug : bool = False) -> tuple[dict,dict]:
+    '''reads info from distortion results page, outputs info on each distortion mode and A_p mode amplitudes with labels'''
+    print('Reading mode amplitudes...', end="")
+    return mode_amplitudes_from_page(results_page, debug)
+
+def mode_amplitudes_from_page(results_page : PageParser, debug : bool = False) -> tuple[dict,dict]:
+    box_names = [box['name'] or '' for box in results_page.text_boxes]
+    box_values = [box['value'] for box in results_page.text_boxes]
+    return parse_mode_amplitudes(box_names, box_values, results_page.paragraphs, debug=debug)
+
+def parse_results_html(html : str, debug : bool = False) -> tuple[dict,dict]:
+    '''(results, labels) of a stored distortion results page, e.g. from the archive (see results_archive.py)'''
+    return mode_amplitudes_from_page(parse_page(html), debug)
+
+@timed('mode_basis_download')
+def download_structure_http(results_page : PageParser, session : IsodistortSession, destination : str) -> str:
+    '''requests the CIF of the structure on the distortion page (e.g. the mode definitions for the local engine), returns its path'''
+    print('Downloading CIF...', end="")
+    form = [f for f in results_page.forms if any(i.get('direct') and i.get('position') == DISTORT_OK_INPUT for i in f['fields'])][0]
+    click_radio(form, direct_input(form, CIF_OUTPUT_INPUT))
+    page = session.submit(form, submit=direct_input(form, DISTORT_OK_INPUT))
+    if '_iso_' not in page.html:
+        raise RuntimeError("ISODISTORT did not return a CIF.")
+    Path(destination).write_text(page.html)
+    print("Done!")
+    return destination
+
+def decompose_http(main_page : str, parent_struct : str, child_struct : str, transformation_matrix, origin_shift, debug : bool = False, record_dir : str | None = None, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''complete Method 4 mode decomposition over HTTP, returns the same (results, labels) pair as the Selenium backend'''
+    session = IsodistortSession(main_page, record_dir=record_dir)
+    method4_page = upload_parent_struct_http(parent_struct, session)
+    basis_page = upload_child_struct_http(child_struct, method4_page, session)
+    results_page = transform_basis_http(transformation_matrix, origin_shift, basis_page, session)
+    if archive_dir is not None:
+        archive_text(archive_dir, parent_struct, child_struct, transformation_matrix, origin_shift, results_page.html)
+    return read_mode_amplitudes_http(results_page, debug=debug)
+
+def decompose_series_http(main_page : str, parent_struct : str, child_structs : list[str], transformation_matrix, origin_shift, debug : bool = False, record_dir : str | None = None, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''decomposes several child structures against one parent upload, returns results and labels keyed by child file'''
+    session = IsodistortSession(main_page, record_dir=record_dir)
+    method4_page = upload_parent_struct_http(parent_struct, session)
+    series_results : dict = {}
+    series_labels : dict = {}
+    for i, child in enumerate(child_structs):
+        print(f"child structure {i+1}/{len(child_structs)}: {child}")
+        with job(child):
+            basis_page = upload_child_struct_http(child, method4_page, session) # the Method 4 form page is reused for every child
+            results_page = transform_basis_http(transformation_matrix, origin_shift, basis_page, session)
+            if archive_dir is not None: # before parsing, so the page is kept even if the parser fails
+                archive_text(archive_dir, parent_struct, child, transformation_matrix, origin_shift, results_page.html)
+            series_results[child], series_labels[child] = read_mode_amplitudes_http(results_page, debug=debug)
+    return series_results, series_labels
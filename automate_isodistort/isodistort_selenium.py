@@ -0,0 +1,255 @@
+import os
+import time
+import pprint
+import warnings
+from pathlib import Path
+import numpy as np # type: ignore
+from selenium.common.exceptions import NoSuchWindowException, TimeoutException # type: ignore
+from selenium.webdriver.common.by import By # type: ignore
+from .files import file_check
+from .results_parser import parse_mode_amplitudes
+from .page_waits import PageLoadError, wait_for_page_load, wait_for_windows, stage_timeout, record_latency
+from .mode_scaling import point_amplitudes
+from .timing import timed, span, job
+from .results_archive import archive_text
+
+
+"""
+Selenium backend: operates the ISODISTORT web pages in a Chrome session (see browser.py).
+"""
+
+@timed('parent_upload')
+def upload_parent_struct(parent_struct : str, driver) -> None:
+    '''uploads parent structure file to main page'''
+    filepath = file_check(parent_struct)
+    print('Uploading parent structure file...', end="")
+    upload_parent_button = driver.find_element(By.XPATH, "/html/body/div[2]/div[1]/ul/form/input[3]")
+    upload_parent_button.send_keys(filepath) # upload parent file on first page
+    wait_for_page_load('/html/body/div[2]/div[1]/ul/form/input[2]', driver, 'parent_file_selected') # wait for OK button to be clickable
+    OK_button_1 = driver.find_element(By.XPATH, "/html/body/div[2]/div[1]/ul/form/input[2]")
+    OK_button_1.click() #click OK on first page
+    wait_for_page_load('/html/body/div[2]/div[5]/form/h3/input', driver, 'method4_page') # wait for child upload OK button to be clickable
+    print("Done!")
+    return None
+
+@timed('child_upload')
+def upload_child_struct(child_struct : str, driver, wait) -> None:
+    '''uploads child structure file to Method 4'''
+    filepath = file_check(child_struct)
+    print('Uploading child structure file...', end="")
+    upload_child_button = driver.find_element(By.XPATH, '/html/body/div[2]/div[5]/form/p/input[67]')
+    upload_child_button.send_keys(filepath) # upload child file on first page 
+    OK_button_2 = driver.find_element(By.XPATH, "/html/body/div[2]/div[5]/form/h3/input") 
+    OK_button_2.click() # click OK on second page
+    wait_for_windows(driver, 2, 'child_tab') # wait until second tab opens
+    try: 
+        driver.switch_to.window(driver.window_handles[1]) # switch to second tab
+    except NoSuchWindowException:
+        raise PageLoadError("Can't switch to second window - probably some error while uploading the child structure.")
+    wait_for_page_load("/html/body/div[2]/form/p[1]/input", driver, 'basis_page') # wait for OK button on basis transformation page to load
+    print("Done!")
+    return None
+
+@timed('basis_page')
+def transform_basis(transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, driver) -> None:
+    '''fills in the basis transformation matrix explicitly'''
+    matrix = np.asarray(transformation_matrix.flatten(), dtype=str) # convert transformation matrix to 1D array of strings
+    print('Transforming basis...', end="")
+    specify_basis_button = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[71]")
+    specify_basis_button.click() # click 'specify basis as' on third page
+    OK_button_3 = driver.find_element(By.XPATH, "/html/body/div[2]/form/p[1]/input")
+
+    # fill basis transformation matrix
+    for i,el in enumerate(range(72,81)):
+        basis_element = driver.find_element(By.XPATH, f"/html/body/div[2]/form/input[{el}]") # textbox for matrix element in basis transformation matrix
+        basis_element.clear()
+        basis_element.send_keys(matrix[i])
+
+    # fill origin shift if requested    
+    if origin_shift is not None:
+        print("Done!")
+        print('Shifting origin...', end="")
+        specify_origin_button = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[82]")
+        specify_origin_button.click()
+        for i,x in enumerate(range(83,86)):
+            origin_element = driver.find_element(By.XPATH, f"/html/body/div[2]/form/input[{x}]")
+            origin_element.clear()
+            origin_element.send_keys(str(origin_shift[i]))
+
+    OK_button_3.click() # click OK on third page
+    wait_for_page_load('/html/body/div[2]/form/input[91]', driver, 'distortion_page') # raises PageLoadError e.g. if the basis is incorrect
+    print("Done!")
+    return None
+
+# reads names and values of all text boxes and the text of all paragraphs in one WebDriver call
+EXTRACT_PAGE_SCRIPT : str = """
+const boxes = Array.from(document.getElementsByClassName('span1'));
+return [
+    boxes.map(el => el.getAttribute('name')),
+    boxes.map(el => el.value),
+    Array.from(document.getElementsByTagName('p'), el => el.innerText)
+];
+"""
+
+def normalise_text(text : str) -> str:
+    '''collapse whitespace within lines the same way WebElement.text does'''
+    return '\n'.join(' '.join(line.split()) for line in text.split('\n')).strip()
+
+def extract_page_elements(driver) -> tuple[list,list,list]:
+    '''reads text box names/values and paragraph texts element by element (one WebDriver round trip per attribute)'''
+    text_boxes = driver.find_elements(By.CLASS_NAME, 'span1')
+    box_names : list[str] = []
+    box_values : list[str] = []
+    for ap in range(len(text_boxes)):
+        box_names.append(text_boxes[ap].get_attribute("name")) # internal mode label, not corresponding to label next to text boxes <--- boxlabel
+        box_values.append(text_boxes[ap].get_attribute("value"))
+    paragraphs = [p.text for p in driver.find_elements(By.TAG_NAME, 'p')]
+    return box_names, box_values, paragraphs
+
+def extract_page_script(driver) -> tuple[list,list,list]:
+    '''reads text box names/values and paragraph texts with a single injected script'''
+    box_names, box_values, paragraphs = driver.execute_script(EXTRACT_PAGE_SCRIPT)
+    return box_names, box_values, [normalise_text(p) for p in paragraphs]
+
+@timed('results_parsing')
+def read_mode_amplitudes(driver, extractor = extract_page_script, debug : bool = False) -> tuple[dict,dict]:
+    '''reads info from distortion results page, outputs info on each distortion mode and A_p mode amplitudes with labels'''
+    print('Reading mode amplitudes...', end="")
+    box_names, box_values, paragraphs = extractor(driver)
+    return parse_mode_amplitudes(box_names, box_values, paragraphs, debug=debug)
+
+def benchmark_extractors(driver, repeats : int = 3) -> dict:
+    '''times the element-by-element and the single-script extraction of the results page and checks that they agree'''
+    timings : dict = {}
+    outputs : dict = {}
+    for extractor in [extract_page_elements, extract_page_script]:
+        times : list[float] = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs[extractor.__name__] = extractor(driver)
+            times.append(time.perf_counter() - start)
+        timings[extractor.__name__] = min(times)
+    old, new = outputs['extract_page_elements'], outputs['extract_page_script']
+    agree = old[:2] == new[:2] and [normalise_text(p) for p in old[2]] == new[2]
+    print(f"Extracting results page: element by element {timings['extract_page_elements']:.3f} s, "
+          f"single script {timings['extract_page_script']:.3f} s ({len(old[0])} text boxes, {len(old[2])} paragraphs)")
+    if not agree:
+        warnings.warn("The two extraction methods returned different page contents!")
+    return timings
+
+def close_child_tab(driver) -> None:
+    '''closes the tab opened by the child upload and returns to the Method 4 form page'''
+    if len(driver.window_handles) > 1:
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+    return None
+
+def decompose_series(child_structs : list[str], transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, driver, wait, debug : bool = False, parent_struct : str | None = None, archive_dir : str | None = None) -> tuple[dict,dict]:
+    '''decomposes several child structures against the parent structure already uploaded in this session, returns results and labels keyed by child file'''
+    series_results : dict = {}
+    series_labels : dict = {}
+    for i, child in enumerate(child_structs):
+        print(f"child structure {i+1}/{len(child_structs)}: {child}")
+        with job(child):
+            upload_child_struct(child, driver, wait) # submitted from the Method 4 form page kept in the first tab
+            transform_basis(transformation_matrix, origin_shift, driver)
+            if archive_dir is not None: # before parsing, so the page is kept even if the parser fails
+                archive_text(archive_dir, parent_struct, child, transformation_matrix, origin_shift, driver.page_source)
+            mode_amplitudes, box_labels = read_mode_amplitudes(driver, debug=debug)
+        series_results[child] = mode_amplitudes
+        series_labels[child] = box_labels
+        close_child_tab(driver)
+    return series_results, series_labels
+
+# index of the amplitude text boxes on the distortion page: boxlabel -> position among the span1 elements
+INDEX_BOXES_SCRIPT : str = """
+return Array.from(document.getElementsByClassName('span1'), el => el.getAttribute('name'));
+"""
+
+# writes all amplitudes of one step at once: arguments[0] are box positions, arguments[1] the values
+FILL_BOXES_SCRIPT : str = """
+const boxes = document.getElementsByClassName('span1');
+const positions = arguments[0];
+const values = arguments[1];
+for (let i = 0; i < positions.length; i++) {
+    boxes[positions[i]].value = values[i];
+}
+"""
+
+def index_text_boxes(driver) -> dict[str,int]:
+    '''builds the boxlabel -> text box position index of the current page in one WebDriver call'''
+    names = driver.execute_script(INDEX_BOXES_SCRIPT)
+    return {name : i for i, name in enumerate(names)}
+
+def fill_text_boxes(driver, box_index : dict[str,int], values : dict[str,float]) -> None:
+    '''writes the amplitudes (keyed by boxlabel) into the text boxes in one WebDriver call'''
+    missing = [label for label in values.keys() if label not in box_index]
+    if missing:
+        raise KeyError(f"No text boxes found on the distortion page for {', '.join(missing)}")
+    driver.execute_script(FILL_BOXES_SCRIPT, [box_index[label] for label in values.keys()], [str(v) for v in values.values()])
+    return None
+
+# submits the distortion form with 'CIF file' selected from within the page and returns the response,
+# so the CIF is captured in memory instead of being downloaded: arguments[0] is the OK button
+CREATE_CIF_SCRIPT : str = """
+const done = arguments[arguments.length - 1];
+const button = arguments[0];
+const data = new URLSearchParams(new FormData(button.form));
+if (button.name) data.append(button.name, button.value);
+fetch(button.form.action, {method: 'POST', body: data, credentials: 'same-origin'})
+    .then(response => response.text())
+    .then(done, error => done('ERROR: ' + error));
+"""
+
+def create_cif(driver, write_cif_button, OK_button_4) -> str:
+    '''CIF of the structure currently set up on the distortion page'''
+    write_cif_button.click() # select 'CIF file' as output
+    timeout = stage_timeout('create_cif')
+    driver.set_script_timeout(timeout)
+    started = time.perf_counter()
+    try:
+        text = driver.execute_async_script(CREATE_CIF_SCRIPT, OK_button_4)
+    except TimeoutException:
+        raise PageLoadError(f'Timed out after {timeout:.1f} s waiting for the CIF (create_cif).')
+    if text is None or text.startswith('ERROR: ') or '_iso_' not in text:
+        raise PageLoadError(f"ISODISTORT did not return a CIF: {(text or '')[:200]}")
+    record_latency('create_cif', time.perf_counter() - started)
+    return text
+
+def generate_scaled_structures(points, mode_amplitudes : dict, box_labels : dict, output, driver, wait, scale_strains : bool = False, debug : bool = False) -> list[float]:
+    '''uses create cif functionality on ISODISTORT to generate the structures with scaled mode amplitudes for each scan point and hands them to output (see scan_output.py), returns the time taken per structure'''
+    write_cif_button = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[81]")
+    OK_button_4 = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[91]")
+    box_index = index_text_boxes(driver) # built once, the page stays the same for all steps
+    print('Generating structures with scaled mode amplitudes...')
+    timings : list[float] = []
+    for i, point in enumerate(points): # points are generated lazily
+        step_start = time.perf_counter()
+        if debug: print(f"structure {i+1} (scaling factors: {point})")
+        # fill in all mode amplitude text boxes of this step at once
+        values = point_amplitudes(point, mode_amplitudes, box_labels, scale_strains)
+        if debug: pprint.pprint(values)
+        with job(f'structure_s{i}'):
+            with span('fill_amplitudes'):
+                fill_text_boxes(driver, box_index, values)
+
+            print(f"Creating cif no. {i+1}...", end="")
+            with span('create_cif'):
+                text = create_cif(driver, write_cif_button, OK_button_4)
+            output.write(i, text, point)
+        timings.append(time.perf_counter() - step_start)
+        print(f"Done! ({timings[-1]:.2f} s)")
+
+    print(f"Created {len(timings)} structures in {sum(timings):.2f} s ({sum(timings)/max(len(timings),1):.2f} s per structure).")
+    return timings
+
+@timed('mode_basis_download')
+def fetch_mode_basis(destination : str, driver, wait) -> str:
+    '''saves the CIF of the child structure from the distortion page, which contains the mode definitions for the local engine'''
+    print('Downloading mode definitions...', end="")
+    write_cif_button = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[81]")
+    OK_button_4 = driver.find_element(By.XPATH, "/html/body/div[2]/form/input[91]")
+    filepath = os.path.join(destination, 'mode_basis.cif')
+    Path(filepath).write_text(create_cif(driver, write_cif_button, OK_button_4))
+    print('Done!')
+    return filepath
@@ -0,0 +1,52 @@
+import os
+import json
+import time
+
+
+"""
+Append-only job journal (JSON lines).
+
+Every state change of a job (started, done, failed) is appended as one line, results included
+for finished jobs. Reading the journal back gives the last state of every job, so an interrupted
+series can be resumed by skipping the jobs that are done.
+"""
+
+def journal_record(journal : str, job : str, state : str, **fields) -> None:
+    '''appends one record to the journal and makes sure it is on disk'''
+    record : dict = {'job' : job, 'state' : state, 'time' : time.strftime('%Y-%m-%d %H:%M:%S')}
+    record.update(fields)
+    line = json.dumps(record) + '\n'
+    with open(journal, 'a') as ff: # small appends of whole lines are safe with several worker processes
+        ff.write(line)
+        ff.flush()
+        os.fsync(ff.fileno())
+    return None
+
+def read_journal(journal : str) -> dict[str,dict]:
+    '''last record of every job in the journal'''
+    jobs : dict = {}
+    if not os.path.isfile(journal):
+        return jobs
+    with open(journal, 'r') as ff:
+        for line in ff:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError: # line cut off by a crash
+                continue
+            jobs[record['job']] = record
+    return jobs
+
+def finished_jobs(journal : str) -> dict[str,dict]:
+    '''records of all jobs whose last state is done'''
+    return {job : record for job, record in read_journal(journal).items() if record['state'] == 'done'}
+
+def journal_summary(journal : str) -> dict[str,int]:
+    '''number of jobs in each state'''
+    summary : dict = {}
+    for record in read_journal(journal).values():
+        summary[record['state']] = summary.get(record['state'], 0) + 1
+    return summary
+
+def backoff_delay(attempt : int, backoff : float) -> float:
+    '''exponential backoff before the given (1-based) attempt'''
+    return 0.0 if attempt <= 1 else backoff * 2**(attempt - 2)
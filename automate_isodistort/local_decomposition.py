@@ -0,0 +1,116 @@
+import numpy as np # type: ignore
+from .cif_tools import read_cif, cell_parameters, lattice_vectors
+from .preflight import expand_sites, site_elements
+from .mode_scaling import mode_columns
+
+
+"""
+Local engine for the mode decomposition of a series of child structures (DECOMPOSE_ENGINE : local).
+
+The mode basis (see read_mode_basis in mode_scaling.py) is fetched from ISODISTORT once per
+parent, basis transformation and origin shift. Every child atom is matched to the nearest
+undistorted site of the same element, and the coordinate shifts and the strain of the cell
+are projected onto the displacive and strain mode matrices by least squares:
+
+    delta coordinates = (displacive mode matrix) x amplitudes
+    Voigt strain      = (strain mode matrix) x strain amplitudes
+
+All children of the series are solved at once (one right hand side per child). Shifts the
+basis cannot describe, e.g. a child of lower symmetry than the reference structure, remain as
+residual; such children are left to ISODISTORT. The amplitudes are returned in the format of
+read_mode_amplitudes(), using the results of the reference structure as template.
+"""
+
+LOCAL_TOLERANCE : float = 1e-3 # largest deviation of a mode amplitude from ISODISTORT on the validation sample
+RESIDUAL_TOLERANCE : float = 1e-3 # largest coordinate shift (fractional) or strain component the basis may leave unexplained
+BASIS_SUFFIX : str = '_modes.cif' # the mode basis in the cache, key from basis_key()
+
+def site_shifts(basis : dict, child : dict) -> np.ndarray:
+    '''fractional shifts (n_sites x 3) of the child atoms from the undistorted sites of the basis, nearest atom of the same element'''
+    elements, xyz = expand_sites(child)
+    elements = np.array(elements)
+    vectors = lattice_vectors(cell_parameters(child))
+    site_elems = np.array(site_elements(basis['cif']) or ['X'] * len(basis['undistorted']))
+    shifts = np.zeros_like(basis['undistorted'])
+    for element in set(site_elems):
+        atoms = xyz[elements == element]
+        if not len(atoms):
+            raise ValueError(f'The child structure contains no {element} atoms, but the mode basis does.')
+        diff = atoms[np.newaxis, :, :] - basis['undistorted'][site_elems == element][:, np.newaxis, :] # (n_sites, n_atoms, 3)
+        diff -= np.round(diff)
+        nearest = np.argmin(np.sum((diff @ vectors)**2, axis=-1), axis=1)
+        shifts[site_elems == element] = diff[np.arange(len(nearest)), nearest]
+    return shifts
+
+def cell_strain(basis : dict, child : dict) -> np.ndarray:
+    '''Voigt components (e4..e6 engineering shear) of the strain e with child cell = undistorted cell x (1 + e)'''
+    inverse = np.linalg.inv(basis['undistorted_cell'])
+    vectors = lattice_vectors(cell_parameters(child))
+    # (1 + e)^2 from the metric tensor, so the orientation of the child cell does not matter
+    values, axes = np.linalg.eigh(inverse @ vectors @ vectors.T @ inverse.T)
+    e = axes @ np.diag(np.sqrt(values)) @ axes.T - np.eye(3)
+    return np.array([e[0,0], e[1,1], e[2,2], 2*e[1,2], 2*e[0,2], 2*e[0,1]])
+
+def project_modes(basis : dict, shifts : np.ndarray, strains : np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''displacive (n_children x n_modes) and strain (n_children x n_strains) amplitudes and the largest residual of every child
+    shifts (n_children x n_sites x 3) and strains (n_children x 6) are projected onto the mode matrices in one least squares solve each
+    '''
+    shifts = shifts.reshape(len(shifts), -1)
+    deltas = shifts[:, basis['coordinate_index']]
+    amplitudes = np.linalg.lstsq(basis['matrix'], deltas.T, rcond=None)[0].T
+    fitted = np.zeros_like(shifts) # coordinates fixed by symmetry must not move at all
+    fitted[:, basis['coordinate_index']] = amplitudes @ basis['matrix'].T
+    residuals = np.abs(shifts - fitted).max(axis=1)
+    S = basis['strain_matrix']
+    if S.shape[1]:
+        strain_amplitudes = np.linalg.lstsq(S, strains.T, rcond=None)[0].T
+        residuals = np.maximum(residuals, np.abs(strains - strain_amplitudes @ S.T).max(axis=1))
+    else:
+        strain_amplitudes = np.zeros((len(strains), 0))
+    return amplitudes, strain_amplitudes, residuals
+
+def results_from_amplitudes(template_results : dict, template_labels : dict, displacive : dict[str,int], strain : dict[str,int], amplitudes : np.ndarray, strain_amplitudes : np.ndarray) -> dict:
+    '''amplitudes of one child in the format of read_mode_amplitudes(), with the irreps and info of the template'''
+    results : dict = {}
+    for irrep, entry in template_results.items():
+        components : dict = {}
+        for comp, boxlabel in template_labels[irrep].items():
+            value = strain_amplitudes[strain[boxlabel]] if 'strain' in comp else amplitudes[displacive[boxlabel]]
+            components[comp] = round(float(value), 5)
+        results[irrep] = {'info' : dict(entry['info']), 'components' : components}
+    return results
+
+def decompose_locally(basis : dict, template_results : dict, template_labels : dict, child_structs : list[str]) -> tuple[dict, dict, dict[str,float]]:
+    '''results, labels and largest residual of the child structures, keyed by child file
+    template_results and template_labels are the ISODISTORT results of the structure the basis was created for (page order)
+    '''
+    displacive, strain = mode_columns(basis, template_labels)
+    if len(strain) != basis['strain_matrix'].shape[1]:
+        raise ValueError(f"The distortion page has {len(strain)} strain modes but the mode basis contains {basis['strain_matrix'].shape[1]}.")
+    children = [read_cif(child) for child in child_structs]
+    shifts = np.array([site_shifts(basis, child) for child in children])
+    strains = np.array([cell_strain(basis, child) for child in children]).reshape(len(children), 6)
+    amplitudes, strain_amplitudes, residuals = project_modes(basis, shifts, strains)
+    series_results : dict = {}
+    series_labels : dict = {}
+    for k, child in enumerate(child_structs):
+        series_results[child] = results_from_amplitudes(template_results, template_labels, displacive, strain, amplitudes[k], strain_amplitudes[k])
+        series_labels[child] = {irrep : dict(comps) for irrep, comps in template_labels.items()}
+    return series_results, series_labels, {child : float(r) for child, r in zip(child_structs, residuals)}
+
+def results_deviation(local : dict, reference : dict) -> float:
+    '''largest difference of a mode amplitude between two results dicts, infinite if they do not have the same modes'''
+    deviation = 0.0
+    for irrep, entry in reference.items():
+        if irrep not in local or set(local[irrep]['components']) != set(entry['components']):
+            return float('inf')
+        for comp, value in entry['components'].items():
+            deviation = max(deviation, abs(local[irrep]['components'][comp] - float(value)))
+    return deviation if set(local) == set(reference) else float('inf')
+
+def validation_sample(child_structs : list[str], size : int) -> list[str]:
+    '''size structures spread evenly over the series, including the first one (the reference for the basis)'''
+    if size >= len(child_structs):
+        return list(child_structs)
+    picks = np.round(np.linspace(0, len(child_structs) - 1, max(1, size))).astype(int)
+    return [child_structs[k] for k in sorted(set(picks))]
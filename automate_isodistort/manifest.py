@@ -0,0 +1,204 @@
+import os
+import json
+import warnings
+import itertools
+from pathlib import Path
+import numpy as np # type: ignore
+import yaml # type: ignore
+from .files import file_check, expand_file_list
+from .infofile import text_tags, option_tags_bool, option_tags_other, read_bool_tag, convert_tags
+from .mode_scaling import parse_scan_ranges
+
+
+"""
+Job manifests: many decomposition/scaling jobs in one YAML file.
+
+    defaults:             tags shared by all jobs (same names and values as in an infofile)
+      PARENT_FILE : parent.cif
+      BASIS_TRANSFORM : 1 0 0 0 1 0 0 0 1
+    jobs:
+      - name : series     every job gets its own OUTPUT_DIR (default: its name)
+        DISTORTED_FILE : low_T/*_sym.cif
+      - name : origins
+        DISTORTED_FILE : child.cif
+        sweep:            one job for every combination of the listed values
+          ORIGIN_SHIFT : [0 0 0, 0.5 0 0]
+
+The manifest is expanded, checked and deduplicated as a whole (plan_jobs) before the first job
+is sent to ISODISTORT, so a typo in the last job does not show up hours into a campaign.
+"""
+
+KNOWN_TAGS : set = {'WEBDRIVER_PATH', 'MAIN_PAGE'} | set(text_tags) | set(option_tags_bool) | set(option_tags_other)
+TAG_CHOICES : dict = {
+    'BACKEND' : ('selenium', 'http'),
+    'DECOMPOSE_ENGINE' : ('isodistort', 'local'),
+    'SCALEMODES_ENGINE' : ('isodistort', 'local'),
+    'SCALEMODES_GRID' : ('linear', 'cartesian', 'list'),
+    'SCALEMODES_OUTPUT' : ('files', 'zip'),
+}
+INT_TAGS : tuple = ('NUM_WORKERS', 'MAX_ATTEMPTS', 'SCALEMODES_STEPS', 'LOCAL_SAMPLE')
+FLOAT_TAGS : tuple = ('SCALEMODES_MIN', 'SCALEMODES_MAX', 'CACHE_MAX_SIZE', 'RETRY_BACKOFF', 'CELL_TOLERANCE', 'LOCAL_TOLERANCE')
+PATH_TAGS : tuple = ('PARENT_FILE', 'DISTORTED_FILE', 'OUTPUT_DIR', 'JOURNAL_FILE', 'STORE_DIR', 'ARCHIVE_DIR', 'CACHE_DIR', 'DOWNLOAD_DIR', 'RECORD_DIR', 'TRACE_FILE', 'SCALEMODES_GRID_FILE')
+
+def tag_text(value) -> str:
+    '''YAML value of a tag as the text it would have in an infofile'''
+    if isinstance(value, bool):
+        return 'T' if value else 'F'
+    if isinstance(value, (list, tuple)):
+        return ' '.join(tag_text(v) for v in value)
+    return str(value)
+
+def job_tags(entries : dict) -> dict[str,str]:
+    return {str(tag).upper() : tag_text(value) for tag, value in entries.items() if value is not None}
+
+def read_manifest(path : str) -> dict:
+    manifest = yaml.safe_load(Path(path).read_text())
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('jobs'), list) or not manifest['jobs']:
+        raise ValueError(f'{path} is not a job manifest (needs a list of jobs under "jobs").')
+    if not isinstance(manifest.get('defaults', {}), dict) or not all(isinstance(entry, dict) for entry in manifest['jobs']):
+        raise ValueError(f'{path}: "defaults" and every job need to be mappings of tags to values.')
+    return manifest
+
+def resolve_paths(tags : dict[str,str], base : str) -> dict[str,str]:
+    '''tags with the relative paths of PATH_TAGS (for DISTORTED_FILE every file or pattern of the list) taken relative to base'''
+    resolved = dict(tags)
+    for tag in PATH_TAGS:
+        if tag in resolved:
+            entries = resolved[tag].split() if tag == 'DISTORTED_FILE' else [resolved[tag]]
+            resolved[tag] = ' '.join(os.path.join(base, os.path.expanduser(entry)) for entry in entries) # joining keeps absolute paths
+    return resolved
+
+def expand_jobs(manifest : dict, base : str = '.') -> list[dict]:
+    '''one {name, tags, sweep} dict per job and combination of sweep values, in manifest order
+    relative paths are taken relative to base, the directory of the manifest
+    '''
+    defaults = job_tags(manifest.get('defaults') or {})
+    jobs : list[dict] = []
+    for n, entry in enumerate(manifest['jobs']):
+        entry = dict(entry)
+        name = str(entry.pop('name', f'job{n+1}'))
+        sweep = {str(tag).upper() : (values if isinstance(values, list) else [values]) for tag, values in (entry.pop('sweep', None) or {}).items()}
+        tags = {**defaults, **job_tags(entry)}
+        combinations = list(itertools.product(*sweep.values()))
+        for k, combination in enumerate(combinations):
+            variant = {tag : tag_text(value) for tag, value in zip(sweep.keys(), combination)}
+            suffix = f'_{k+1}' if len(combinations) > 1 else ''
+            variant_tags = {**tags, **variant}
+            variant_tags['OUTPUT_DIR'] = variant_tags.get('OUTPUT_DIR', name) + suffix
+            jobs.append({'name' : name + suffix, 'tags' : resolve_paths(variant_tags, base), 'sweep' : variant})
+    return jobs
+
+def check_job(tags : dict[str,str]) -> tuple[tuple | None, list[str]]:
+    '''settings (as from read_usr_info) and problems of one job, without touching the network'''
+    problems = [f'unknown tag {tag}' for tag in tags if tag not in KNOWN_TAGS]
+    problems += [f'invalid value for {tag}: {tags[tag]}' for tag in option_tags_bool if tag in tags and read_bool_tag(tags[tag]) is None]
+    try:
+        with warnings.catch_warnings(): # unset optional tags are expected here
+            warnings.simplefilter('ignore')
+            webdrv_path, main_page, walker_text, tags_bool, tags_other = convert_tags(tags)
+    except KeyError as err:
+        return None, problems + [str(err.args[0])]
+    for tag, choices in TAG_CHOICES.items():
+        if str(tags_other[tag]).lower() not in choices:
+            problems.append(f"{tag} needs to be one of {', '.join(choices)}, not {tags_other[tag]}")
+    for tag, kind in [(tag, int) for tag in INT_TAGS] + [(tag, float) for tag in FLOAT_TAGS]:
+        try:
+            kind(tags_other[tag])
+        except ValueError:
+            problems.append(f'invalid value for {tag}: {tags_other[tag]}')
+    try:
+        walker_text['PARENT_FILE'] = file_check(walker_text['PARENT_FILE'])
+    except FileNotFoundError as err:
+        problems.append(str(err))
+    try:
+        walker_text['DISTORTED_FILE'] = expand_file_list(walker_text['DISTORTED_FILE'])
+    except FileNotFoundError as err:
+        problems.append(str(err))
+    if tags_bool['SCALEMODES']:
+        if isinstance(walker_text['DISTORTED_FILE'], list) and len(walker_text['DISTORTED_FILE']) > 1:
+            problems.append('scaling of modes is only possible for a single DISTORTED_FILE')
+        if tags_other['SCALEMODES_RANGES'] is not None:
+            try:
+                parse_scan_ranges(tags_other['SCALEMODES_RANGES'])
+            except (KeyError, AttributeError, ValueError) as err:
+                problems.append(str(err.args[0]))
+        elif tags_other['SCALEMODES_LABELS'] is None:
+            problems.append('scaling of modes was requested but no SCALEMODES_LABELS or SCALEMODES_RANGES were given')
+        if str(tags_other['SCALEMODES_GRID']).lower() == 'list' and tags_other['SCALEMODES_GRID_FILE'] is None:
+            problems.append('SCALEMODES_GRID : list needs a SCALEMODES_GRID_FILE')
+    return (webdrv_path, main_page, walker_text, tags_bool, tags_other), problems
+
+def job_key(config : tuple) -> str:
+    '''everything that determines the outcome of a job, apart from where it is written to'''
+    webdrv_path, main_page, walker_text, tags_bool, tags_other = config
+    settings = {
+        'main_page' : main_page,
+        'text' : {tag : sorted(value) if tag == 'DISTORTED_FILE' else value for tag, value in walker_text.items()},
+        'bool' : tags_bool,
+        'other' : {tag : value for tag, value in tags_other.items() if tag != 'OUTPUT_DIR'},
+    }
+    return json.dumps(settings, sort_keys=True, default=lambda x: np.asarray(x).tolist())
+
+def plan_jobs(path : str) -> list[dict]:
+    '''expanded, checked and deduplicated jobs of a manifest, raises ValueError listing all problems'''
+    jobs = expand_jobs(read_manifest(path), str(Path(path).resolve().parent))
+    problems : list[str] = []
+    planned : list[dict] = []
+    seen : dict = {}
+    for entry in jobs:
+        config, job_problems = check_job(entry['tags'])
+        problems += [f"{entry['name']}: {problem}" for problem in job_problems]
+        if job_problems:
+            continue
+        key = job_key(config)
+        if key in seen: # same job declared twice, e.g. by overlapping sweeps
+            seen[key]['duplicates'].append(entry['name'])
+            continue
+        seen[key] = {**entry, 'config' : config, 'duplicates' : []}
+        planned.append(seen[key])
+    names = [entry['name'] for entry in jobs]
+    problems += [f'more than one job is named {name}' for name in sorted(set(names)) if names.count(name) > 1]
+    outputs = [entry['config'][4]['OUTPUT_DIR'] for entry in planned]
+    problems += [f'more than one job writes to OUTPUT_DIR {output}' for output in sorted(set(outputs)) if outputs.count(output) > 1]
+    journals : dict = {}
+    for entry in planned:
+        journal = entry['config'][4]['JOURNAL_FILE']
+        if journal is not None: # the journal is keyed by child file, so jobs sharing one must not share structures
+            children = set(entry['config'][2]['DISTORTED_FILE'])
+            if children & journals.get(journal, set()):
+                problems.append(f"{entry['name']}: shares structures and the JOURNAL_FILE {journal} with another job")
+            journals[journal] = journals.get(journal, set()) | children
+    if problems:
+        raise ValueError(f'{path} has {len(problems)} problems:\n    ' + '\n    '.join(problems))
+    return planned
+
+def print_plan(planned : list[dict]) -> None:
+    print(f'{len(planned)} jobs:')
+    for entry in planned:
+        walker_text, tags_bool = entry['config'][2], entry['config'][3]
+        kind = 'read' if tags_bool['READ_MODE'] else 'decompose'
+        kind += ' + scale' if tags_bool['SCALEMODES'] else ''
+        sweep = ', '.join(f'{tag} {value}' for tag, value in entry['sweep'].items())
+        print(f"    {entry['name']:<24} {kind:<17} {len(walker_text['DISTORTED_FILE']):>5} structures  {sweep}")
+        if entry['duplicates']:
+            print(f"        (also declared as {', '.join(entry['duplicates'])})")
+    return None
+
+def run_manifest(path : str, resume : bool = False, dry_run : bool = False) -> None:
+    '''runs all jobs of a manifest one after the other, a failed job does not stop the others'''
+    from .workflow import run_config
+    planned = plan_jobs(path)
+    print_plan(planned)
+    if dry_run:
+        return None
+    failed : list[str] = []
+    for entry in planned:
+        print(f"\nJob {entry['name']}")
+        try:
+            run_config(entry['config'], resume)
+        except Exception as err: # reported at the end, rerun with --resume
+            print(f"Job {entry['name']} failed: {type(err).__name__}: {err}")
+            failed.append(entry['name'])
+    if failed:
+        raise RuntimeError(f"{len(failed)}/{len(planned)} jobs failed: {', '.join(failed)}")
+    return None
@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import html
+import hashlib
+import argparse
+import email.parser
+import urllib.parse
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np # type: ignore
+
+
+"""
+Local stand-in for the ISODISTORT server.
+
+In replay mode the pages recorded with the RECORD_DIR tag (see isodistort_http.py) are
+served again: GET requests return index.html and form submissions return the page named
+after the hidden 'input' field of the submitted form, e.g. uploadparentcif.html.
+
+In synthetic mode ISODISTORT (Method 4) and FINDSYM pages are generated with the structure the
+XPaths in isodistort_selenium.py and findsym.py expect, with a configurable number of irreps and
+modes and a configurable response latency, e.g. for benchmarks (see benchmark.py). The mode
+amplitudes are derived from the contents of the uploaded child structure, and the CIF's created
+on the distortion page contain matching mode definitions for the local scaling engine.
+"""
+
+def read_form_fields(handler : BaseHTTPRequestHandler) -> dict:
+    '''parses the submitted form fields (urlencoded or multipart) of a request, uploaded files are returned as bytes'''
+    length = int(handler.headers.get('Content-Length', 0))
+    body = handler.rfile.read(length)
+    ctype = handler.headers.get('Content-Type', '')
+    fields : dict = {}
+    if ctype.startswith('multipart/form-data'):
+        message = email.parser.BytesParser().parsebytes(f'Content-Type: {ctype}\r\n\r\n'.encode() + body)
+        for part in message.get_payload():
+            name = part.get_param('name', header='content-disposition')
+            payload = part.get_payload(decode=True)
+            fields[name] = payload if part.get_filename() else payload.decode(errors='replace')
+    else:
+        query = body.decode() if body else urllib.parse.urlparse(handler.path).query
+        fields = {k : v[-1] for k,v in urllib.parse.parse_qs(query, keep_blank_values=True).items()}
+    return fields
+
+def make_relative(html : str) -> str:
+    '''rewrites absolute form actions so that submissions come back to the local server'''
+    return re.sub(r'action="https?://[^/"]+/', 'action="/', html, flags=re.IGNORECASE)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    '''serves recorded ISODISTORT pages'''
+    record_dir : str = '.'
+
+    def do_GET(self):
+        self.send_page('index')
+
+    def do_POST(self):
+        fields = read_form_fields(self)
+        self.send_page(fields.get('input', 'page'))
+
+    def send_page(self, name : str) -> None:
+        path = Path(self.record_dir, f'{name}.html')
+        if not path.is_file():
+            self.send_error(404, f'No recorded page {path.name}')
+            return None
+        content = make_relative(path.read_text()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        return None
+
+    def log_message(self, format, *args):
+        return None
+
+
+def hidden_inputs(fields : list[tuple[str,str]]) -> str:
+    return ''.join(f'<input type="hidden" name="{name}" value="{html.escape(str(value))}">' for name, value in fields)
+
+def synthetic_main_page() -> str:
+    '''ISODISTORT main page: parent upload at /html/body/div[2]/div[1]/ul/form/input[3], OK at input[2]'''
+    return ('<html><body><div>ISODISTORT (mock)</div><div><div><ul>'
+        '<form action="/iso/isodistortuploadfile.php" method="post" enctype="multipart/form-data">'
+        + hidden_inputs([('input', 'uploadparentcif')]) +
+        '<input type="submit" value="OK"><input type="file" name="toProcess"></form></ul></div></div></body></html>')
+
+def synthetic_method4_page() -> str:
+    '''page after the parent upload: child upload at /html/body/div[2]/div[5]/form/p/input[67], OK at h3/input'''
+    return ('<html><body><div>ISODISTORT (mock)</div><div>' + '<div></div>' * 4 +
+        '<div><form action="/iso/isodistortuploadfile.php" method="post" enctype="multipart/form-data" target="_blank">'
+        '<h3><input type="submit" value="OK"></h3><p>'
+        + hidden_inputs([(f'h{k}', 'x') for k in range(65)] + [('input', 'uploadsubgroupcif')]) +
+        '<input type="file" name="toProcess"></p></form></div></div></body></html>')
+
+def synthetic_basis_page(seed : str) -> str:
+    '''basis page: 'specify basis' at /html/body/div[2]/form/input[71], matrix at input[72-80], origin at input[82-85], OK at p[1]/input'''
+    return ('<html><body><div>ISODISTORT (mock)</div><div><form action="/iso/isodistortform.php" method="post">'
+        + hidden_inputs([('input', 'distort'), ('seed', seed)] + [(f'f{k}', k) for k in range(3, 71)]) +
+        '<input type="radio" name="basisselect" value="specify">'
+        + ''.join(f'<input type="text" name="b{k}" value="0">' for k in range(9)) +
+        '<input type="radio" name="origintype" value="auto" checked><input type="radio" name="origintype" value="specify">'
+        + ''.join(f'<input type="text" name="o{k}" value="0">' for k in range(3)) +
+        '<p><input type="submit" value="OK"></p></form></div></body></html>')
+
+def synthetic_modes(num_irreps : int, num_modes : int) -> list[list[tuple[str,str]]]:
+    '''(component label, box name) of the modes of every irrep, the first irrep also has a strain mode'''
+    irreps : list = []
+    k = 0
+    for j in range(num_irreps):
+        modes : list = []
+        for _ in range(max(1, num_modes // num_irreps + (1 if j < num_modes % num_irreps else 0))):
+            k += 1
+            modes.append((f'[X{k}:a:dsp]A{k}(a)', f'mode{k:04d}'))
+        if j == 0:
+            modes.append(('strain1(a)', 'strain1'))
+        irreps.append(modes)
+    return irreps
+
+def synthetic_amplitudes(seed : str, irreps : list) -> dict[str,float]:
+    '''reproducible amplitudes for a child structure (seed is a hash of its contents)'''
+    rng = np.random.default_rng(int(seed[:12], 16))
+    return {box : round(float(rng.normal(0, 0.01 if 'strain' in box else 0.5)), 5) for modes in irreps for _, box in modes}
+
+def synthetic_distortion_page(seed : str, num_irreps : int, num_modes : int) -> str:
+    '''distortion page: amplitude boxes (class span1) in one paragraph per irrep, CIF output at /html/body/div[2]/form/input[81], OK at input[91]'''
+    irreps = synthetic_modes(num_irreps, num_modes)
+    values = synthetic_amplitudes(seed, irreps)
+    paragraphs = ['<p>Space Group: 221 Pm-3m</p><p>Subgroup: 47 Pmmm</p><p>Enter mode and strain amplitudes:<br></p>']
+    for j, modes in enumerate(irreps):
+        text = f'Pm-3m[0,0,0]GM{j+1}+(a) [0,0,0]GM{j+1}+(a) 47 Pmmm, basis={{(1,0,0),(0,1,0),(0,0,1)}}'
+        for label, box in modes:
+            text += f'<br>{label} <input class="span1" type="text" name="{box}" value="{values[box]}">'
+        if j == len(irreps) - 1:
+            text += '<br>Zero all mode and strain'
+        paragraphs.append(f'<p>{text}</p>')
+    paragraphs.append('<p>Parameters: <input class="span1" type="text" name="modeamplitude" value="1"></p>')
+    return ('<html><body><div>ISODISTORT (mock)</div><div><form action="/iso/isodistortform.php" method="post" target="_blank">'
+        + ''.join(paragraphs)
+        + hidden_inputs([('input', 'distortfile'), ('seed', seed)] + [(f'g{k}', k) for k in range(3, 81)]) +
+        '<input type="radio" name="origintype" value="structurefile">'
+        + ''.join(f'<input type="radio" name="origintype" value="other{k}">' for k in range(82, 91)) +
+        '<input type="submit" value="OK"></form></div></body></html>')
+
+def synthetic_cif(fields : dict, num_irreps : int, num_modes : int) -> str:
+    '''ISODISTORT style CIF of the structure with the submitted amplitudes, one atom per displacive mode moving along x'''
+    irreps = synthetic_modes(num_irreps, num_modes)
+    defaults = synthetic_amplitudes(fields.get('seed', '0'*12), irreps)
+    values = {box : float(fields.get(box, defaults[box])) for box in defaults}
+    displacive = [(label, box) for modes in irreps for label, box in modes if 'strain' not in box]
+    strain = values['strain1']
+    lines = ['# mock ISODISTORT output', 'data_isodistort-output', '',
+        f'_cell_length_a {10 * (1 + strain):.5f}', '_cell_length_b 10.00000', '_cell_length_c 10.00000',
+        '_cell_angle_alpha 90.00000', '_cell_angle_beta 90.00000', '_cell_angle_gamma 90.00000',
+        '_symmetry_space_group_name_H-M "P 1"', '',
+        'loop_', '_space_group_symop_id', '_space_group_symop_operation_xyz', '1 x,y,z', '',
+        'loop_', '_atom_site_label', '_atom_site_type_symbol', '_atom_site_fract_x', '_atom_site_fract_y', '_atom_site_fract_z', '_atom_site_occupancy']
+    n = len(displacive)
+    for k, (_, box) in enumerate(displacive):
+        lines.append(f'X{k+1} X {(k+1)/(n+1) + 0.05 * values[box]:.5f} 0.25000 0.25000 1.00000')
+    lines += ['', 'loop_', '_iso_displacivemode_ID', '_iso_displacivemode_label', '_iso_displacivemode_value']
+    lines += [f'{k+1} Pm-3m[0,0,0]{label} {values[box]:.5f}' for k, (label, box) in enumerate(displacive)]
+    lines += ['', 'loop_', '_iso_deltacoordinate_ID', '_iso_deltacoordinate_label', '_iso_deltacoordinate_value']
+    lines += [f'{k+1} X{k+1}_dx {0.05 * values[box]:.5f}' for k, (_, box) in enumerate(displacive)]
+    lines += ['', 'loop_', '_iso_displacivemodematrix_row', '_iso_displacivemodematrix_col', '_iso_displacivemodematrix_value']
+    lines += [f'{k+1} {k+1} 0.05000' for k in range(n)]
+    lines += ['', 'loop_', '_iso_strainmode_ID', '_iso_strainmode_label', '_iso_strainmode_value', f'1 Pm-3m[0,0,0]GM1+(strain)(a) {strain:.5f}']
+    lines += ['', 'loop_', '_iso_strainmodematrix_row', '_iso_strainmodematrix_col', '_iso_strainmodematrix_value', '1 1 1.00000', '']
+    return '\n'.join(lines)
+
+def synthetic_findsym_page() -> str:
+    '''FINDSYM main page: structure upload at /html/body/div[2]/div[1]/form/input[3], OK at input[2]'''
+    return ('<html><body><div>FINDSYM (mock)</div><div><div>'
+        '<form action="/iso/findsymuploadfile.php" method="post" enctype="multipart/form-data">'
+        + hidden_inputs([('input', 'findsymupload')]) +
+        '<input type="submit" value="OK"><input type="file" name="toProcess"></form></div></div></body></html>')
+
+def synthetic_findsym_result(cif : str) -> str:
+    '''FINDSYM result page: 'download CIF' at /html/body/form[1]/input[3]'''
+    return ('<html><body><form action="/iso/findsymform.php" method="post" target="_blank">'
+        + hidden_inputs([('input', 'findsymcif'), ('cif', cif)]) +
+        '<input type="submit" value="CIF file"></form></body></html>')
+
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    '''generates ISODISTORT and FINDSYM pages'''
+    latency : float = 0.0 # s, added to every response
+    num_irreps : int = 3
+    num_modes : int = 12
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if 'findsym' in self.path:
+            self.send_content(synthetic_findsym_page())
+        else:
+            self.send_content(synthetic_main_page())
+
+    def do_POST(self):
+        fields = read_form_fields(self)
+        time.sleep(self.latency)
+        form_id = fields.get('input', '')
+        if form_id == 'uploadparentcif':
+            self.send_content(synthetic_method4_page())
+        elif form_id == 'uploadsubgroupcif':
+            child = fields.get('toProcess', b'')
+            self.send_content(synthetic_basis_page(hashlib.sha256(child if isinstance(child, bytes) else child.encode()).hexdigest()))
+        elif form_id == 'distort':
+            self.send_content(synthetic_distortion_page(fields.get('seed', '0'*12), self.num_irreps, self.num_modes))
+        elif form_id == 'distortfile':
+            self.send_content(synthetic_cif(fields, self.num_irreps, self.num_modes), 'chemical/x-cif', 'isodistort_output.cif')
+        elif form_id == 'findsymupload':
+            cif = fields.get('toProcess', b'')
+            self.send_content(synthetic_findsym_result(cif.decode(errors='replace') if isinstance(cif, bytes) else cif))
+        elif form_id == 'findsymcif':
+            self.send_content(fields.get('cif', ''), 'chemical/x-cif', 'findsym.cif')
+        else:
+            self.send_error(404, f'Unknown form {form_id}')
+
+    def send_content(self, text : str, ctype : str = 'text/html', filename : str | None = None) -> None:
+        content = text.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'{ctype}; charset=utf-8')
+        if filename is not None: # download instead of display
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        return None
+
+    def log_message(self, format, *args):
+        return None
+
+
+def serve_synthetic(port : int = 8000, host : str = '127.0.0.1', latency : float = 0.0, num_irreps : int = 3, num_modes : int = 12) -> ThreadingHTTPServer:
+    '''sets up a server generating ISODISTORT/FINDSYM pages, call serve_forever() on the result to start it'''
+    handler = type('Handler', (SyntheticHandler,), {'latency' : latency, 'num_irreps' : num_irreps, 'num_modes' : num_modes})
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve_replay(record_dir : str, port : int = 8000, host : str = '127.0.0.1') -> ThreadingHTTPServer:
+    '''sets up a server replaying the pages in record_dir, call serve_forever() on the result to start it'''
+    if not os.path.isdir(record_dir):
+        raise FileNotFoundError(f'The directory {record_dir} could not be found.')
+    handler = type('Handler', (ReplayHandler,), {'record_dir' : record_dir})
+    return ThreadingHTTPServer((host, port), handler)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='mock_server',
+        description='Serve recorded or synthetic ISODISTORT pages locally (use MAIN_PAGE : http://127.0.0.1:<port>/iso/isodistort.php)',
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--replay', type=str, help='directory with recorded pages')
+    mode.add_argument('--synthetic', action='store_true', help='generate ISODISTORT and FINDSYM pages')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of every response in s (synthetic)')
+    parser.add_argument('--irreps', type=int, default=3, help='number of irreps on the distortion page (synthetic)')
+    parser.add_argument('--modes', type=int, default=12, help='number of displacive modes on the distortion page (synthetic)')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        server = serve_synthetic(args.port, latency=args.latency, num_irreps=args.irreps, num_modes=args.modes)
+        print(f'Serving synthetic pages ({args.irreps} irreps, {args.modes} modes, {args.latency} s latency) on http://127.0.0.1:{args.port}/')
+    else:
+        server = serve_replay(args.replay, args.port)
+        print(f'Replaying pages from {args.replay} on http://127.0.0.1:{args.port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
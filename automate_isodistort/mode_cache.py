@@ -0,0 +1,186 @@
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+import yaml # type: ignore
+from .constants import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE
+
+
+"""
+Content-addressed cache of mode decomposition results.
+
+Each entry is a YAML file named after the SHA-256 hash of the parent CIF bytes, the child
+CIF bytes, the basis transformation matrix, the origin shift and the ISODISTORT main page (so
+results of a mock or replay server never stand in for the real ones), and holds the
+(results, labels) pair returned by read_mode_amplitudes(). The mode basis of the local
+decomposition engine is stored under a key without the child CIF (basis_key), as it is shared by
+the whole series. Entries are evicted least recently used first once the cache grows beyond its
+maximum size. The size is tracked per process while storing, so the directory is only listed
+again when the cache is actually full.
+"""
+
+TMP_MAX_AGE : float = 3600 # s, temporary files older than this were left behind by a crashed write
+_cache_sizes : dict = {} # tracked size in bytes of every cache directory written to in this process
+
+def settings_hash(contents : list[bytes], transformation_matrix, origin_shift, main_page : str | None = None) -> str:
+    h = hashlib.sha256()
+    for content in contents:
+        h.update(content)
+        h.update(b'\0')
+    h.update(' '.join(str(int(x)) for x in transformation_matrix.flatten()).encode())
+    h.update(b'\0')
+    if origin_shift is None:
+        h.update(b'auto')
+    else:
+        h.update(' '.join(repr(float(x)) for x in origin_shift).encode())
+    if main_page is not None:
+        h.update(b'\0')
+        h.update(main_page.strip().encode())
+    return h.hexdigest()
+
+def cache_key(parent_struct : str, child_struct : str, transformation_matrix, origin_shift, main_page : str | None = None) -> str:
+    '''hash of everything that determines the outcome of a decomposition, including the server (main_page) that did it'''
+    return settings_hash([Path(parent_struct).read_bytes(), Path(child_struct).read_bytes()], transformation_matrix, origin_shift, main_page)
+
+def basis_key(parent_struct : str, transformation_matrix, origin_shift, main_page : str | None = None) -> str:
+    '''hash of the settings that determine the mode basis, shared by all child structures of a series'''
+    return settings_hash([Path(parent_struct).read_bytes(), b'mode basis'], transformation_matrix, origin_shift, main_page)
+
+def entry_path(key : str, cache_dir : str = DEFAULT_CACHE_DIR) -> Path:
+    return Path(os.path.expanduser(cache_dir), f'{key}.yaml')
+
+def load_cached(key : str, cache_dir : str = DEFAULT_CACHE_DIR) -> tuple[dict,dict] | None:
+    '''returns the cached (results, labels) pair or None if there is no entry for this key'''
+    path = entry_path(key, cache_dir)
+    try:
+        entry = yaml.safe_load(path.read_text())
+    except (FileNotFoundError, yaml.YAMLError):
+        return None
+    os.utime(path) # mark as recently used
+    return entry['results'], entry['labels']
+
+def store_cached(key : str, results : dict, labels : dict, cache_dir : str = DEFAULT_CACHE_DIR, max_size : float = DEFAULT_MAX_SIZE, source : dict | None = None) -> None:
+    '''adds an entry to the cache and evicts old entries if the cache grows beyond max_size (MB)'''
+    directory = os.path.expanduser(cache_dir)
+    os.makedirs(directory, exist_ok=True)
+    entry : dict = {
+        'results' : results,
+        'labels' : labels,
+        'source' : source or {}, # original file names etc., for inspecting the cache only
+        'created' : time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    # write to a temporary file first so that parallel workers never see half written entries
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as ff:
+        yaml.dump(entry, ff, sort_keys=False) # keep the page order of irreps and modes
+    os.replace(tmp, entry_path(key, cache_dir))
+    track_size(cache_dir, entry_path(key, cache_dir), max_size)
+    return None
+
+def store_cached_file(key : str, source : str, suffix : str, cache_dir : str = DEFAULT_CACHE_DIR, max_size : float = DEFAULT_MAX_SIZE) -> str:
+    '''copies a file belonging to a decomposition (e.g. the mode basis CIF) into the cache, returns its path in the cache'''
+    directory = os.path.expanduser(cache_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{key}{suffix}')
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as ff:
+        ff.write(Path(source).read_bytes())
+    os.replace(tmp, path)
+    track_size(cache_dir, path, max_size)
+    return path
+
+def track_size(cache_dir : str, path, max_size : float = DEFAULT_MAX_SIZE) -> None:
+    '''adds a newly written file to the tracked size of the cache and prunes it only once it grows beyond max_size (MB)'''
+    directory = os.path.expanduser(cache_dir)
+    if directory not in _cache_sizes: # first write of this process, one listing of the directory
+        _cache_sizes[directory] = sum(e['size'] for e in cache_entries(cache_dir))
+    else:
+        _cache_sizes[directory] += os.path.getsize(path)
+    if _cache_sizes[directory] > max_size * 1e6:
+        prune_cache(cache_dir, max_size)
+    return None
+
+def load_cached_file(key : str, suffix : str, cache_dir : str = DEFAULT_CACHE_DIR) -> str | None:
+    '''returns the path of a cached file belonging to a decomposition or None'''
+    path = os.path.join(os.path.expanduser(cache_dir), f'{key}{suffix}')
+    if not os.path.isfile(path):
+        return None
+    os.utime(path) # mark as recently used
+    return path
+
+def cache_entries(cache_dir : str = DEFAULT_CACHE_DIR) -> list[dict]:
+    '''lists the cache entries, least recently used first'''
+    directory = Path(os.path.expanduser(cache_dir))
+    if not directory.is_dir():
+        return []
+    entries : list = []
+    for path in directory.iterdir():
+        if path.suffix not in ['.yaml', '.cif']:
+            continue
+        stat = path.stat()
+        entries.append({'key' : path.stem, 'path' : path, 'size' : stat.st_size, 'used' : stat.st_mtime})
+    return sorted(entries, key = lambda e: e['used'])
+
+def sweep_temporary(cache_dir : str = DEFAULT_CACHE_DIR, max_age : float = TMP_MAX_AGE) -> int:
+    '''removes temporary files of writes that never finished, returns their number'''
+    directory = Path(os.path.expanduser(cache_dir))
+    removed = 0
+    for path in directory.glob('*.tmp') if directory.is_dir() else []:
+        try:
+            if time.time() - path.stat().st_mtime > max_age: # recent ones may still be written by another process
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def prune_cache(cache_dir : str = DEFAULT_CACHE_DIR, max_size : float = DEFAULT_MAX_SIZE) -> int:
+    '''removes left over temporary files and least recently used entries until the cache is smaller than max_size (MB), returns number of removed files'''
+    removed = sweep_temporary(cache_dir)
+    entries = cache_entries(cache_dir)
+    total = sum(e['size'] for e in entries)
+    for e in entries:
+        if total <= max_size * 1e6:
+            break
+        try:
+            e['path'].unlink()
+        except FileNotFoundError: # already removed by another process
+            pass
+        total -= e['size']
+        removed += 1
+    _cache_sizes[os.path.expanduser(cache_dir)] = total
+    return removed
+
+def print_cache(cache_dir : str = DEFAULT_CACHE_DIR) -> None:
+    '''overview of the cache contents'''
+    entries = cache_entries(cache_dir)
+    total = sum(e['size'] for e in entries)
+    print(f'{len(entries)} cached decompositions ({total/1e6:.2f} MB) in {os.path.expanduser(cache_dir)}')
+    for e in reversed(entries):
+        source = (yaml.safe_load(e['path'].read_text()) or {}).get('source', {}) if e['path'].suffix == '.yaml' else {'child' : e['path'].name}
+        used = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['used']))
+        print(f"{e['key'][:12]}  {e['size']/1e3:8.1f} kB  last used {used}  {source.get('child', '')}")
+    return None
+
+def cache_command(command : str, cache_dir : str = DEFAULT_CACHE_DIR, max_size : float = DEFAULT_MAX_SIZE) -> None:
+    '''list, prune or clear the cache (python -m automate_isodistort cache ...)'''
+    if command == 'list':
+        print_cache(cache_dir)
+    elif command == 'prune':
+        print(f'Removed {prune_cache(cache_dir, max_size)} entries.')
+    elif command == 'clear':
+        print(f'Removed {prune_cache(cache_dir, 0) + sweep_temporary(cache_dir, 0)} entries.')
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='mode_cache',
+        description='Inspect and prune the cache of mode decomposition results',
+    )
+    parser.add_argument('command', choices=['list', 'prune', 'clear'])
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--max-size', type=float, default=DEFAULT_MAX_SIZE, help='maximum cache size in MB (prune)')
+    args = parser.parse_args()
+    cache_command(args.command, args.cache_dir, args.max_size)
@@ -0,0 +1,328 @@
+import os
+import csv
+import itertools
+import warnings
+from typing import Iterator
+import numpy as np # type: ignore
+from .cif_tools import read_cif, loop_columns, find_loop, atom_sites, cif_float, replace_loops, replace_tags, cell_parameters, lattice_vectors, cell_from_vectors
+
+
+"""
+Local engine for generating structures with scaled mode amplitudes.
+
+The mode definitions are read once from a CIF created by ISODISTORT for the child structure
+(the 'create CIF' output contains the displacive mode matrix, the mode amplitudes and the
+resulting coordinate shifts). Scaled structures are then synthesised as
+
+    positions = undistorted positions + (displacive mode matrix) x (amplitude vector)
+
+for all steps at once, and written into a copy of that CIF without any further web traffic.
+Strain modes (SCALE_STRAINS) deform the undistorted child cell by (1 + strain tensor).
+
+The scan grid, i.e. the scaling factor of every target irrep for each structure, is generated
+lazily so that large grids never have to be held in memory.
+"""
+
+CELL_TAGS : list = ['_cell_length_a', '_cell_length_b', '_cell_length_c', '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma']
+
+"""
+Functions for scan grids
+"""
+
+def parse_scan_ranges(usr_text : str) -> dict[str,tuple[float,float,int]]:
+    '''parses per-irrep ranges such as "GM1+ 0 1 5, GM4- -1 1 11" into {irrep : (min, max, steps)}'''
+    ranges : dict = {}
+    for entry in usr_text.replace(';', ',').split(','):
+        if not entry.strip():
+            continue
+        fields = entry.split()
+        if len(fields) != 4:
+            raise KeyError(f"{entry.strip()} is not a valid scan range (expected: <irrep> <min> <max> <steps>)")
+        factor_min, factor_max, steps = float(fields[1]), float(fields[2]), int(fields[3])
+        if factor_max < factor_min:
+            raise AttributeError(f"Minimum scaling factor ({factor_min}) is larger than maximum scaling factor ({factor_max}) for {fields[0]}.")
+        ranges[fields[0]] = (factor_min, factor_max, steps)
+    return ranges
+
+def count_scan_points(ranges : dict[str,tuple[float,float,int]], grid : str) -> int | None:
+    '''number of points of a grid (None if only known after reading a point list)'''
+    if grid == 'cartesian':
+        return int(np.prod([r[2] for r in ranges.values()]))
+    if grid == 'linear':
+        return list(ranges.values())[0][2]
+    return None
+
+def scan_points(ranges : dict[str,tuple[float,float,int]], grid : str = 'linear', grid_file : str | None = None) -> Iterator[dict[str,float]]:
+    '''lazily yields the scaling factor of every irrep for each structure of the scan
+    linear:    all irreps are scaled together (the same number of steps is required)
+    cartesian: every combination of the per-irrep factors
+    list:      one point per line of grid_file, factors in the order of the irreps
+    '''
+    irreps = list(ranges.keys())
+    if grid == 'linear':
+        steps = {r[2] for r in ranges.values()}
+        if len(steps) > 1:
+            raise AttributeError("All irreps need the same number of steps for a linear scan, use a cartesian grid instead.")
+        axes = [np.linspace(*ranges[irrep]) for irrep in irreps]
+        for factors in zip(*axes):
+            yield dict(zip(irreps, map(float, factors)))
+    elif grid == 'cartesian':
+        axes = [np.linspace(*ranges[irrep]) for irrep in irreps]
+        for factors in itertools.product(*axes):
+            yield dict(zip(irreps, map(float, factors)))
+    elif grid == 'list':
+        if grid_file is None:
+            raise AttributeError("A list of scan points was requested but no SCALEMODES_GRID_FILE was provided!")
+        with open(grid_file, 'r') as ff:
+            for line in ff:
+                line = line.split('#')[0].strip()
+                if not line:
+                    continue
+                factors = [float(x) for x in line.replace(',', ' ').split()]
+                if len(factors) != len(irreps):
+                    raise ValueError(f"Scan point '{line}' does not have one factor for each of {', '.join(irreps)}")
+                yield dict(zip(irreps, factors))
+    else:
+        raise KeyError(f"{grid} is not a valid scan grid (linear, cartesian or list)")
+
+def point_amplitudes(point : dict[str,float], mode_amplitudes : dict, box_labels : dict, scale_strains : bool = False) -> dict[str,float]:
+    '''scaled amplitudes of one scan point keyed by boxlabel (only the components of the scanned irreps)'''
+    values : dict = {}
+    for irrep, factor in point.items():
+        for comp, value in mode_amplitudes[irrep]['components'].items():
+            if 'strain' in comp and not scale_strains: # strain amplitudes are only scaled if requested
+                continue
+            values[box_labels[irrep][comp]] = factor * value
+    return values
+
+def open_scan_index(filename : str, irreps : list[str], amplitude_labels : list[str] = []):
+    '''starts the index of a scan (one row per structure, written as the structures are completed)'''
+    handle = open(filename, 'w', newline='')
+    csv.writer(handle).writerow(['index', 'file'] + irreps + amplitude_labels)
+    handle.flush()
+    return handle
+
+def write_scan_index(handle, index : int, filename : str, point : dict[str,float], amplitudes : list[float] = []) -> None:
+    csv.writer(handle).writerow([index, os.path.basename(filename)] + [f'{f:.6g}' for f in point.values()] + [f'{a:.6g}' for a in amplitudes])
+    handle.flush()
+    return None
+
+"""
+Functions for the local engine
+"""
+
+def read_mode_basis(cif_path : str) -> dict:
+    '''reads the displacive mode basis and the undistorted child positions from an ISODISTORT CIF'''
+    cif = read_cif(cif_path)
+    modes = loop_columns(cif, '_iso_displacivemode_id')
+    deltas = loop_columns(cif, '_iso_deltacoordinate_id')
+    matrix = loop_columns(cif, '_iso_displacivemodematrix_row')
+    if modes is None or deltas is None or matrix is None:
+        raise KeyError(f'{cif_path} does not contain the ISODISTORT displacive mode definitions')
+
+    mode_ids = [int(i) for i in modes['_iso_displacivemode_id']]
+    delta_ids = [int(i) for i in deltas['_iso_deltacoordinate_id']]
+    mode_col = {m : k for k, m in enumerate(mode_ids)}
+    delta_row = {d : k for k, d in enumerate(delta_ids)}
+    M = np.zeros((len(delta_ids), len(mode_ids)))
+    rows = [delta_row[int(r)] for r in matrix['_iso_displacivemodematrix_row']]
+    cols = [mode_col[int(c)] for c in matrix['_iso_displacivemodematrix_col']]
+    M[rows, cols] = [cif_float(v) for v in matrix['_iso_displacivemodematrix_value']]
+
+    # map every delta coordinate (e.g. Ca1_dx) onto the flattened (site, axis) coordinate array
+    labels, positions = atom_sites(cif)
+    site_index = {label : k for k, label in enumerate(labels)}
+    coordinate_index : list[int] = []
+    for label in deltas['_iso_deltacoordinate_label']:
+        site, axis = label.rsplit('_', 1)
+        if site not in site_index or axis not in ['dx', 'dy', 'dz']:
+            raise KeyError(f'Cannot assign the delta coordinate {label} to an atom site')
+        coordinate_index.append(3 * site_index[site] + 'xyz'.index(axis[1]))
+    coordinate_index = np.array(coordinate_index, dtype=int)
+
+    mode_values = np.array([cif_float(v) for v in modes['_iso_displacivemode_value']])
+    delta_values = np.array([cif_float(v) for v in deltas['_iso_deltacoordinate_value']])
+    if not np.allclose(M @ mode_values, delta_values, atol=1e-4):
+        warnings.warn('The displacive mode matrix does not reproduce the coordinate shifts in the CIF!')
+    undistorted = positions.flatten()
+    undistorted[coordinate_index] -= delta_values
+
+    # strain modes deform the cell, the strain matrix maps strain mode amplitudes onto the Voigt strain components
+    strains = loop_columns(cif, '_iso_strainmode_id')
+    strain_matrix = loop_columns(cif, '_iso_strainmodematrix_row')
+    vectors = lattice_vectors(cell_parameters(cif))
+    if strains is not None and strain_matrix is not None:
+        strain_col = {int(m) : k for k, m in enumerate(strains['_iso_strainmode_id'])}
+        S = np.zeros((6, len(strain_col)))
+        rows = [int(r) - 1 for r in strain_matrix['_iso_strainmodematrix_row']]
+        cols = [strain_col[int(c)] for c in strain_matrix['_iso_strainmodematrix_col']]
+        S[rows, cols] = [cif_float(v) for v in strain_matrix['_iso_strainmodematrix_value']]
+        strain_values = np.array([cif_float(v) for v in strains['_iso_strainmode_value']])
+        undistorted_cell = vectors @ np.linalg.inv(np.eye(3) + strain_tensor(S @ strain_values))
+    else:
+        S = np.zeros((6, 0))
+        strain_values = np.zeros(0)
+        undistorted_cell = vectors
+
+    return {
+        'cif' : cif,
+        'mode_labels' : list(modes['_iso_displacivemode_label']),
+        'mode_values' : mode_values, # amplitudes of the child structure
+        'matrix' : M, # delta coordinates = matrix x mode amplitudes
+        'coordinate_index' : coordinate_index,
+        'site_labels' : labels,
+        'undistorted' : undistorted.reshape(-1, 3),
+        'strain_values' : strain_values,
+        'strain_matrix' : S, # Voigt strain components = strain matrix x strain mode amplitudes
+        'undistorted_cell' : undistorted_cell, # lattice vectors (rows) without strain
+    }
+
+def strain_tensor(voigt : np.ndarray) -> np.ndarray:
+    '''symmetric strain tensor(s) from Voigt components e1..e6 (e4..e6 are engineering shear strains)'''
+    e = np.asarray(voigt)
+    return np.stack([
+        np.stack([e[..., 0], e[..., 5] / 2, e[..., 4] / 2], axis=-1),
+        np.stack([e[..., 5] / 2, e[..., 1], e[..., 3] / 2], axis=-1),
+        np.stack([e[..., 4] / 2, e[..., 3] / 2, e[..., 2]], axis=-1),
+        ], axis=-2)
+
+def mode_columns(basis : dict, box_labels : dict) -> tuple[dict[str,int], dict[str,int]]:
+    '''maps the boxlabels of the displacive and strain modes (page order) onto the columns of the mode and strain matrices (ID order)'''
+    displacive = [boxlabel for irrep in box_labels.values() for comp, boxlabel in irrep.items() if 'strain' not in comp]
+    strain = [boxlabel for irrep in box_labels.values() for comp, boxlabel in irrep.items() if 'strain' in comp]
+    if len(displacive) != len(basis['mode_labels']):
+        raise ValueError(f"The distortion page has {len(displacive)} displacive modes but the mode basis contains {len(basis['mode_labels'])}.")
+    return {boxlabel : k for k, boxlabel in enumerate(displacive)}, {boxlabel : k for k, boxlabel in enumerate(strain)}
+
+def irrep_columns(basis : dict, box_labels : dict, irreps : list[str], scale_strains : bool = False) -> dict[str,tuple[np.ndarray,np.ndarray]]:
+    '''indices of the displacive (and strain) columns belonging to each irrep'''
+    displacive, strain = mode_columns(basis, box_labels)
+    if scale_strains and strain and basis['strain_matrix'].shape[1] != len(strain):
+        raise ValueError("The mode basis does not contain the strain mode definitions needed for SCALE_STRAINS.")
+    columns : dict = {}
+    for irrep in irreps:
+        comps = box_labels[irrep]
+        columns[irrep] = (
+            np.array([displacive[b] for c, b in comps.items() if 'strain' not in c], dtype=int),
+            np.array([strain[b] for c, b in comps.items() if 'strain' in c and scale_strains], dtype=int),
+            )
+    return columns
+
+def child_basis(basis : dict, mode_amplitudes : dict, box_labels : dict) -> dict:
+    '''the basis with the mode amplitudes and cell of the given child structure, a cached basis may have been created for another structure of the series'''
+    displacive, strain = mode_columns(basis, box_labels)
+    mode_values = np.array(basis['mode_values'], dtype=float)
+    strain_values = np.array(basis['strain_values'], dtype=float)
+    for irrep, comps in box_labels.items():
+        for comp, boxlabel in comps.items():
+            value = float(mode_amplitudes[irrep]['components'][comp])
+            if 'strain' not in comp:
+                mode_values[displacive[boxlabel]] = value
+            elif len(strain) == len(strain_values):
+                strain_values[strain[boxlabel]] = value
+    return {**basis, 'mode_values' : mode_values, 'strain_values' : strain_values, 'cell' : scaled_cells(basis, strain_values[np.newaxis])[0]}
+
+def scaled_amplitudes(basis : dict, columns : dict[str,tuple[np.ndarray,np.ndarray]], factors : np.ndarray) -> tuple[np.ndarray,np.ndarray]:
+    '''displacive (n_points x n_modes) and strain (n_points x n_strains) amplitudes for a block of scan points
+    factors (n_points x n_irreps) scale the components of the irreps in columns, all others stay as in the child structure
+    '''
+    factors = np.atleast_2d(factors)
+    displacive = np.ones((len(factors), len(basis['mode_values'])))
+    strain = np.ones((len(factors), len(basis['strain_values'])))
+    for k, (mode_cols, strain_cols) in enumerate(columns.values()):
+        displacive[:, mode_cols] = factors[:, [k]]
+        strain[:, strain_cols] = factors[:, [k]]
+    return displacive * basis['mode_values'][np.newaxis, :], strain * basis['strain_values'][np.newaxis, :]
+
+def scaled_cells(basis : dict, strain_amplitudes : np.ndarray) -> np.ndarray:
+    '''lattice parameters (n_points x 6) for the strain amplitudes (n_points x n_strains)'''
+    deformation = np.eye(3) + strain_tensor(strain_amplitudes @ basis['strain_matrix'].T)
+    vectors = basis['undistorted_cell'][np.newaxis] @ deformation
+    return np.array([cell_from_vectors(v) for v in vectors])
+
+def scaled_positions(basis : dict, amplitudes : np.ndarray) -> np.ndarray:
+    '''fractional atom positions (n_steps x n_sites x 3) for the amplitude vectors (n_steps x n_modes)'''
+    amplitudes = np.atleast_2d(amplitudes)
+    positions = np.repeat(basis['undistorted'].reshape(1, -1), len(amplitudes), axis=0)
+    positions[:, basis['coordinate_index']] += amplitudes @ basis['matrix'].T
+    return positions.reshape(len(amplitudes), -1, 3)
+
+def structure_cif(basis : dict, positions : np.ndarray, amplitudes : np.ndarray, cell : np.ndarray | None = None, strain_amplitudes : np.ndarray | None = None) -> str:
+    '''CIF text of one structure: the ISODISTORT CIF with new atom positions, mode amplitudes and coordinate shifts (and cell if strained)'''
+    cif = basis['cif']
+    site_loop = find_loop(cif, '_atom_site_fract_x')
+    columns = site_loop['columns']
+    xyz = [columns.index(f'_atom_site_fract_{x}') for x in 'xyz']
+    site_rows = [list(row) for row in site_loop['rows']]
+    for k, row in enumerate(site_rows):
+        for axis, col in enumerate(xyz):
+            row[col] = f'{positions[k, axis]:.5f}'
+
+    mode_loop = find_loop(cif, '_iso_displacivemode_id')
+    mode_rows = [list(row) for row in mode_loop['rows']]
+    value_col = mode_loop['columns'].index('_iso_displacivemode_value')
+    for k, row in enumerate(mode_rows):
+        row[value_col] = f'{amplitudes[k]:.5f}'
+
+    delta_loop = find_loop(cif, '_iso_deltacoordinate_id')
+    delta_rows = [list(row) for row in delta_loop['rows']]
+    delta_col = delta_loop['columns'].index('_iso_deltacoordinate_value')
+    delta_values = basis['matrix'] @ amplitudes
+    for k, row in enumerate(delta_rows):
+        row[delta_col] = f'{delta_values[k]:.5f}'
+
+    new_loops = [(site_loop, site_rows), (mode_loop, mode_rows), (delta_loop, delta_rows)]
+    strain_loop = find_loop(cif, '_iso_strainmode_id')
+    if strain_amplitudes is not None and strain_loop is not None:
+        strain_rows = [list(row) for row in strain_loop['rows']]
+        strain_col = strain_loop['columns'].index('_iso_strainmode_value')
+        for k, row in enumerate(strain_rows):
+            row[strain_col] = f'{strain_amplitudes[k]:.5f}'
+        new_loops.append((strain_loop, strain_rows))
+    text = replace_loops(cif, new_loops)
+    cell = basis.get('cell') if cell is None else cell # see child_basis()
+    if cell is not None:
+        text = replace_tags(text, {tag : f'{value:.5f}' for tag, value in zip(CELL_TAGS, cell)})
+    return text
+
+def generate_scaled_structures_local(basis : dict, box_labels : dict, points : Iterator[dict[str,float]], output, scale_strains : bool = False, chunk_size : int = 256) -> int:
+    '''creates the structures of the scan points without using ISODISTORT and hands them to output (see scan_output.py), returns the number of structures
+    the points are processed in vectorised blocks of chunk_size and every structure is written as soon as its block is done
+    '''
+    points = iter(points)
+    first = next(points, None)
+    if first is None:
+        return 0
+    points = itertools.chain([first], points)
+    columns = irrep_columns(basis, box_labels, list(first.keys()), scale_strains)
+    print('Generating structures with scaled mode amplitudes locally...')
+    count = 0
+    while True:
+        block = list(itertools.islice(points, chunk_size))
+        if not block:
+            break
+        factors = np.array([list(point.values()) for point in block])
+        amplitudes, strain_amplitudes = scaled_amplitudes(basis, columns, factors)
+        positions = scaled_positions(basis, amplitudes)
+        cells = scaled_cells(basis, strain_amplitudes) if scale_strains else None
+        for k, point in enumerate(block):
+            output.write(count, structure_cif(
+                basis,
+                positions[k],
+                amplitudes[k],
+                cells[k] if cells is not None else None,
+                strain_amplitudes[k] if scale_strains else None,
+                ), point)
+            count += 1
+        print(f'{count} structures written.')
+    return count
+
+def compare_structures(cif_a : str, cif_b : str) -> float:
+    '''largest difference in fractional coordinates between two structure files with the same sites'''
+    labels_a, xyz_a = atom_sites(read_cif(cif_a))
+    labels_b, xyz_b = atom_sites(read_cif(cif_b))
+    if labels_a != labels_b:
+        raise ValueError(f'{cif_a} and {cif_b} do not contain the same atom sites')
+    diff = xyz_a - xyz_b
+    diff -= np.round(diff) # positions are periodic
+    return float(np.abs(diff).max())
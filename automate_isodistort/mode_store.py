@@ -0,0 +1,129 @@
+import os
+from pathlib import Path
+import numpy as np # type: ignore
+import yaml # type: ignore
+
+
+"""
+Columnar store of mode amplitudes for large series of structures.
+
+A store is a directory holding
+    meta.yaml         irrep info and the (irrep, component, boxlabel) of every column, written once
+    structures.txt    one structure name per row
+    col_<n>.f8        one little-endian float64 file per mode component
+Appending a structure appends one value to every column file (a whole batch in one pass over
+the column files, see append_series_to_store), and any component across the whole series can be
+read (or memory-mapped) as one NumPy array without touching the others.
+The structure name is appended last, so rows of an interrupted append are ignored. Every
+structure name appears once, appending a structure again replaces its row.
+"""
+
+DTYPE : str = '<f8'
+
+def column_file(store_dir : str, column : int) -> Path:
+    return Path(store_dir, f'col_{column:05d}.f8')
+
+def read_store_meta(store_dir : str) -> dict:
+    '''irrep info and column definitions of a store'''
+    path = Path(store_dir, 'meta.yaml')
+    if not path.is_file():
+        raise FileNotFoundError(f'{store_dir} is not a mode amplitude store')
+    return yaml.safe_load(path.read_text())
+
+def read_store_rows(store_dir : str) -> list[str]:
+    '''names of the structures in the store, in row order'''
+    path = Path(store_dir, 'structures.txt')
+    if not path.is_file():
+        return []
+    return path.read_text().splitlines()
+
+def create_store(store_dir : str, results : dict, labels : dict) -> dict:
+    '''sets up an empty store with one column per mode component of results'''
+    os.makedirs(store_dir, exist_ok=True)
+    meta : dict = {
+        'info' : {irrep : results[irrep]['info'] for irrep in results.keys()},
+        'columns' : [[irrep, comp, labels[irrep][comp]] for irrep in results.keys() for comp in results[irrep]['components'].keys()],
+    }
+    with open(Path(store_dir, 'meta.yaml'), 'w') as ff:
+        yaml.dump(meta, ff, sort_keys=False)
+    return meta
+
+def append_to_store(store_dir : str, name : str, results : dict, labels : dict) -> int:
+    '''appends the mode amplitudes of one structure as a new row, returns the row index
+    a structure that is already in the store (e.g. from the cache or a resumed run) has its row replaced instead
+    '''
+    return append_series_to_store(store_dir, {name : results}, {name : labels})[0]
+
+def append_series_to_store(store_dir : str, series_results : dict, series_labels : dict) -> list[int]:
+    '''appends the mode amplitudes of many structures (keyed by name) at once, returns their row indices
+    the store is read once and every column file is opened once per call, structures already in the store have their rows replaced
+    raises ValueError before anything is written if the modes of a structure do not match those of the store
+    '''
+    if not series_results:
+        return []
+    if Path(store_dir, 'meta.yaml').is_file():
+        meta = read_store_meta(store_dir)
+    else:
+        first = next(iter(series_results))
+        meta = create_store(store_dir, series_results[first], series_labels[first])
+    columns = [(irrep, comp) for irrep, comp, _ in meta['columns']]
+    for name, results in series_results.items():
+        new_columns = [(irrep, comp) for irrep in results.keys() for comp in results[irrep]['components'].keys()]
+        if set(new_columns) != set(columns):
+            raise ValueError(f'The modes of {name} do not match the modes of the store {store_dir}.')
+    rows = read_store_rows(store_dir)
+    index = {row_name : k for k, row_name in enumerate(rows)}
+    new_names : list[str] = []
+    for name in series_results.keys():
+        if name not in index:
+            index[name] = len(rows) + len(new_names)
+            new_names.append(name)
+    values = np.array([[results[irrep]['components'][comp] for irrep, comp in columns] for results in series_results.values()], dtype=DTYPE)
+    positions = [index[name] for name in series_results.keys()]
+    for k in range(len(columns)):
+        path = column_file(store_dir, k)
+        with open(path, 'r+b' if path.is_file() else 'wb') as ff:
+            ff.truncate(len(rows) * 8) # values left over from an interrupted append
+            for row, value in zip(positions, values[:, k]):
+                ff.seek(row * 8)
+                ff.write(value.tobytes())
+    if new_names:
+        with open(Path(store_dir, 'structures.txt'), 'a') as ff:
+            ff.write(''.join(f'{name}\n' for name in new_names))
+    return positions
+
+def column_index(meta : dict, irrep : str, component : str) -> int:
+    for k, (i, c, _) in enumerate(meta['columns']):
+        if i == irrep and c == component:
+            return k
+    raise KeyError(f'No component {component} of {irrep} in the store')
+
+def read_store_column(store_dir : str, irrep : str, component : str, mmap : bool = False) -> np.ndarray:
+    '''values of one mode component for all structures of the store'''
+    meta = read_store_meta(store_dir)
+    n_rows = len(read_store_rows(store_dir))
+    path = column_file(store_dir, column_index(meta, irrep, component))
+    if mmap:
+        return np.memmap(path, dtype=DTYPE, mode='r', shape=(n_rows,))
+    return np.fromfile(path, dtype=DTYPE, count=n_rows)
+
+def read_store(store_dir : str) -> tuple[list[str], list[list[str]], np.ndarray]:
+    '''structure names, (irrep, component) of every column and the full (n_structures x n_components) amplitude matrix'''
+    meta = read_store_meta(store_dir)
+    rows = read_store_rows(store_dir)
+    matrix = np.empty((len(rows), len(meta['columns'])))
+    for k in range(len(meta['columns'])):
+        matrix[:, k] = np.fromfile(column_file(store_dir, k), dtype=DTYPE, count=len(rows))
+    return rows, [c[:2] for c in meta['columns']], matrix
+
+def read_store_row(store_dir : str, row : int) -> tuple[dict,dict]:
+    '''rebuilds the (results, labels) dicts of one structure'''
+    meta = read_store_meta(store_dir)
+    results : dict = {irrep : {'info' : info, 'components' : {}} for irrep, info in meta['info'].items()}
+    labels : dict = {irrep : {} for irrep in meta['info'].keys()}
+    for k, (irrep, comp, boxlabel) in enumerate(meta['columns']):
+        with open(column_file(store_dir, k), 'rb') as ff:
+            ff.seek(row * 8)
+            results[irrep]['components'][comp] = float(np.frombuffer(ff.read(8), dtype=DTYPE)[0])
+        labels[irrep][comp] = boxlabel
+    return results, labels
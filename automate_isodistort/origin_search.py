@@ -0,0 +1,146 @@
+import argparse
+import numpy as np # type: ignore
+from .cif_tools import read_cif, cell_parameters, lattice_vectors
+from .preflight import expand_sites
+
+
+"""
+Search for one origin shift p that fits a whole series of child structures.
+
+ISODISTORT places the child origin at p (in parent lattice units), so an atom at x in the parent
+basis sits at (x - p) P^-1 in the child basis. For every candidate p on a grid over the parent cell
+the undistorted child (parent atoms and the parent lattice translations inside the supercell) is
+placed this way and every child atom is matched to the nearest site of the same element. The
+mean squared displacement, summed over all children, is minimal for the origin that describes the
+whole series with the smallest (and hence mutually compatible) distortions. All candidates are
+scored at once by broadcasting, in chunks to keep memory bounded.
+
+Along polar directions the origin is not fixed by symmetry and the best value generally lies
+between the grid points. The best grid origin is therefore refined continuously: shifting the
+origin moves all atoms together, so the least squares origin is the one at which the mean
+displacement of all child atoms vanishes. Along directions fixed by symmetry the mean is zero
+anyway and the grid value is kept.
+"""
+
+DIVISIONS : int = 8 # candidate origins on a grid of 1/DIVISIONS of the parent lattice vectors
+ORIGIN_TOLERANCE : float = 1e-3 # smallest change of the grid origin (parent lattice units) kept by the refinement
+
+def supercell_translations(transformation_matrix : np.ndarray) -> np.ndarray:
+    '''parent lattice translations (n x 3, parent basis) inside one child cell, det(P) of them'''
+    inverse = np.linalg.inv(transformation_matrix)
+    corners = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)]) @ transformation_matrix
+    ranges = [np.arange(np.floor(corners[:, a].min()), np.ceil(corners[:, a].max()) + 1) for a in range(3)]
+    grid = np.array(np.meshgrid(*ranges, indexing='ij')).reshape(3, -1).T
+    fractional = grid @ inverse
+    inside = np.all((fractional > -1e-6) & (fractional < 1 - 1e-6), axis=1)
+    return grid[inside]
+
+def reference_sites(parent : dict, transformation_matrix : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''elements and positions (parent basis) of all atoms of the undistorted child cell, before the origin shift'''
+    elements, xyz = expand_sites(parent)
+    translations = supercell_translations(transformation_matrix)
+    positions = (xyz[:, None, :] + translations[None, :, :]).reshape(-1, 3)
+    return np.repeat(elements, len(translations)), positions
+
+def candidate_origins(divisions : int = DIVISIONS) -> np.ndarray:
+    values = np.arange(divisions) / divisions
+    return np.array(np.meshgrid(values, values, values, indexing='ij')).reshape(3, -1).T
+
+def score_origins(reference : tuple[np.ndarray, np.ndarray], child : dict, transformation_matrix : np.ndarray, origins : np.ndarray, chunk_size : int = 64) -> np.ndarray:
+    '''mean squared displacement (Angstrom^2) of the child atoms from the nearest reference site of the same element, for every origin'''
+    ref_elements, ref_positions = reference
+    elements, xyz = expand_sites(child)
+    elements = np.array(elements)
+    missing = set(elements) - set(ref_elements)
+    if missing:
+        raise ValueError(f"The child structure contains {', '.join(sorted(missing))}, which the parent structure does not.")
+    inverse = np.linalg.inv(transformation_matrix)
+    vectors = lattice_vectors(cell_parameters(child))
+    scores = np.zeros(len(origins))
+    for start in range(0, len(origins), chunk_size):
+        p = origins[start:start + chunk_size]
+        for element in set(elements):
+            sites = (ref_positions[ref_elements == element][None, :, :] - p[:, None, :]) @ inverse # (n_origins, n_sites, 3) child basis
+            diff = xyz[elements == element][None, :, None, :] - sites[:, None, :, :] # (n_origins, n_atoms, n_sites, 3)
+            diff -= np.round(diff)
+            distances = np.sum((diff @ vectors)**2, axis=-1)
+            scores[start:start + chunk_size] += distances.min(axis=-1).sum(axis=-1)
+    return scores / len(elements)
+
+def rank_origins(scores : np.ndarray, origins : np.ndarray) -> np.ndarray:
+    '''order of the candidates, best first, equal scores (symmetry equivalent origins) by simplicity'''
+    nonzero = np.count_nonzero(origins, axis=1)
+    return np.lexsort((origins.sum(axis=1), nonzero, np.round(scores, 8)))
+
+def matched_shifts(reference : tuple[np.ndarray, np.ndarray], child : dict, transformation_matrix : np.ndarray, origin : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''displacements (n_atoms x 3, child basis) of the child atoms from the nearest reference site of the same element at one origin, and the child lattice vectors'''
+    ref_elements, ref_positions = reference
+    elements, xyz = expand_sites(child)
+    elements = np.array(elements)
+    inverse = np.linalg.inv(transformation_matrix)
+    vectors = lattice_vectors(cell_parameters(child))
+    shifts = np.zeros_like(xyz)
+    for element in set(elements):
+        sites = (ref_positions[ref_elements == element] - origin) @ inverse
+        diff = xyz[elements == element][:, np.newaxis, :] - sites[np.newaxis, :, :]
+        diff -= np.round(diff)
+        nearest = np.argmin(np.sum((diff @ vectors)**2, axis=-1), axis=1)
+        shifts[elements == element] = diff[np.arange(len(nearest)), nearest]
+    return shifts, vectors
+
+def refine_origin(reference : tuple[np.ndarray, np.ndarray], children : list[dict], transformation_matrix : np.ndarray, origin : np.ndarray, iterations : int = 10) -> np.ndarray:
+    '''moves the origin continuously (least squares) until the mean displacement of all child atoms vanishes
+    the mean displacement is zero by symmetry along directions in which the origin is fixed, so only free (polar) directions move,
+    changes below ORIGIN_TOLERANCE are noise and are dropped
+    '''
+    refined = np.array(origin, dtype=float)
+    for _ in range(iterations):
+        mean = np.concatenate([matched_shifts(reference, child, transformation_matrix, refined)[0] for child in children]).mean(axis=0)
+        step = -mean @ transformation_matrix # child basis -> parent basis
+        refined += step
+        if np.all(np.abs(step) < 1e-8):
+            break
+    return np.where(np.abs(refined - origin) < ORIGIN_TOLERANCE, origin, np.round(refined, 5))
+
+def origin_score(reference : tuple[np.ndarray, np.ndarray], child : dict, transformation_matrix : np.ndarray, origin : np.ndarray) -> float:
+    '''mean squared displacement (Angstrom^2) of the child atoms at one origin'''
+    shifts, vectors = matched_shifts(reference, child, transformation_matrix, origin)
+    return float(np.mean(np.sum((shifts @ vectors)**2, axis=-1)))
+
+def find_origin(parent_struct : str, child_structs : list[str], transformation_matrix : np.ndarray, divisions : int = DIVISIONS) -> tuple[np.ndarray, dict[str,tuple[np.ndarray, float, float]]]:
+    '''common origin shift of the series and for every child (best own origin, its score, score at the common origin)
+    the best origin on the grid is refined continuously along free directions, see refine_origin
+    '''
+    parent = read_cif(parent_struct)
+    reference = reference_sites(parent, transformation_matrix)
+    origins = candidate_origins(divisions)
+    children = [read_cif(child) for child in child_structs]
+    scores = np.array([score_origins(reference, child, transformation_matrix, origins) for child in children])
+    best = rank_origins(scores.sum(axis=0), origins)[0]
+    origin = refine_origin(reference, children, transformation_matrix, origins[best])
+    per_child : dict = {}
+    for name, child, child_scores in zip(child_structs, children, scores):
+        own = refine_origin(reference, [child], transformation_matrix, origins[rank_origins(child_scores, origins)[0]])
+        per_child[name] = (own, origin_score(reference, child, transformation_matrix, own), origin_score(reference, child, transformation_matrix, origin))
+    return origin, per_child
+
+def print_origins(origin : np.ndarray, per_child : dict[str,tuple[np.ndarray, float, float]]) -> None:
+    print(f"Common origin shift {' '.join(f'{x:g}' for x in origin)} (grid search, refined along free directions), mean RMS displacement {np.mean([np.sqrt(s[2]) for s in per_child.values()]):.4f} A")
+    for child, (own, own_score, common_score) in per_child.items():
+        note = '' if np.allclose(own, origin, atol=ORIGIN_TOLERANCE) else f"  (alone: {' '.join(f'{x:g}' for x in own)}, {np.sqrt(own_score):.4f} A)"
+        print(f'    {np.sqrt(common_score):.4f} A  {child}{note}')
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='origin_search',
+        description='Find one origin shift for a series of child structures of the same parent',
+    )
+    parser.add_argument('parent', type=str, help='parent structure CIF')
+    parser.add_argument('children', nargs='+', type=str, help='child structure CIFs')
+    parser.add_argument('--basis', type=str, required=True, help='BASIS_TRANSFORM, 9 integers (quoted)')
+    parser.add_argument('--divisions', type=int, default=DIVISIONS, help='candidate origins on a grid of 1/divisions of the parent lattice vectors')
+    args = parser.parse_args()
+
+    matrix = np.reshape(list(map(int, args.basis.split())), (3,3))
+    print_origins(*find_origin(args.parent, args.children, matrix, args.divisions))
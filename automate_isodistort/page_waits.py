@@ -0,0 +1,92 @@
+import time
+from collections import deque
+import numpy as np # type: ignore
+from selenium.webdriver.support.ui import WebDriverWait # type: ignore
+from selenium.webdriver.support import expected_conditions as EC # type: ignore
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException # type: ignore
+from selenium.webdriver.common.by import By # type: ignore
+from urllib3.exceptions import HTTPError as DriverConnectionError # type: ignore
+
+
+"""
+Waiting for ISODISTORT and FINDSYM pages (shared by isodistort_selenium.py and findsym.py).
+
+Every wait polls for the condition that marks the next page at a short interval, so a fast
+server means a fast run. The timeout of each stage is learned from the latencies observed for
+that stage during the run. Failures raise PageLoadError (the caller may retry, e.g. in a fresh
+session), or SessionDeadError as soon as the browser session itself is gone.
+"""
+
+POLL_INTERVAL : float = 0.05 # s
+INITIAL_TIMEOUT : float = 30.0 # s, until latencies have been observed for a stage
+MIN_TIMEOUT : float = 5.0
+MAX_TIMEOUT : float = 120.0
+TIMEOUT_FACTOR : float = 5.0 # timeout = factor x 90th percentile of the recent latencies
+HISTORY : int = 20 # latencies remembered per stage
+
+_latencies : dict[str, deque] = {}
+
+
+class PageLoadError(Exception):
+    '''the expected page did not show up in time'''
+
+
+class SessionDeadError(PageLoadError):
+    '''the browser session is gone (crashed, closed or quit)'''
+
+
+def record_latency(stage : str, seconds : float) -> None:
+    _latencies.setdefault(stage, deque(maxlen=HISTORY)).append(seconds)
+    return None
+
+def stage_timeout(stage : str) -> float:
+    '''timeout for a stage, based on the latencies seen for it so far'''
+    latencies = _latencies.get(stage)
+    if not latencies:
+        return INITIAL_TIMEOUT
+    return float(np.clip(TIMEOUT_FACTOR * np.percentile(latencies, 90), MIN_TIMEOUT, MAX_TIMEOUT))
+
+def session_alive(driver) -> bool:
+    '''cheap check whether the browser still responds'''
+    try:
+        driver.window_handles
+        return True
+    except (WebDriverException, DriverConnectionError, OSError):
+        return False
+
+def wait_until(driver, condition, stage : str, description : str, timeout : float | None = None):
+    '''polls condition until it is met, returns its value
+    raises PageLoadError on timeout and SessionDeadError immediately if the session is gone
+    '''
+    timeout = stage_timeout(stage) if timeout is None else timeout
+    started = time.perf_counter()
+    try:
+        result = WebDriverWait(
+            driver,
+            timeout,
+            poll_frequency=POLL_INTERVAL,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+            ).until(condition)
+    except TimeoutException:
+        if not session_alive(driver):
+            raise SessionDeadError(f'The browser session died while waiting for {description} ({stage}).')
+        try:
+            title = driver.title
+        except WebDriverException:
+            title = '?'
+        raise PageLoadError(f"Timed out after {timeout:.1f} s waiting for {description} ({stage}), current page: '{title}'")
+    except (WebDriverException, DriverConnectionError, OSError) as err:
+        if not session_alive(driver):
+            raise SessionDeadError(f'The browser session died while waiting for {description} ({stage}).') from err
+        raise PageLoadError(f'Error while waiting for {description} ({stage}): {err}') from err
+    record_latency(stage, time.perf_counter() - started)
+    return result
+
+def wait_for_page_load(element : str, driver, stage : str | None = None, timeout : float | None = None):
+    '''waits until the element (XPath) marking the next page is clickable, returns the element'''
+    return wait_until(driver, EC.element_to_be_clickable((By.XPATH, element)), stage or element, f'element {element}', timeout)
+
+def wait_for_windows(driver, count : int, stage : str, timeout : float | None = None) -> None:
+    '''waits until the number of open tabs is count'''
+    wait_until(driver, EC.number_of_windows_to_be(count), stage, f'{count} open tabs', timeout)
+    return None
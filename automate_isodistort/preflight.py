@@ -0,0 +1,155 @@
+import re
+import warnings
+import numpy as np # type: ignore
+from .cif_tools import read_cif, cell_parameters, lattice_vectors, cell_from_vectors, atom_sites, loop_columns
+
+
+"""
+Local checks of a decomposition job before anything is sent to ISODISTORT.
+
+The parent and child CIF's are read locally and checked for consistency with the basis
+transformation matrix P (rows: child basis vectors in terms of the parent basis) and the
+origin shift, so that bad jobs fail in milliseconds instead of timing out on the web page.
+"""
+
+CELL_TOLERANCE : float = 0.05 # relative deviation of the metric tensors
+MAX_SUPERCELL_INDEX : int = 48
+SITE_TOLERANCE : float = 1e-3 # fractional, for merging symmetry equivalent positions
+SYMOP_TAGS : list[str] = ['_space_group_symop_operation_xyz', '_symmetry_equiv_pos_as_xyz']
+
+def parse_symop(symop : str) -> tuple[np.ndarray, np.ndarray]:
+    '''rotation matrix and translation of a symmetry operation such as -x+1/2,y,z-x'''
+    rotation = np.zeros((3,3))
+    translation = np.zeros(3)
+    components = symop.replace(' ', '').lower().split(',')
+    if len(components) != 3:
+        raise ValueError(f'{symop} is not a valid symmetry operation')
+    for i, component in enumerate(components):
+        for sign, term in re.findall(r'([+-]?)([^+-]+)', component):
+            factor = -1.0 if sign == '-' else 1.0
+            axis = term[-1]
+            if axis in 'xyz':
+                coefficient = term[:-1].rstrip('*')
+                rotation[i, 'xyz'.index(axis)] += factor * (float(coefficient) if coefficient else 1.0)
+            elif '/' in term:
+                num, den = term.split('/')
+                translation[i] += factor * float(num) / float(den)
+            else:
+                translation[i] += factor * float(term)
+    return rotation, translation
+
+def symmetry_operations(cif : dict) -> tuple[np.ndarray, np.ndarray]:
+    '''rotations (n_ops x 3 x 3) and translations (n_ops x 3) listed in the CIF, identity only if there are none'''
+    for tag in SYMOP_TAGS:
+        columns = loop_columns(cif, tag)
+        if columns is not None:
+            ops = [parse_symop(op) for op in columns[tag]]
+            return np.array([op[0] for op in ops]), np.array([op[1] for op in ops])
+        if tag in cif['tags']: # single operation written as a tag
+            rotation, translation = parse_symop(cif['tags'][tag])
+            return rotation[None], translation[None]
+    return np.eye(3)[None], np.zeros((1,3))
+
+def site_elements(cif : dict) -> list[str]:
+    '''element of every site, from the type symbol or else the site label'''
+    columns = loop_columns(cif, '_atom_site_fract_x')
+    names = columns.get('_atom_site_type_symbol', columns.get('_atom_site_label')) if columns is not None else None
+    if names is None:
+        return []
+    return [re.match(r'[A-Za-z]+', name).group(0).capitalize() if re.match(r'[A-Za-z]+', name) else name for name in names]
+
+def expand_sites(cif : dict, tolerance : float = SITE_TOLERANCE) -> tuple[list[str], np.ndarray]:
+    '''elements and fractional coordinates (n_atoms x 3) of all atoms in the unit cell, after applying the symmetry operations'''
+    _, xyz = atom_sites(cif)
+    rotations, translations = symmetry_operations(cif)
+    images = np.einsum('oij,sj->soi', rotations, xyz) + translations[None] # (n_sites, n_ops, 3)
+    images %= 1.0
+    diff = images[:, :, None, :] - images[:, None, :, :]
+    diff -= np.round(diff)
+    same = np.all(np.abs(diff) < tolerance, axis=-1) # (n_sites, n_ops, n_ops)
+    # an image is new if it does not coincide with any earlier image of the same site
+    first = ~np.any(np.tril(same, k=-1), axis=-1)
+    site, op = np.nonzero(first)
+    elements = site_elements(cif) or ['X'] * len(xyz)
+    return [elements[k] for k in site], images[site, op]
+
+def count_atoms(cif : dict, tolerance : float = SITE_TOLERANCE) -> dict[str,int]:
+    '''number of atoms of every element in the unit cell, after applying the symmetry operations'''
+    counts : dict = {}
+    for element in expand_sites(cif, tolerance)[0]:
+        counts[element] = counts.get(element, 0) + 1
+    return counts
+
+def check_basis(transformation_matrix : np.ndarray) -> tuple[list[str], int]:
+    '''problems with the basis transformation matrix and its supercell index det(P)'''
+    det = int(round(np.linalg.det(transformation_matrix)))
+    if det == 0:
+        return [f'BASIS_TRANSFORM {transformation_matrix.flatten().tolist()} is singular.'], 0
+    errors : list[str] = []
+    if det < 0:
+        errors.append(f'BASIS_TRANSFORM {transformation_matrix.flatten().tolist()} gives a left-handed child basis (det = {det}).')
+    elif det > MAX_SUPERCELL_INDEX:
+        warnings.warn(f'BASIS_TRANSFORM gives an unusually large supercell (index {det}).')
+    return errors, abs(det)
+
+def check_origin_shift(origin_shift : None|np.ndarray) -> list[str]:
+    '''problems with the origin shift'''
+    if origin_shift is None:
+        return []
+    origin_shift = np.asarray(origin_shift, dtype=float)
+    if origin_shift.shape != (3,) or not np.all(np.isfinite(origin_shift)):
+        return [f'ORIGIN_SHIFT {origin_shift.tolist()} is not a valid origin shift.']
+    if np.any(np.abs(origin_shift) > 1):
+        warnings.warn(f'ORIGIN_SHIFT {origin_shift.tolist()} is larger than one lattice vector.')
+    return []
+
+def check_cells(parent : dict, child : dict, transformation_matrix : np.ndarray, tolerance : float = CELL_TOLERANCE) -> list[str]:
+    '''compares the child cell to the parent cell transformed by P (metric tensors, so independent of orientation)'''
+    parent_vectors = lattice_vectors(cell_parameters(parent))
+    child_vectors = lattice_vectors(cell_parameters(child))
+    expected_vectors = transformation_matrix @ parent_vectors
+    expected = expected_vectors @ expected_vectors.T
+    actual = child_vectors @ child_vectors.T
+    deviation = np.linalg.norm(actual - expected) / np.linalg.norm(expected)
+    if deviation > tolerance:
+        expected_cell = ' '.join(f'{x:.3f}' for x in cell_from_vectors(expected_vectors))
+        child_cell = ' '.join(f'{x:.3f}' for x in cell_parameters(child))
+        return [f'The child cell ({child_cell}) does not match the parent cell transformed by BASIS_TRANSFORM ({expected_cell}), deviation {deviation:.1%}.']
+    return []
+
+def check_atoms(parent_counts : dict[str,int], child_counts : dict[str,int], index : int) -> list[str]:
+    '''the child cell needs to hold index times the atoms of the parent cell'''
+    expected = {element : n * index for element, n in parent_counts.items()}
+    if sum(expected.values()) != sum(child_counts.values()):
+        return [f'The child cell contains {sum(child_counts.values())} atoms, expected {sum(expected.values())} ({index} x parent).']
+    if set(expected) == set(child_counts) and expected != child_counts:
+        return [f'The child cell contains {child_counts}, expected {expected}.']
+    return []
+
+def check_symmetrised(cif : dict, name : str) -> None:
+    '''warns if the structure has no symmetry besides the identity'''
+    rotations, _ = symmetry_operations(cif)
+    if len(rotations) == 1:
+        warnings.warn(f'{name} only contains the identity operation, it is probably not symmetrised (see the symmetrise subcommand).')
+    return None
+
+def validate_job(parent : dict, child_struct : str, transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, parent_counts : dict | None = None, tolerance : float = CELL_TOLERANCE) -> list[str]:
+    '''all problems of one decomposition job, an empty list if it looks fine'''
+    errors, index = check_basis(transformation_matrix)
+    errors += check_origin_shift(origin_shift)
+    try:
+        child = read_cif(child_struct)
+        check_symmetrised(child, child_struct)
+        if index:
+            errors += check_cells(parent, child, transformation_matrix, tolerance)
+            errors += check_atoms(parent_counts if parent_counts is not None else count_atoms(parent), count_atoms(child), index)
+    except (KeyError, ValueError) as err: # unreadable CIF
+        errors.append(f'{child_struct} could not be read: {err}')
+    return errors
+
+def validate_jobs(parent_struct : str, child_structs : list[str], transformation_matrix : np.ndarray, origin_shift : None|np.ndarray, tolerance : float = CELL_TOLERANCE) -> dict[str,list[str]]:
+    '''problems of every child structure (keyed by child file), the parent is read only once'''
+    parent = read_cif(parent_struct)
+    check_symmetrised(parent, parent_struct)
+    parent_counts = count_atoms(parent)
+    return {child : validate_job(parent, child, transformation_matrix, origin_shift, parent_counts, tolerance) for child in child_structs}
@@ -0,0 +1,138 @@
+import os
+import gzip
+import json
+import time
+import argparse
+import warnings
+import tempfile
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from .mode_cache import cache_key
+from .files import save_to_file
+
+
+"""
+Compressed archive of the raw ISODISTORT output of every decomposition.
+
+The distortion results page (HTML) and downloaded CIF's of every job are stored gzipped as
+    <key>.<kind>.gz     kind e.g. results.html or basis.cif, key as in mode_cache.py
+    index.jsonl         one line per archived file: key, kind, parent, child, matrix, origin shift
+The pages are archived before they are parsed, so if the parser is fixed or extended the whole
+series can be parsed again from the archive (reparse_archive) without asking ISODISTORT again.
+"""
+
+INDEX_FILE : str = 'index.jsonl'
+RESULTS_PAGE : str = 'results.html'
+BASIS_CIF : str = 'basis.cif'
+
+def archive_path(archive_dir : str, key : str, kind : str) -> Path:
+    return Path(os.path.expanduser(archive_dir), f'{key}.{kind}.gz')
+
+def archive_text(archive_dir : str, parent_struct : str, child_struct : str, transformation_matrix, origin_shift, text : str, kind : str = RESULTS_PAGE) -> str:
+    '''stores text (e.g. the HTML of the results page) of the job compressed in the archive, returns its key'''
+    directory = os.path.expanduser(archive_dir)
+    os.makedirs(directory, exist_ok=True)
+    key = cache_key(parent_struct, child_struct, transformation_matrix, origin_shift)
+    # write to a temporary file first so that parallel workers never see half written entries
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as ff:
+        ff.write(gzip.compress(text.encode(), compresslevel=6))
+    os.replace(tmp, archive_path(archive_dir, key, kind))
+    record : dict = {
+        'key' : key,
+        'kind' : kind,
+        'parent' : os.path.abspath(parent_struct),
+        'child' : os.path.abspath(child_struct),
+        'matrix' : [int(x) for x in transformation_matrix.flatten()],
+        'origin' : None if origin_shift is None else [float(x) for x in origin_shift],
+        'time' : time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(os.path.join(directory, INDEX_FILE), 'a') as ff: # whole lines, safe with several worker processes
+        ff.write(json.dumps(record) + '\n')
+    return key
+
+def archive_file(archive_dir : str, parent_struct : str, child_struct : str, transformation_matrix, origin_shift, path : str, kind : str = BASIS_CIF) -> str:
+    '''stores a downloaded file of the job compressed in the archive, returns its key'''
+    return archive_text(archive_dir, parent_struct, child_struct, transformation_matrix, origin_shift, Path(path).read_text(), kind)
+
+def read_archived(archive_dir : str, key : str, kind : str = RESULTS_PAGE) -> str:
+    return gzip.decompress(archive_path(archive_dir, key, kind).read_bytes()).decode()
+
+def archive_entries(archive_dir : str, kind : str = RESULTS_PAGE) -> list[dict]:
+    '''index records of the archived files of one kind, the latest per job, in order of archiving'''
+    path = os.path.join(os.path.expanduser(archive_dir), INDEX_FILE)
+    entries : dict = {}
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as ff:
+        for line in ff:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError: # line cut off by a crash
+                continue
+            if record['kind'] == kind and archive_path(archive_dir, record['key'], kind).is_file():
+                entries.pop(record['key'], None) # keep the order of the latest record
+                entries[record['key']] = record
+    return list(entries.values())
+
+def reparse_entry(archive_dir : str, key : str, parser):
+    try:
+        return parser(read_archived(archive_dir, key))
+    except (ValueError, IndexError, KeyError) as err: # one bad page should not stop the whole series
+        warnings.warn(f'Parsing the archived page {key} failed: {type(err).__name__}: {err}')
+        return None
+
+def entry_names(entries : list[dict]) -> dict[str,str]:
+    '''readable name of every entry keyed by archive key: the child file, followed by the start of the key if the child was decomposed with several settings'''
+    counts : dict = {}
+    for e in entries:
+        counts[e['child']] = counts.get(e['child'], 0) + 1
+    return {e['key'] : e['child'] if counts[e['child']] == 1 else f"{e['child']} ({e['key'][:12]})" for e in entries}
+
+def reparse_archive(archive_dir : str, parser = None, workers : int = 1) -> dict[str,tuple]:
+    '''parses all archived results pages again, returns the parser output keyed by archive key (one entry per child and settings, see index.jsonl)
+    the parser (default: the mode amplitude parser) takes the HTML of a page and has to be a module level function, it is sent to worker processes
+    '''
+    if parser is None:
+        from .isodistort_http import parse_results_html as parser # not at the top, isodistort_http imports this module
+    entries = archive_entries(archive_dir)
+    if workers > 1 and len(entries) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(reparse_entry, [archive_dir]*len(entries), [e['key'] for e in entries], [parser]*len(entries), chunksize=16))
+    else:
+        outputs = [reparse_entry(archive_dir, e['key'], parser) for e in entries]
+    return {e['key'] : output for e, output in zip(entries, outputs)}
+
+def print_archive(archive_dir : str) -> None:
+    '''overview of the archive contents'''
+    entries = archive_entries(archive_dir)
+    size = sum(p.stat().st_size for p in Path(os.path.expanduser(archive_dir)).glob('*.gz'))
+    print(f'{len(entries)} archived results pages ({size/1e6:.2f} MB) in {os.path.expanduser(archive_dir)}')
+    for e in entries:
+        print(f"{e['key'][:12]}  {e['time']}  {e['child']}")
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='results_archive',
+        description='List the archived ISODISTORT results pages or parse them again offline',
+    )
+    parser.add_argument('command', choices=['list', 'reparse'])
+    parser.add_argument('archive', type=str, help='archive directory (ARCHIVE_DIR)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='parallel parser processes (reparse)')
+    parser.add_argument('--output', type=str, default='modeamplitudes_archive', help='name of the YAML files written by reparse (without extension)')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print_archive(args.archive)
+    else:
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null): # the parser reports every page
+            parsed = reparse_archive(args.archive, workers=args.workers)
+        names = entry_names(archive_entries(args.archive))
+        failed = [names[key] for key, output in parsed.items() if output is None]
+        parsed = {key : output for key, output in parsed.items() if output is not None}
+        print(f'Parsed {len(parsed)} results pages in {time.perf_counter() - started:.2f} s' + (f", {len(failed)} failed: {', '.join(failed)}" if failed else ''))
+        save_to_file({names[key] : output[0] for key, output in parsed.items()}, filename=args.output)
+        save_to_file({names[key] : output[1] for key, output in parsed.items()}, filename=args.output + '_labels')
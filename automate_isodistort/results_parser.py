@@ -0,0 +1,110 @@
+import pprint
+import warnings
+
+
+"""
+Functions for parsing the ISODISTORT distortion results page
+"""
+
+def is_amplitude_box(mode_name : str) -> bool:
+    '''check if a text box name belongs to a mode or strain amplitude (and not to the overall amplitude boxes)'''
+    return (("mode" in mode_name) or ("strain" in mode_name)) and (mode_name not in ['modeamplitude', 'strainamplitude'])
+
+def parse_irrep_info(info_line : str) -> tuple[str, dict]:
+    '''extracts irrep label, parent and child space group and OPD from the first line of an irrep paragraph'''
+    parent_SG = info_line.split("[")[0]
+    irrep_label = info_line.split()[0].split("]")[-1]
+    child_SG = info_line.split()[3].replace(',','')
+    child_SG_num = info_line.split()[2]
+    opd = info_line.split()[1]
+    info_out : dict = { # dict containing info for each irrep
+                'parent': parent_SG,
+                 'child': child_SG+f" ({str(child_SG_num)})",
+                 'OPD': opd
+                }
+    return irrep_label, info_out
+
+def parse_mode_amplitudes(box_names : list[str], box_values : list[str], paragraphs : list[str], debug : bool = False) -> tuple[dict,dict] | None:
+    '''turns the text box names/values and paragraph texts of the distortion results page into the mode amplitude and box label dicts'''
+    mode_amplitudes : list[float] = []
+    mode_names : list[str] = []
+    for mode_name, ap_value in zip(box_names, box_values):
+        # mode_name is the internal mode label, not corresponding to label next to text boxes <--- boxlabel
+        if is_amplitude_box(mode_name):
+            mode_amplitudes.append(float(ap_value))
+            mode_names.append(str(mode_name))
+
+    mode_info_paragraphs : list = []
+    results : dict = {}
+    labels : dict = {}
+    form_start = False
+    msg = ""
+    for i,textblock in enumerate(paragraphs):
+        if textblock.startswith("Space Group:"):
+            msg = "this is info on input structures" # first paragraph contains info on parent and child structures
+        elif textblock.startswith("Subgroup:"): # second paragraph contains info on subgroup transformation
+            msg = "this is the subgroup info"
+        elif textblock.startswith("Enter mode and strain amplitudes:"): # third paragraph signals the start of the form
+            msg = "form starts here"
+            form_start = True
+        elif textblock.startswith("Parameters:"): # this paragraph follows the one that contains the last mode
+            msg = "mode info stops here"
+            form_start = False
+
+        if debug == True:
+            if i == 0:
+                print("")
+            print(f"paragraph {i}: ({msg})") # print statement for debugging
+
+        if form_start==True:
+            mode_info_paragraphs.append(textblock.split("\n"))
+
+    if not mode_info_paragraphs: # check if any modes were found
+        warnings.warn("No modes found!")
+        return None
+    else:
+        mode_info_paragraphs.pop(0) # remove the paragraph before mode info starts
+        num_modes = len(mode_info_paragraphs)
+        mode_info_paragraphs[-1].pop(-1) # remove last line in final mode paragraph ('Zero all mode and ...')
+        mode_info_paragraphs = [list(filter(None,  l)) for l in mode_info_paragraphs] # remove any empty lines
+        num_components = - num_modes
+        for i,m in enumerate(mode_info_paragraphs):
+            num_components += len(m)
+        if num_components != len(mode_amplitudes):
+            warnings.warn("Number of A_p values read from text boxes does not match number of irrep component labels!")
+            return None
+
+    last_component : int = 0
+    for mode in mode_info_paragraphs: # extract info on distortion modes
+        info_line = mode[0] # paragraphs include line info for each irrep
+        mode_components = mode[1:] # these are the labels displayed next to the textboxes
+        last_component += len(mode_components)
+        # first read irrep info from info_line
+        irrep_label, info_out = parse_irrep_info(info_line)
+        # now extract the actual values
+        components_out : dict = {}
+        labels_out : dict = {}
+        for i,j in enumerate(range(last_component-len(mode_components),last_component)): # map component labels to Ap values
+            components_out.update({
+                mode_components[i] : mode_amplitudes[j]
+                })
+            labels_out.update({
+                mode_components[i] : mode_names[j]
+            })
+        results.update({
+            irrep_label :
+                {'info' : info_out,
+                 'components' : components_out
+                 }
+                 })
+        labels.update({
+            irrep_label : labels_out
+        })
+
+    print("Done!")
+    print(f"Found {num_modes} irreps ({', '.join(results.keys())}) and {num_components} components.")
+    if debug == True:
+        pprint.pprint(results)
+        pprint.pprint(labels)
+
+    return (results, labels)
@@ -0,0 +1,94 @@
+import os
+import zipfile
+from pathlib import Path
+from .mode_scaling import open_scan_index, write_scan_index
+
+
+"""
+Where the structures of a mode scaling scan end up (SCALEMODES_OUTPUT).
+
+    files   one structure_s{i}.cif per scan point, next to scan_index.csv
+    zip     all structures streamed into structures.zip, with a copy of the index (index.csv)
+
+Both engines hand over the CIF text of every structure as soon as it is created, so nothing goes
+through a download directory. The index lists the scaling factor of every irrep and the
+resulting mode amplitudes of every structure; it is flushed row by row, so after an interrupted
+scan scan_index.csv still shows how far it got. Used as a context manager the output is closed
+in any case; if the scan fails, an unfinished archive is removed instead of being completed.
+"""
+
+SCAN_INDEX : str = 'scan_index.csv'
+STRUCTURE_ZIP : str = 'structures.zip'
+OUTPUT_KINDS : tuple = ('files', 'zip')
+
+def structure_name(number : int) -> str:
+    return f'structure_s{number}.cif'
+
+def amplitude_columns(mode_amplitudes : dict, irreps : list[str], scale_strains : bool = False) -> list[tuple[str,str]]:
+    '''(irrep, component) of every mode amplitude changed by the scan'''
+    return [(irrep, comp) for irrep in irreps for comp in mode_amplitudes[irrep]['components'] if scale_strains or 'strain' not in comp]
+
+
+class ScanOutput():
+    '''destination of the structures of a scan, separate CIF files or one zip archive, together with the scan index'''
+
+    def __init__(self, destination : str, irreps : list[str], mode_amplitudes : dict | None = None, kind : str = 'files', overwrite : bool = False, scale_strains : bool = False):
+        if kind not in OUTPUT_KINDS:
+            raise KeyError(f"{kind} is not a valid SCALEMODES_OUTPUT (files or zip)")
+        self.destination = destination
+        self.kind = kind
+        self.mode_amplitudes = mode_amplitudes
+        self.columns = amplitude_columns(mode_amplitudes, irreps, scale_strains) if mode_amplitudes is not None else []
+        self.count = 0
+        self.archive = None
+        if kind == 'zip':
+            self.path = os.path.join(destination, STRUCTURE_ZIP)
+            if os.path.isfile(self.path) and not overwrite:
+                raise FileExistsError(f'{STRUCTURE_ZIP} already exists in {destination} (set OVERWRITE : T to replace it).')
+            # written under a temporary name, an existing archive is only replaced by a complete one
+            self.archive = zipfile.ZipFile(self.path + '.part', 'w', compression=zipfile.ZIP_DEFLATED)
+        elif os.path.isfile(os.path.join(destination, structure_name(0))) and not overwrite: # checked before the first structure is created
+            raise FileExistsError(f'A file with the name {structure_name(0)} already exists in {destination} (set OVERWRITE : T to replace it).')
+        self.index = open_scan_index(os.path.join(destination, SCAN_INDEX), irreps, [f'{irrep} {comp}' for irrep, comp in self.columns])
+
+    def write(self, number : int, text : str, point : dict[str,float]) -> str:
+        '''adds the CIF text of one scan point, returns its file or archive member name'''
+        name = structure_name(number)
+        if self.archive is not None:
+            self.archive.writestr(name, text)
+        else:
+            Path(self.destination, name).write_text(text)
+        amplitudes = [point[irrep] * self.mode_amplitudes[irrep]['components'][comp] for irrep, comp in self.columns]
+        write_scan_index(self.index, number, name, point, amplitudes)
+        self.count += 1
+        return name
+
+    def close(self) -> None:
+        self.index.close()
+        if self.archive is not None:
+            self.archive.write(self.index.name, 'index.csv')
+            self.archive.close()
+            os.replace(self.path + '.part', self.path)
+            print(f'Saved {self.count} structures to {self.path}')
+            self.archive = None
+        return None
+
+    def discard(self) -> None:
+        '''ends a failed scan: the index keeps the finished points, an unfinished archive is removed'''
+        self.index.close()
+        if self.archive is not None:
+            self.archive.close()
+            os.remove(self.path + '.part')
+            print(f'Scan failed after {self.count} structures, removed the unfinished {self.path}.part (see {SCAN_INDEX})')
+            self.archive = None
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
@@ -0,0 +1,133 @@
+import os
+import time
+import importlib.util
+from pathlib import Path
+from fractions import Fraction
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np # type: ignore
+from .cif_tools import read_cif, cell_parameters, lattice_vectors, cell_from_vectors, format_loop
+from .preflight import expand_sites
+from .constants import FINDSYM_PAGE, MAX_WORKERS, SYM_SUFFIX, SYM_TOLERANCE
+
+
+"""
+Symmetrisation of CIF files, either with the FINDSYM web page (see findsym.py) or locally with spglib.
+"""
+
+def format_symop(rotation : np.ndarray, translation : np.ndarray) -> str:
+    '''symmetry operation in CIF notation, e.g. -x+1/2,y,z'''
+    components : list[str] = []
+    for i in range(3):
+        terms = ''
+        for j, axis in enumerate('xyz'):
+            r = int(round(rotation[i,j]))
+            if r != 0:
+                terms += ('+' if r > 0 else '-') + (str(abs(r)) if abs(r) != 1 else '') + axis
+        t = Fraction(float(translation[i]) % 1.0).limit_denominator(12) % 1
+        if t != 0:
+            terms += f'+{t}'
+        components.append(terms.lstrip('+'))
+    return ','.join(components)
+
+def symmetrised_cif_text(structure_file_path : str, tolerance : float = SYM_TOLERANCE) -> str:
+    '''detects the space group with spglib and returns the idealised conventional structure as CIF text'''
+    try: # optional, imported on first use
+        import spglib # type: ignore
+    except ImportError:
+        raise ImportError('The local symmetrisation backend needs spglib (pip install spglib).')
+    cif = read_cif(structure_file_path)
+    elements, xyz = expand_sites(cif)
+    species = list(dict.fromkeys(elements))
+    cell = (lattice_vectors(cell_parameters(cif)), xyz, [species.index(e) + 1 for e in elements])
+    standardised = spglib.standardize_cell(cell, to_primitive=False, no_idealize=False, symprec=tolerance)
+    if standardised is None:
+        raise ValueError(f'spglib could not determine the symmetry of {structure_file_path}')
+    lattice, positions, types = standardised
+    dataset = spglib.get_symmetry_dataset((lattice, positions, types), symprec=tolerance)
+    if isinstance(dataset, dict): # spglib < 2.5
+        dataset = SimpleNamespace(**dataset)
+    symops = [[str(k+1), format_symop(r, t)] for k, (r, t) in enumerate(zip(dataset.rotations, dataset.translations))]
+    unique, multiplicities = np.unique(dataset.equivalent_atoms, return_counts=True)
+    sites : list = []
+    numbers : dict = {}
+    for atom, multiplicity in zip(unique, multiplicities):
+        element = species[types[atom] - 1]
+        numbers[element] = numbers.get(element, 0) + 1
+        sites.append([f'{element}{numbers[element]}', element, str(multiplicity), dataset.wyckoffs[atom]] + [f'{x % 1.0:.6f}' for x in positions[atom]] + ['1'])
+    cell_values = cell_from_vectors(lattice)
+    lines = [
+        f"data_{Path(structure_file_path).stem}_sym",
+        f"_symmetry_space_group_name_H-M '{dataset.international}'",
+        f"_symmetry_Int_Tables_number {dataset.number}",
+        f"_space_group_IT_number {dataset.number}",
+        ] + [f"{tag} {value:.6f}" for tag, value in zip(['_cell_length_a', '_cell_length_b', '_cell_length_c', '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma'], cell_values)]
+    lines += [
+        '',
+        format_loop(['_space_group_symop_id', '_space_group_symop_operation_xyz'], symops),
+        '',
+        format_loop(['_atom_site_label', '_atom_site_type_symbol', '_atom_site_symmetry_multiplicity', '_atom_site_Wyckoff_symbol', '_atom_site_fract_x', '_atom_site_fract_y', '_atom_site_fract_z', '_atom_site_occupancy'], sites),
+        '',
+        ]
+    return '\n'.join(lines)
+
+def symmetrise_locally(structure_file_path : str, tolerance : float = SYM_TOLERANCE, overwrite : bool = False) -> None:
+    '''offline alternative to symmetrise_using_findsym, writes <name>_sym.cif next to the input file'''
+    destination : str = '/'.join(structure_file_path.split('/')[:-1])+'/' # get full path of directory
+    str_name : str = '.'.join(structure_file_path.split('/')[-1].split('.')[:-1]) # get file name without file extension
+    filepath = destination+str_name+SYM_SUFFIX
+    if os.path.isfile(filepath) and not overwrite:
+        raise FileExistsError(f'A file with the name {str_name+SYM_SUFFIX} already exists, use --overwrite to replace it.')
+    print('Symmetrising locally...', end="")
+    text = symmetrised_cif_text(structure_file_path, tolerance)
+    tmp = filepath + '.part'
+    Path(tmp).write_text(text)
+    os.replace(tmp, filepath)
+    print('Done!')
+    return None
+
+def symmetrise_files_locally(struct_files : list[str], tolerance : float = SYM_TOLERANCE, overwrite : bool = False) -> list[dict]:
+    '''symmetrises the files with the local backend, returns one summary entry per file'''
+    if importlib.util.find_spec('spglib') is None: # before any file is touched
+        raise ImportError('The local symmetrisation backend needs spglib (pip install spglib).')
+    summary : list[dict] = []
+    for i, struct_file in enumerate(struct_files):
+        print(f"symmetrising file {i+1}/{len(struct_files)}: {struct_file}")
+        started = time.perf_counter()
+        try:
+            symmetrise_locally(struct_file, tolerance, overwrite)
+            summary.append({'file' : struct_file, 'success' : True, 'time' : time.perf_counter() - started, 'error' : ''})
+        except (ValueError, KeyError, FileExistsError) as err:
+            print(f'\nSymmetrising {struct_file} failed: {type(err).__name__}: {err}')
+            summary.append({'file' : struct_file, 'success' : False, 'time' : time.perf_counter() - started, 'error' : f'{type(err).__name__}: {err}'})
+    return summary
+
+def symmetrise_parallel(struct_files : list[str], webdrv_path : str, num_workers : int, webdrv_win : bool = False, main_page : str = FINDSYM_PAGE, overwrite : bool = False, stagger : float = 2.0) -> list[dict]:
+    '''splits the files between up to MAX_WORKERS browser sessions'''
+    from .findsym import symmetrise_files # needs selenium
+    num_workers = max(1, min(num_workers, MAX_WORKERS, len(struct_files)))
+    if num_workers == 1:
+        return symmetrise_files(struct_files, webdrv_path, webdrv_win, main_page, overwrite)
+    chunks = [struct_files[i::num_workers] for i in range(num_workers)]
+    summary : list[dict] = []
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        futures = [pool.submit(symmetrise_files, chunk, webdrv_path, webdrv_win, main_page, overwrite, i*stagger) for i, chunk in enumerate(chunks)]
+        for chunk, future in zip(chunks, futures):
+            try:
+                summary += future.result()
+            except Exception as err: # e.g. the browser did not start, keep the summaries of the other workers
+                print(f'\nWorker for {len(chunk)} files failed: {type(err).__name__}: {err}')
+                summary += [{'file' : struct_file, 'success' : False, 'time' : 0.0, 'error' : f'worker failed: {type(err).__name__}: {err}'} for struct_file in chunk]
+    order = {f : i for i, f in enumerate(struct_files)}
+    return sorted(summary, key = lambda entry: order[entry['file']])
+
+def print_summary(summary : list[dict]) -> None:
+    '''per-file timing and success overview'''
+    print('\nSummary:')
+    for entry in summary:
+        status = 'OK    ' if entry['success'] else 'FAILED'
+        print(f"{status} {entry['time']:7.1f} s  {entry['file']}  {entry['error']}")
+    done = [entry['time'] for entry in summary if entry['success']]
+    total = sum(entry['time'] for entry in summary)
+    print(f"{len(done)}/{len(summary)} files symmetrised in {total:.1f} s" + (f" ({total/len(summary):.1f} s per file)" if summary else ''))
+    return None
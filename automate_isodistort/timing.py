@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import uuid
+import argparse
+import functools
+from contextlib import contextmanager
+import numpy as np # type: ignore
+
+
+"""
+Named timing spans for the stages of a run.
+
+Every span (browser start, page loads, uploads, parsing, downloads, ...) is kept in memory and,
+if a trace file is set, appended to it as one JSON line. The trace file and the run id are passed
+on to worker processes through environment variables, so the spans of all workers of a batch end
+up in the same trace and can be summarised together.
+"""
+
+TRACE_ENV : str = 'AUTOMATE_ISODISTORT_TRACE'
+RUN_ENV : str = 'AUTOMATE_ISODISTORT_RUN'
+
+_records : list[dict] = []
+_job : str | None = None
+
+def set_trace_file(trace_file : str | None) -> str:
+    '''starts a new run, spans are appended to trace_file (if given), returns the run id'''
+    run = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}" # unique also for several runs (manifest jobs) in one process
+    os.environ[RUN_ENV] = run
+    if trace_file is not None:
+        os.environ[TRACE_ENV] = os.path.abspath(os.path.expanduser(trace_file))
+    else:
+        os.environ.pop(TRACE_ENV, None)
+    _records.clear()
+    return run
+
+@contextmanager
+def job(name : str | None):
+    '''spans inside this block are attributed to the job (e.g. the child structure file)'''
+    global _job
+    previous, _job = _job, name
+    try:
+        yield
+    finally:
+        _job = previous
+
+@contextmanager
+def span(stage : str, **fields):
+    '''times the enclosed block as one stage'''
+    started = time.time()
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record : dict = {
+            'run' : os.environ.get(RUN_ENV),
+            'stage' : stage,
+            'job' : _job,
+            'start' : started,
+            'duration' : time.perf_counter() - start,
+            'ok' : ok,
+            'pid' : os.getpid(),
+        }
+        record.update(fields)
+        _records.append(record)
+        trace_file = os.environ.get(TRACE_ENV)
+        if trace_file is not None:
+            with open(trace_file, 'a') as ff: # whole lines, safe with several worker processes
+                ff.write(json.dumps(record) + '\n')
+
+def timed(stage : str):
+    '''decorator version of span'''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def read_trace(trace_file : str, run : str | None = None) -> list[dict]:
+    '''spans of a trace file, only those of one run if given'''
+    records : list[dict] = []
+    with open(trace_file, 'r') as ff:
+        for line in ff:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError: # line cut off by a crash
+                continue
+            if run is None or record.get('run') == run:
+                records.append(record)
+    return records
+
+def run_records() -> list[dict]:
+    '''spans of the current run, including those of worker processes if a trace file is set'''
+    trace_file = os.environ.get(TRACE_ENV)
+    if trace_file is not None and os.path.isfile(trace_file):
+        return read_trace(trace_file, os.environ.get(RUN_ENV))
+    return list(_records)
+
+def summarise(records : list[dict]) -> dict[str,dict]:
+    '''count, total, mean, median, 90th percentile and maximum duration of every stage, in order of first appearance'''
+    durations : dict = {}
+    failed : dict = {}
+    for record in records:
+        durations.setdefault(record['stage'], []).append(record['duration'])
+        failed[record['stage']] = failed.get(record['stage'], 0) + (0 if record.get('ok', True) else 1)
+    summary : dict = {}
+    for stage, values in durations.items():
+        d = np.array(values)
+        summary[stage] = {
+            'count' : len(d),
+            'failed' : failed[stage],
+            'total' : float(d.sum()),
+            'mean' : float(d.mean()),
+            'p50' : float(np.percentile(d, 50)),
+            'p90' : float(np.percentile(d, 90)),
+            'max' : float(d.max()),
+        }
+    return summary
+
+def print_summary(records : list[dict]) -> None:
+    '''table of the time spent in every stage'''
+    summary = summarise(records)
+    if not summary:
+        return None
+    print(f"\n{'stage':<20}{'count':>7}{'failed':>7}{'total/s':>10}{'mean/s':>9}{'p50/s':>9}{'p90/s':>9}{'max/s':>9}")
+    for stage, s in summary.items():
+        print(f"{stage:<20}{s['count']:>7}{s['failed']:>7}{s['total']:>10.2f}{s['mean']:>9.3f}{s['p50']:>9.3f}{s['p90']:>9.3f}{s['max']:>9.3f}")
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='timing',
+        description='Summarise the time spent in every stage from a trace file',
+    )
+    parser.add_argument('trace', type=str, help='trace file (JSON lines)')
+    parser.add_argument('--run', type=str, default=None, help='only summarise this run (default: the last run in the file)')
+    parser.add_argument('--all', action='store_true', help='summarise all runs in the file together')
+    args = parser.parse_args()
+
+    records = read_trace(args.trace)
+    run = args.run if args.run is not None or args.all else (records[-1].get('run') if records else None)
+    if run is not None:
+        records = [r for r in records if r.get('run') == run]
+        print(f'run {run}')
+    print_summary(records)
@@ -0,0 +1,487 @@
+import os
+import sys
+import pprint
+import warnings
+import numpy as np # type: ignore
+from .files import file_check, expand_file_list, save_to_file, read_from_file
+from .infofile import text_tags, option_tags_bool, option_tags_other, read_usr_info
+from .isodistort_http import decompose_series_http
+from .decompose import selenium_backend, decompose_with_retries, decompose_parallel, start_session, mode_basis_in_session, end_session
+from .preflight import validate_jobs
+from .basis_search import find_basis, print_candidates
+from .origin_search import find_origin, print_origins
+from .timing import span, job, set_trace_file, run_records, print_summary
+from .job_journal import journal_record, finished_jobs, journal_summary
+from .mode_cache import cache_key, basis_key, load_cached, store_cached, load_cached_file, store_cached_file
+from .mode_store import append_series_to_store
+from .results_archive import archive_text, archive_file
+from .mode_scaling import read_mode_basis, child_basis, generate_scaled_structures_local, parse_scan_ranges, count_scan_points, scan_points
+from .scan_output import ScanOutput
+from .local_decomposition import BASIS_SUFFIX, RESIDUAL_TOLERANCE, decompose_locally, results_deviation, validation_sample
+
+
+"""
+The workflow configured by an infofile: mode decomposition of one or more child structures,
+optionally followed by the generation of structures with scaled mode amplitudes.
+"""
+
+def print_versions() -> None:
+    print(f'Using Python version {sys.version}')
+    print(f'Using numpy version {np.__version__}')
+    if 'selenium' in sys.modules:
+        print(f"Using Selenium version {sys.modules['selenium'].__version__}")
+    return None
+
+def output_path(output_dir : str | None, name : str) -> str:
+    return name if output_dir is None else os.path.join(output_dir, name)
+
+def run(infofile : str, resume : bool = False, scale : bool = False) -> None:
+    '''runs everything requested in the infofile, scale forces SCALEMODES on
+    resume skips the structures recorded as finished in the job journal
+    '''
+    print("")
+    # read user input file
+    run_config(read_usr_info(infofile, text_tags, option_tags_bool, option_tags_other), resume, scale)
+    return None
+
+def decompose_children(pending : list[str], walker_text : dict, tags_bool : dict, tags_other : dict, origin : None|np.ndarray, main_page : str, webdrv_path : str, journal : str | None, basis_destination : str | None = None) -> tuple[dict,dict,object,object,str|None]:
+    '''decomposes the child structures with ISODISTORT as configured, returns results and labels keyed by child file,
+    the browser session (driver, wait) if it is left open for scaling the modes of a single structure, else (None, None),
+    and the CIF with the mode definitions if a single structure was decomposed with the HTTP backend and basis_destination is given (for the local scaling engine)
+    '''
+    debug = tags_bool['DEBUG']
+    max_attempts : int = int(tags_other['MAX_ATTEMPTS'])
+    backoff : float = float(tags_other['RETRY_BACKOFF'])
+    archive_dir = tags_other['ARCHIVE_DIR'] # raw results pages and CIF's, for parsing them again offline
+    driver, wait = None, None
+    basis_file = None
+
+    if len(pending) > 1 and int(tags_other['NUM_WORKERS']) > 1:
+        # spread the child structures over several sessions in parallel
+        new_results, new_labels = decompose_parallel(
+            pending,
+            file_check(walker_text['PARENT_FILE']),
+            walker_text['BASIS_TRANSFORM'],
+            origin,
+            main_page,
+            webdrv_path,
+            int(tags_other['NUM_WORKERS']),
+            backend=tags_other['BACKEND'].lower(),
+            journal=journal,
+            max_attempts=max_attempts,
+            backoff=backoff,
+            debug=debug,
+            archive_dir=archive_dir
+            )
+
+    elif journal is not None:
+        # unattended run: record every structure, restart the session and retry on failures
+        new_results, new_labels = decompose_with_retries(
+            pending,
+            file_check(walker_text['PARENT_FILE']),
+            walker_text['BASIS_TRANSFORM'],
+            origin,
+            main_page,
+            webdrv_path,
+            tags_other['BACKEND'].lower(),
+            journal,
+            max_attempts,
+            backoff,
+            tags_other['DOWNLOAD_DIR'],
+            debug,
+            archive_dir
+            )
+
+    elif tags_other['BACKEND'].lower() == 'http' and basis_destination is not None and len(pending) == 1:
+        # the mode definitions for the local scaling engine come from the same results page
+        session = None
+        try:
+            with job(pending[0]):
+                session = start_session(file_check(walker_text['PARENT_FILE']), main_page, webdrv_path, 'http', debug=debug, archive_dir=archive_dir, record_dir=tags_other['RECORD_DIR'])
+                basis_file, results, labels = mode_basis_in_session(pending[0], walker_text['BASIS_TRANSFORM'], origin, session, basis_destination)
+        finally:
+            end_session(session)
+        new_results, new_labels = {pending[0] : results}, {pending[0] : labels}
+
+    elif tags_other['BACKEND'].lower() == 'http':
+        # submit the forms directly without a browser
+        new_results, new_labels = decompose_series_http(
+            main_page,
+            file_check(walker_text['PARENT_FILE']),
+            pending,
+            walker_text['BASIS_TRANSFORM'],
+            origin,
+            debug=debug,
+            record_dir=tags_other['RECORD_DIR'],
+            archive_dir=archive_dir
+            )
+        
+    else:
+        # Set up webdriver and options
+        from .browser import webdriver_setup # needs selenium, not imported for the HTTP backend
+        selenium = selenium_backend()
+        driver, wait = webdriver_setup(tags_bool['WEBDRV_WINDOW'], webdrv_path, tags_other['DOWNLOAD_DIR'])
+
+        # load isodistort main page
+        print('Opening ISODISTORT...', end="")
+        with span('main_page'):
+            driver.get(main_page)
+        print('Done!')
+
+        # upload parent structure file (once for all child structures)
+        selenium.upload_parent_struct(walker_text['PARENT_FILE'], driver)
+
+        if len(pending) > 1:
+            new_results, new_labels = selenium.decompose_series(pending, walker_text['BASIS_TRANSFORM'], origin, driver, wait, debug, file_check(walker_text['PARENT_FILE']), archive_dir)
+        else:
+            new_results, new_labels = {}, {}
+            with job(pending[0]):
+                # upload distorted structure file
+                selenium.upload_child_struct(pending[0], driver, wait)
+
+                # transform basis
+                selenium.transform_basis(walker_text['BASIS_TRANSFORM'], origin, driver)
+                if archive_dir is not None:
+                    archive_text(archive_dir, file_check(walker_text['PARENT_FILE']), pending[0], walker_text['BASIS_TRANSFORM'], origin, driver.page_source)
+
+                # read A_p values and interal element names
+                new_results[pending[0]], new_labels[pending[0]] = selenium.read_mode_amplitudes(driver, debug=debug)
+
+            if debug: selenium.benchmark_extractors(driver)
+
+    return new_results, new_labels, driver, wait, basis_file
+
+def local_mode_basis(reference : str, walker_text : dict, tags_bool : dict, tags_other : dict, origin : None|np.ndarray, main_page : str, webdrv_path : str, destination : str) -> tuple[dict,dict,dict,bool]:
+    '''mode basis of the series and the (results, labels) of the structure it was created for, from the cache or else from ISODISTORT
+    the last value is True if the reference structure was decomposed just now
+    '''
+    parent_file = file_check(walker_text['PARENT_FILE'])
+    key = basis_key(parent_file, walker_text['BASIS_TRANSFORM'], origin, main_page)
+    if tags_bool['USE_CACHE']:
+        basis_file = load_cached_file(key, BASIS_SUFFIX, tags_other['CACHE_DIR'])
+        template = load_cached(key, tags_other['CACHE_DIR'])
+        if basis_file is not None and template is not None:
+            print(f'Using cached mode basis {basis_file}')
+            return read_mode_basis(basis_file), template[0], template[1], False
+    print(f'Fetching the mode basis for {reference}...')
+    session = None
+    try:
+        with job(reference):
+            session = start_session(parent_file, main_page, webdrv_path, tags_other['BACKEND'].lower(), download_dir=tags_other['DOWNLOAD_DIR'], debug=tags_bool['DEBUG'], archive_dir=tags_other['ARCHIVE_DIR'])
+            basis_file, results, labels = mode_basis_in_session(reference, walker_text['BASIS_TRANSFORM'], origin, session, destination)
+    finally:
+        end_session(session)
+    if tags_bool['USE_CACHE']:
+        store_cached_file(key, basis_file, BASIS_SUFFIX, tags_other['CACHE_DIR'], float(tags_other['CACHE_MAX_SIZE']))
+        store_cached(key, results, labels, tags_other['CACHE_DIR'], float(tags_other['CACHE_MAX_SIZE']), source={'parent' : parent_file, 'child' : reference})
+    return read_mode_basis(basis_file), results, labels, True
+
+def decompose_series_local(pending : list[str], walker_text : dict, tags_bool : dict, tags_other : dict, origin : None|np.ndarray, main_page : str, webdrv_path : str, journal : str | None, output_dir : str | None) -> tuple[dict,dict,list[str]]:
+    '''DECOMPOSE_ENGINE : local, the mode basis is fetched once and a sample of the series is decomposed by ISODISTORT
+    if the local amplitudes of the sample agree within LOCAL_TOLERANCE, all other structures are projected locally
+    returns results and labels keyed by child file and the structures decomposed locally, the structures left out go to ISODISTORT
+    '''
+    series_results : dict = {}
+    series_labels : dict = {}
+    try:
+        basis, template_results, template_labels, fresh = local_mode_basis(pending[0], walker_text, tags_bool, tags_other, origin, main_page, webdrv_path, output_dir or os.getcwd())
+    except Exception as err: # the series can still be decomposed by ISODISTORT
+        warnings.warn(f'Fetching the mode basis failed ({type(err).__name__}: {err}), decomposing all structures with ISODISTORT.')
+        return series_results, series_labels, []
+    if fresh:
+        series_results[pending[0]], series_labels[pending[0]] = template_results, template_labels
+        if journal is not None: journal_record(journal, pending[0], 'done', attempt=1, results=template_results, labels=template_labels)
+
+    remaining = [child for child in pending if child not in series_results]
+    sample = validation_sample(remaining, int(tags_other['LOCAL_SAMPLE']))
+    print(f'Decomposing {len(sample)} structures with ISODISTORT to validate the local engine...')
+    new_results, new_labels, driver, _, _ = decompose_children(sample, walker_text, tags_bool, tags_other, origin, main_page, webdrv_path, journal)
+    if driver is not None:
+        driver.quit()
+    series_results.update(new_results)
+    series_labels.update(new_labels)
+
+    try:
+        with span('local_decomposition'):
+            local_results, local_labels, residuals = decompose_locally(basis, template_results, template_labels, pending)
+    except (ValueError, KeyError) as err:
+        warnings.warn(f'The local engine cannot use this mode basis ({err}), decomposing all structures with ISODISTORT.')
+        return series_results, series_labels, []
+    checked = [child for child in pending if child in series_results]
+    if not checked:
+        warnings.warn('None of the validation structures could be decomposed by ISODISTORT, the local engine is not used.')
+        return series_results, series_labels, []
+    deviation = max(results_deviation(local_results[child], series_results[child]) for child in checked)
+    print(f"Local engine: largest deviation from ISODISTORT {deviation:.5f} on {len(checked)} structures (LOCAL_TOLERANCE {tags_other['LOCAL_TOLERANCE']})")
+    if deviation > float(tags_other['LOCAL_TOLERANCE']):
+        warnings.warn('The local engine does not reproduce the ISODISTORT results, decomposing all structures with ISODISTORT.')
+        return series_results, series_labels, []
+
+    unexplained = [child for child in remaining if child not in sample and residuals[child] > RESIDUAL_TOLERANCE]
+    if unexplained:
+        warnings.warn(f'{len(unexplained)} structures are not described by the mode basis (e.g. of lower symmetry), decomposing them with ISODISTORT.')
+    accepted = [child for child in remaining if child not in sample and child not in unexplained]
+    for child in accepted:
+        series_results[child], series_labels[child] = local_results[child], local_labels[child]
+        if journal is not None: journal_record(journal, child, 'done', engine='local', results=local_results[child], labels=local_labels[child])
+    print(f'Decomposed {len(accepted)} structures locally.')
+    return series_results, series_labels, accepted
+
+def run_config(config : tuple, resume : bool = False, scale : bool = False) -> None:
+    '''runs one job given by the settings from read_usr_info() (or a manifest job)'''
+    webdrv_path, main_page, walker_text, tags_bool, tags_other = config
+    walker_text, tags_bool, tags_other = dict(walker_text), dict(tags_bool), dict(tags_other) # the job can be run again
+    if scale:
+        tags_bool['SCALEMODES'] = True
+
+    debug = tags_bool['DEBUG']
+    set_trace_file(tags_other['TRACE_FILE']) # timing spans of all stages (and worker processes)
+
+    if debug:
+        # Read back input tags parsed from infofile
+        print('INFO: debugging mode enabled.')
+        print_versions()
+        print('required text tags:')
+        pprint.pprint(walker_text)
+        print('optional tags (boolean):')
+        pprint.pprint(tags_bool)
+        print('optional tags (other):')
+        pprint.pprint(tags_other)
+
+
+    child_files : list[str] = expand_file_list(walker_text['DISTORTED_FILE'])
+    batch : bool = len(child_files) > 1 # decompose several child structures against the same parent
+    driver = None
+    fetched_basis = None # mode definitions fetched together with the decomposition, for the local scaling engine
+    sends_structures : bool = not tags_bool['READ_MODE'] or tags_bool['SCALEMODES'] # BASIS_TRANSFORM and ORIGIN_SHIFT are needed
+
+    if isinstance(walker_text['BASIS_TRANSFORM'], str) and sends_structures: # BASIS_TRANSFORM : auto
+        candidates = find_basis(file_check(walker_text['PARENT_FILE']), child_files[0])
+        if not candidates:
+            raise ValueError('No basis transformation matrix found, please specify BASIS_TRANSFORM explicitly.')
+        print('Basis transformation candidates (best first):')
+        print_candidates(candidates[:5])
+        equivalent = [matrix for matrix, score in candidates if np.isclose(score, candidates[0][1], atol=1e-6)]
+        if len(equivalent) > 1:
+            warnings.warn(f'{len(equivalent)} basis transformations fit the child cell equally well, using the simplest one. These can differ in the orientation of the child structure, check the result.')
+        walker_text['BASIS_TRANSFORM'] = candidates[0][0]
+        print(f"Using BASIS_TRANSFORM : {' '.join(str(x) for x in walker_text['BASIS_TRANSFORM'].flatten())}")
+
+    if not tags_bool['READ_MODE'] and tags_bool['PREFLIGHT']:
+        # check the jobs locally before anything is sent to ISODISTORT
+        with span('preflight'):
+            problems = validate_jobs(file_check(walker_text['PARENT_FILE']), child_files, walker_text['BASIS_TRANSFORM'], None if isinstance(tags_other['ORIGIN_SHIFT'], str) else tags_other['ORIGIN_SHIFT'], float(tags_other['CELL_TOLERANCE']))
+        rejected = [child for child in child_files if problems[child]]
+        for child in rejected:
+            print(f'Rejected {child}:')
+            for problem in problems[child]:
+                print(f'    {problem}')
+        if rejected and not batch:
+            raise ValueError(f"Pre-flight check failed for {child_files[0]}: {' '.join(problems[child_files[0]])}")
+        if len(rejected) == len(child_files):
+            raise ValueError('Pre-flight check failed for all child structures.')
+        if rejected:
+            warnings.warn(f'Skipping {len(rejected)}/{len(child_files)} child structures that failed the pre-flight check.')
+        child_files = [child for child in child_files if child not in rejected]
+
+    if isinstance(tags_other['ORIGIN_SHIFT'], str) and sends_structures: # ORIGIN_SHIFT : auto, one origin for the whole series
+        if isinstance(walker_text['BASIS_TRANSFORM'], str):
+            raise ValueError('ORIGIN_SHIFT : auto needs the basis transformation matrix, which has not been determined.')
+        with span('origin_search'):
+            tags_other['ORIGIN_SHIFT'], per_child = find_origin(file_check(walker_text['PARENT_FILE']), child_files, walker_text['BASIS_TRANSFORM'])
+        print_origins(tags_other['ORIGIN_SHIFT'], per_child)
+        print(f"Using ORIGIN_SHIFT : {' '.join(f'{x:g}' for x in tags_other['ORIGIN_SHIFT'])}")
+    origin = tags_other['ORIGIN_SHIFT']
+    if debug and origin is not None and not isinstance(origin, str): print(f'\norigin shifted by ({origin[0]})a + ({origin[1]})b + ({origin[2]})c')
+
+    series_results : dict = {} # results and labels keyed by child file
+    series_labels : dict = {}
+    if not tags_bool['READ_MODE'] and tags_bool['USE_CACHE']:
+        # look up previous decompositions of identical inputs
+        parent_file = file_check(walker_text['PARENT_FILE'])
+        keys : dict = {child : cache_key(parent_file, child, walker_text['BASIS_TRANSFORM'], origin, main_page) for child in child_files}
+        for child in child_files:
+            cached = load_cached(keys[child], tags_other['CACHE_DIR'])
+            if cached is not None:
+                series_results[child], series_labels[child] = cached
+        print(f'Found {len(series_results)}/{len(child_files)} decompositions in the cache.')
+    journal = tags_other['JOURNAL_FILE']
+    output_dir = tags_other['OUTPUT_DIR'] # None: results in the working directory, scaled structures next to the child structure
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    if resume and journal is None:
+        journal = output_path(output_dir, 'journal.jsonl')
+    if resume and not tags_bool['READ_MODE']:
+        # skip the structures finished in a previous run
+        done = finished_jobs(journal)
+        for child in child_files:
+            if child in done and child not in series_results:
+                series_results[child], series_labels[child] = done[child]['results'], done[child]['labels']
+        print(f'Resuming from {journal}: {sum(1 for child in child_files if child in done)}/{len(child_files)} structures already finished.')
+    pending : list[str] = [] if tags_bool['READ_MODE'] else [child for child in child_files if child not in series_results]
+    archive_dir = tags_other['ARCHIVE_DIR'] # raw results pages and CIF's, for parsing them again offline
+
+    local_children : list[str] = [] # decomposed by the local engine, these are not cached
+    if tags_other['DECOMPOSE_ENGINE'].lower() == 'local' and len(pending) > max(1, int(tags_other['LOCAL_SAMPLE'])) + 1:
+        # project the series onto the mode basis, ISODISTORT only for the reference and the validation sample
+        new_results, new_labels, local_children = decompose_series_local(pending, walker_text, tags_bool, tags_other, origin, main_page, webdrv_path, journal, output_dir)
+        series_results.update(new_results)
+        series_labels.update(new_labels)
+    remaining : list[str] = [child for child in pending if child not in series_results]
+    if remaining:
+        scaling_locally = tags_bool['SCALEMODES'] and tags_other['SCALEMODES_ENGINE'].lower() == 'local' and not batch
+        basis_destination = (os.path.dirname(child_files[0]) if output_dir is None else output_dir) if scaling_locally else None
+        new_results, new_labels, driver, wait, fetched_basis = decompose_children(remaining, walker_text, tags_bool, tags_other, origin, main_page, webdrv_path, journal, basis_destination)
+        series_results.update(new_results)
+        series_labels.update(new_labels)
+
+    if journal is not None and not tags_bool['READ_MODE']:
+        print(f'Job journal {journal}: {journal_summary(journal)}')
+
+    if pending and tags_bool['USE_CACHE']:
+        for child in [child for child in pending if child in series_results and child not in local_children]:
+            store_cached(
+                keys[child],
+                series_results[child],
+                series_labels[child],
+                tags_other['CACHE_DIR'],
+                float(tags_other['CACHE_MAX_SIZE']),
+                source={'parent' : parent_file, 'child' : child}
+                )
+
+    missing = [child for child in child_files if child not in series_results and not tags_bool['READ_MODE']]
+    if missing:
+        raise RuntimeError(f"{len(missing)} structures could not be decomposed, rerun with --resume to retry them.")
+
+    if not tags_bool['READ_MODE'] and not batch:
+        mode_amplitudes, box_labels = series_results[child_files[0]], series_labels[child_files[0]]
+
+    if not tags_bool['READ_MODE'] and tags_bool['WRITE_FILE']:
+        if batch:
+            save_to_file(series_results, filename=output_path(output_dir, 'modeamplitudes_batch'))
+            save_to_file(series_labels, filename=output_path(output_dir, 'mode_labels_batch'))
+        else:
+            save_to_file(mode_amplitudes, filename=output_path(output_dir, 'modeamplitudes'))
+            save_to_file(box_labels, filename=output_path(output_dir, 'mode_labels'))
+
+    if not tags_bool['READ_MODE'] and tags_other['STORE_DIR'] is not None:
+        # one row per structure in the columnar store, after the YAML files so a mismatching store loses nothing
+        try:
+            append_series_to_store(tags_other['STORE_DIR'], {child : series_results[child] for child in child_files}, {child : series_labels[child] for child in child_files})
+            print(f"Stored {len(child_files)} structures in {tags_other['STORE_DIR']} (existing rows replaced)")
+        except ValueError as err: # e.g. a STORE_DIR of another parent
+            warnings.warn(f'The results were not added to the store: {err}')
+
+    if tags_bool['READ_MODE']:
+        # mode amplitudes are instead read from YAML file
+        print('INFO: Read mode enabled.')
+        mode_amplitudes = read_from_file(output_path(output_dir, 'modeamplitudes.yaml'))
+        print('File read successfully.')
+
+        if debug: pprint.pprint(mode_amplitudes)
+        box_labels = read_from_file(output_path(output_dir, 'mode_labels.yaml'))
+        print('File read successfully.')
+        if debug: pprint.pprint(box_labels)
+
+    if tags_bool['SCALEMODES']:
+        destination : str = '/'.join(child_files[0].split('/')[:-1]) if output_dir is None else output_dir # where to saved to structure files to
+
+        # some sanity checks
+        if batch:
+            raise AttributeError("Scaling of modes is only possible for a single DISTORTED_FILE.")
+
+        # read the scan ranges for each irrep
+        if tags_other['SCALEMODES_RANGES'] is not None:
+            scan_ranges : dict = parse_scan_ranges(tags_other['SCALEMODES_RANGES'])
+        elif tags_other['SCALEMODES_LABELS'] is None:
+            raise AttributeError("Scaling of modes was requested but no mode labels were provided!")
+        else:
+            factor_min : float = float(tags_other['SCALEMODES_MIN'])
+            factor_max : float = float(tags_other['SCALEMODES_MAX'])
+            num_steps : int = int(tags_other['SCALEMODES_STEPS'])
+            if factor_max < factor_min:
+                raise AttributeError(f"Minimum scaling factor ({factor_min}) is larger than maximum scaling factor ({factor_max}).")
+            scan_ranges = {mode : (factor_min, factor_max, num_steps) for mode in tags_other['SCALEMODES_LABELS'].split()}
+        missing = [mode for mode in scan_ranges.keys() if mode not in mode_amplitudes]
+        if missing:
+            raise KeyError(f"No irreps {', '.join(missing)} found in the mode amplitudes.")
+        scan_grid : str = tags_other['SCALEMODES_GRID'].lower()
+        num_points = count_scan_points(scan_ranges, scan_grid)
+        print(f"Scanning {', '.join(scan_ranges.keys())} on a {scan_grid} grid ({num_points if num_points is not None else 'listed'} points).")
+        if debug: pprint.pprint(scan_ranges)
+
+        # scan points are generated lazily, each structure is added to the output and the index as soon as it is created
+        points = scan_points(scan_ranges, scan_grid, tags_other['SCALEMODES_GRID_FILE'])
+        with ScanOutput(destination, list(scan_ranges.keys()), mode_amplitudes, tags_other['SCALEMODES_OUTPUT'].lower(), tags_bool['OVERWRITE'], tags_bool['SCALE_STRAINS']) as output: # closed, or removed if a point fails
+
+            basis_file = fetched_basis
+            cached = False
+            if tags_other['SCALEMODES_ENGINE'].lower() == 'local' and tags_bool['USE_CACHE']:
+                # same entry as the mode basis of DECOMPOSE_ENGINE : local
+                scaling_key = basis_key(file_check(walker_text['PARENT_FILE']), walker_text['BASIS_TRANSFORM'], origin, main_page)
+                if basis_file is None:
+                    basis_file = load_cached_file(scaling_key, BASIS_SUFFIX, tags_other['CACHE_DIR'])
+                    cached = basis_file is not None
+
+            if tags_other['SCALEMODES_ENGINE'].lower() == 'local':
+                # fetch the mode definitions once, then create all structures locally
+                if cached:
+                    print(f'Using cached mode definitions {basis_file}')
+                elif basis_file is not None:
+                    print(f'Using the mode definitions fetched with the decomposition {basis_file}')
+                elif driver is not None:
+                    print('Reusing distortion page from the mode decomposition.')
+                    basis_file = selenium_backend().fetch_mode_basis(destination, driver, wait)
+                    if archive_dir is not None:
+                        archive_file(archive_dir, file_check(walker_text['PARENT_FILE']), child_files[0], walker_text['BASIS_TRANSFORM'], origin, basis_file)
+                else: # nothing fetched in this run, a new session with the configured backend (no browser for BACKEND : http)
+                    session = None
+                    try:
+                        session = start_session(file_check(walker_text['PARENT_FILE']), main_page, webdrv_path, tags_other['BACKEND'].lower(), tags_bool['WEBDRV_WINDOW'], tags_other['DOWNLOAD_DIR'], debug, archive_dir, tags_other['RECORD_DIR'])
+                        basis_file = mode_basis_in_session(child_files[0], walker_text['BASIS_TRANSFORM'], origin, session, destination)[0]
+                    finally:
+                        end_session(session)
+                if tags_bool['USE_CACHE'] and not cached:
+                    store_cached_file(scaling_key, basis_file, BASIS_SUFFIX, tags_other['CACHE_DIR'], float(tags_other['CACHE_MAX_SIZE']))
+                    store_cached(scaling_key, mode_amplitudes, box_labels, tags_other['CACHE_DIR'], float(tags_other['CACHE_MAX_SIZE']), source={'parent' : file_check(walker_text['PARENT_FILE']), 'child' : child_files[0]})
+                with span('local_scaling'):
+                    generate_scaled_structures_local(child_basis(read_mode_basis(basis_file), mode_amplitudes, box_labels), box_labels, points, output, tags_bool['SCALE_STRAINS'])
+            else:
+                if driver is None: # no browser session left over from the decomposition
+                    # Set up webdriver and options
+                    from .browser import webdriver_setup
+                    selenium = selenium_backend()
+                    driver, wait = webdriver_setup(tags_bool['WEBDRV_WINDOW'], webdrv_path, tags_other['DOWNLOAD_DIR'])
+
+                    # load isodistort main page
+                    print('Opening ISODISTORT...', end="")
+                    with span('main_page'):
+                        driver.get(main_page)
+                    print('Done!')
+
+                    # upload parent structure file
+                    selenium.upload_parent_struct(walker_text['PARENT_FILE'], driver)
+
+                    # upload distorted structure file
+                    selenium.upload_child_struct(child_files[0], driver, wait)
+
+                    # transform basis
+                    selenium.transform_basis(walker_text['BASIS_TRANSFORM'], origin, driver)
+                else:
+                    selenium = selenium_backend()
+                    print('Reusing distortion page from the mode decomposition.')
+
+                # create CIF's with scaled mode amplitudes
+                selenium.generate_scaled_structures(points, mode_amplitudes, box_labels, output, driver, wait, tags_bool['SCALE_STRAINS'], debug=debug)
+
+    if driver is not None:
+        if tags_bool['WEBDRV_WINDOW']: # allow user to inspect window before closing
+            print('Press enter to close all when done')
+            input()
+
+        driver.quit()
+
+    if tags_other['TRACE_FILE'] is not None or debug:
+        print_summary(run_records()) # where the time went
+    print('All Done!')
+    return None
@@ -0,0 +1,30 @@
+import numpy as np # type: ignore
+from automate_isodistort.analysis import amplitude_table, irrep_totals, opd_directions
+
+
+"""
+Irrep amplitudes of a series, displacive and strain parts kept apart.
+"""
+
+SERIES : dict = {
+    'a.cif' : {
+        'GM1+(a)' : {'info' : {}, 'components' : {'A1' : 0.3, 'A2' : 0.4, 'strain1(a)' : 0.01}},
+        'X3-(a)' : {'info' : {}, 'components' : {'A3' : -0.5}},
+        },
+    'b.cif' : {
+        'GM1+(a)' : {'info' : {}, 'components' : {'A1' : 0.0, 'A2' : 0.0, 'strain1(a)' : -0.02}},
+        },
+    }
+
+def test_irrep_totals():
+    _, columns, matrix = amplitude_table(SERIES)
+    groups, totals = irrep_totals(columns, matrix)
+    assert groups == ['GM1+(a)', 'GM1+(a) strain', 'X3-(a)']
+    np.testing.assert_allclose(totals[0], [0.5, 0.01, 0.5]) # not sqrt(0.3^2 + 0.4^2 + 0.01^2)
+    np.testing.assert_allclose(totals[1], [0.0, 0.02, np.nan])
+
+def test_opd_directions():
+    _, columns, matrix = amplitude_table(SERIES)
+    directions = opd_directions(columns, matrix)
+    np.testing.assert_allclose(directions[0], [0.6, 0.8, 1.0, -1.0])
+    np.testing.assert_allclose(directions[1], [np.nan, np.nan, -1.0, np.nan]) # no displacive distortion
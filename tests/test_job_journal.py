@@ -0,0 +1,29 @@
+from automate_isodistort.job_journal import journal_record, read_journal, finished_jobs, journal_summary, backoff_delay
+
+
+"""
+Reading the job journal back to resume an interrupted series.
+"""
+
+def test_resume_state(tmp_path):
+    journal = str(tmp_path / 'journal.jsonl')
+    results = {'GM1+' : {'info' : {}, 'components' : {'A' : 0.5}}}
+    journal_record(journal, 'a.cif', 'started', attempt=1)
+    journal_record(journal, 'a.cif', 'done', attempt=1, results=results, labels={'GM1+' : {'A' : 'mode0001'}})
+    journal_record(journal, 'b.cif', 'started', attempt=1)
+    journal_record(journal, 'b.cif', 'failed', attempt=1, error='TimeoutError')
+    journal_record(journal, 'c.cif', 'done', attempt=2, results=results, labels={})
+    journal_record(journal, 'c.cif', 'started', attempt=1) # decomposed again, not finished this time
+    with open(journal, 'a') as ff:
+        ff.write('{"job": "d.cif", "state": "do') # cut off by a crash
+    assert list(read_journal(journal)) == ['a.cif', 'b.cif', 'c.cif']
+    done = finished_jobs(journal)
+    assert list(done) == ['a.cif']
+    assert done['a.cif']['results'] == results
+    assert journal_summary(journal) == {'done' : 1, 'failed' : 1, 'started' : 1}
+
+def test_missing_journal(tmp_path):
+    assert finished_jobs(str(tmp_path / 'none.jsonl')) == {}
+
+def test_backoff_delay():
+    assert [backoff_delay(attempt, 10.0) for attempt in range(1, 5)] == [0.0, 10.0, 20.0, 40.0]
@@ -0,0 +1,45 @@
+import pytest # type: ignore
+from automate_isodistort.mock_server import synthetic_cif, synthetic_modes
+from automate_isodistort.mode_scaling import read_mode_basis, child_basis, generate_scaled_structures_local, scan_points, compare_structures
+from automate_isodistort.local_decomposition import decompose_locally
+from automate_isodistort.scan_output import ScanOutput
+
+
+"""
+Round trip of the local engine: structures scaled from a mode basis are decomposed back onto it.
+The basis is the ISODISTORT style CIF of mock_server.py, created for another structure of the series.
+"""
+
+IRREPS : list = synthetic_modes(2, 3) # GM1+(a): two displacive modes and a strain mode, GM2+(a): one displacive mode
+
+def amplitudes(values : dict[str,float]) -> tuple[dict, dict]:
+    '''results and labels as read from the distortion page, in page order'''
+    results = {f'GM{j+1}+(a)' : {'info' : {}, 'components' : {label : values[box] for label, box in modes}} for j, modes in enumerate(IRREPS)}
+    labels = {f'GM{j+1}+(a)' : {label : box for label, box in modes} for j, modes in enumerate(IRREPS)}
+    return results, labels
+
+BASIS_VALUES : dict = {'mode0001' : 0.4, 'mode0002' : -0.2, 'mode0003' : 0.1, 'strain1' : 0.01}
+CHILD_VALUES : dict = {'mode0001' : -0.6, 'mode0002' : 0.3, 'mode0003' : 0.5, 'strain1' : -0.02}
+
+def test_scale_and_decompose(tmp_path):
+    (tmp_path / 'basis.cif').write_text(synthetic_cif({box : str(value) for box, value in BASIS_VALUES.items()}, 2, 3))
+    (tmp_path / 'child.cif').write_text(synthetic_cif({box : str(value) for box, value in CHILD_VALUES.items()}, 2, 3))
+    basis = read_mode_basis(str(tmp_path / 'basis.cif'))
+    template_results, template_labels = amplitudes(BASIS_VALUES)
+    child_results, child_labels = amplitudes(CHILD_VALUES)
+    with ScanOutput(str(tmp_path), ['GM1+(a)'], child_results) as output:
+        count = generate_scaled_structures_local(child_basis(basis, child_results, child_labels), child_labels, scan_points({'GM1+(a)' : (0.0, 1.0, 3)}), output)
+    assert count == 3
+    # scaling factor 1 gives back the child structure, cell included, not the structure the basis was created for
+    assert compare_structures(str(tmp_path / 'structure_s2.cif'), str(tmp_path / 'child.cif')) < 1e-4
+    scaled = [str(tmp_path / f'structure_s{k}.cif') for k in range(3)]
+    results, labels, residuals = decompose_locally(basis, template_results, template_labels, scaled)
+    assert max(residuals.values()) < 1e-4
+    for factor, structure in zip([0.0, 0.5, 1.0], scaled):
+        gm1, gm2 = results[structure]['GM1+(a)']['components'], results[structure]['GM2+(a)']['components']
+        assert list(gm1) == list(child_results['GM1+(a)']['components']) # page order
+        assert gm1['[X1:a:dsp]A1(a)'] == pytest.approx(factor * CHILD_VALUES['mode0001'], abs=1e-4)
+        assert gm1['[X2:a:dsp]A2(a)'] == pytest.approx(factor * CHILD_VALUES['mode0002'], abs=1e-4)
+        assert gm1['strain1(a)'] == pytest.approx(CHILD_VALUES['strain1'], abs=1e-4) # strains are not scaled by default
+        assert gm2['[X3:a:dsp]A3(a)'] == pytest.approx(CHILD_VALUES['mode0003'], abs=1e-4)
+        assert labels[structure] == child_labels
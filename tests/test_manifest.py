@@ -0,0 +1,72 @@
+import pytest # type: ignore
+from automate_isodistort.manifest import plan_jobs
+
+
+"""
+Planning the jobs of a manifest: paths, duplicates and conflicts, without touching the network.
+"""
+
+DEFAULTS : str = '''defaults:
+  webdriver_path: none
+  main_page: http://127.0.0.1/iso/isodistort.php
+  parent_file: parent.cif
+  basis_transform: 1 0 0 0 1 0 0 0 1
+jobs:
+'''
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    '''writes the structures and a manifest with the given jobs into a subdirectory, runs from elsewhere, returns the manifest path'''
+    directory = tmp_path / 'series'
+    directory.mkdir()
+    for name in ['parent.cif', 'a.cif', 'b.cif']:
+        (directory / name).write_text(f'data_{name}\n_cell_length_a 4\n')
+    (tmp_path / 'elsewhere').mkdir()
+    monkeypatch.chdir(tmp_path / 'elsewhere')
+    def write_manifest(jobs : str) -> str:
+        path = directory / 'manifest.yaml'
+        path.write_text(DEFAULTS + jobs)
+        return str(path)
+    return write_manifest
+
+def test_relative_paths(manifest, tmp_path):
+    planned = plan_jobs(manifest('  - name: one\n    distorted_file: a.cif b.cif\n  - name: two\n    distorted_file: a.cif\n    output_dir: /tmp/two\n'))
+    directory = tmp_path / 'series'
+    walker_text, tags_other = planned[0]['config'][2], planned[0]['config'][4]
+    assert walker_text['PARENT_FILE'] == str(directory / 'parent.cif')
+    assert walker_text['DISTORTED_FILE'] == [str(directory / 'a.cif'), str(directory / 'b.cif')]
+    assert tags_other['OUTPUT_DIR'] == str(directory / 'one') # next to the manifest, not in the working directory
+    assert planned[1]['config'][4]['OUTPUT_DIR'] == '/tmp/two' # absolute paths are kept
+
+def test_duplicates(manifest):
+    planned = plan_jobs(manifest('  - name: one\n    distorted_file: a.cif\n  - name: two\n    distorted_file: a.cif\n  - name: three\n    distorted_file: b.cif\n'))
+    assert [entry['name'] for entry in planned] == ['one', 'three']
+    assert planned[0]['duplicates'] == ['two']
+
+def test_sweep(manifest):
+    planned = plan_jobs(manifest('  - name: one\n    distorted_file: a.cif\n    sweep:\n      origin_shift: [0 0 0, 0.5 0 0]\n'))
+    assert [entry['name'] for entry in planned] == ['one_1', 'one_2']
+
+def test_conflicts(manifest):
+    with pytest.raises(ValueError) as err:
+        plan_jobs(manifest('''  - name: one
+    distorted_file: a.cif
+    output_dir: out
+  - name: two
+    distorted_file: b.cif
+    output_dir: out
+  - name: one
+    distorted_file: a.cif b.cif
+    journal_file: journal.jsonl
+  - name: four
+    distorted_file: b.cif
+    journal_file: journal.jsonl
+  - name: five
+    distorted_file: c.cif
+'''))
+    message = str(err.value)
+    assert 'has 4 problems' in message
+    assert 'more than one job writes to OUTPUT_DIR' in message
+    assert 'more than one job is named one' in message
+    assert 'four: shares structures and the JOURNAL_FILE' in message
+    assert 'five:' in message # missing structure
@@ -0,0 +1,79 @@
+import csv
+import json
+import threading
+import pytest # type: ignore
+from automate_isodistort.mock_server import serve_synthetic
+from automate_isodistort.workflow import run
+from automate_isodistort.files import read_from_file
+from automate_isodistort.mode_scaling import compare_structures
+from automate_isodistort.job_journal import journal_record
+
+
+"""
+Smoke tests of the HTTP backend against the synthetic ISODISTORT pages of mock_server.py,
+no browser and no connection to the real ISODISTORT needed.
+"""
+
+pytestmark = pytest.mark.filterwarnings('ignore:invalid input value') # optional tags left at their defaults
+
+INFOFILE : str = '''MAIN_PAGE : {main_page}
+WEBDRIVER_PATH : none
+PARENT_FILE : parent.cif
+DISTORTED_FILE : child.cif
+BASIS_TRANSFORM : 1 0 0 0 1 0 0 0 1
+BACKEND : http
+PREFLIGHT : F
+OUTPUT_DIR : .
+'''
+
+@pytest.fixture
+def main_page():
+    server = serve_synthetic(0) # any free port
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/iso/isodistort.php'
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def job(tmp_path, monkeypatch, main_page):
+    '''writes the structures and an infofile with the given extra tags, returns its path'''
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'parent.cif').write_text('data_parent\n_cell_length_a 10\n')
+    (tmp_path / 'child.cif').write_text('data_child\n_cell_length_a 10\n')
+    def write_infofile(extra : str) -> str:
+        path = tmp_path / 'job.info'
+        path.write_text(INFOFILE.format(main_page=main_page) + extra)
+        return str(path)
+    return write_infofile
+
+def test_decompose_http(job, tmp_path):
+    run(job('READ_MODE : F\nWRITE_FILE : T\n'))
+    results = read_from_file(str(tmp_path / 'modeamplitudes.yaml'))
+    labels = read_from_file(str(tmp_path / 'mode_labels.yaml'))
+    assert list(results) == list(labels) == ['GM1+(a)', 'GM2+(a)', 'GM3+(a)']
+    for irrep, entry in results.items():
+        assert entry['components'] and set(entry['components']) == set(labels[irrep])
+
+def test_scale_http_local(job, tmp_path):
+    run(job('READ_MODE : F\nSCALEMODES_ENGINE : local\nSCALEMODES_LABELS : GM1+(a)\nSCALEMODES_STEPS : 3\n'), scale=True)
+    with open(tmp_path / 'scan_index.csv', newline='') as ff:
+        rows = list(csv.DictReader(ff))
+    assert [row['file'] for row in rows] == [f'structure_s{k}.cif' for k in range(3)]
+    assert [float(row['GM1+(a)']) for row in rows] == [0.0, 0.5, 1.0]
+    # scaling factor 1 gives back the child structure the mode definitions were fetched for
+    assert compare_structures(str(tmp_path / 'structure_s2.cif'), str(tmp_path / 'mode_basis.cif')) < 1e-4
+
+def test_resume_from_journal(job, tmp_path):
+    infofile = job('READ_MODE : F\nWRITE_FILE : T\nJOURNAL_FILE : journal.jsonl\n')
+    run(infofile)
+    (tmp_path / 'modeamplitudes.yaml').unlink()
+    # a finished structure is taken from the journal, not decomposed again
+    with open(tmp_path / 'journal.jsonl') as ff:
+        record = json.loads(ff.readlines()[-1])
+    assert record['state'] == 'done'
+    record['results']['GM1+(a)']['components'] = {comp : 0.125 for comp in record['results']['GM1+(a)']['components']}
+    journal_record(str(tmp_path / 'journal.jsonl'), record['job'], 'done', results=record['results'], labels=record['labels'])
+    run(infofile, resume=True)
+    results = read_from_file(str(tmp_path / 'modeamplitudes.yaml'))
+    assert set(results['GM1+(a)']['components'].values()) == {0.125}
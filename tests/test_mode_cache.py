@@ -0,0 +1,53 @@
+import os
+import time
+import numpy as np # type: ignore
+from automate_isodistort.mode_cache import cache_key, basis_key, store_cached, load_cached, cache_entries, prune_cache, track_size
+
+
+"""
+Keys and pruning of the decomposition cache.
+"""
+
+P = np.eye(3, dtype=int)
+
+def test_cache_key(tmp_path):
+    (tmp_path / 'parent.cif').write_text('data_parent\n_cell_length_a 4\n')
+    (tmp_path / 'child.cif').write_text('data_child\n_cell_length_a 8\n')
+    parent, child = str(tmp_path / 'parent.cif'), str(tmp_path / 'child.cif')
+    key = cache_key(parent, child, P, None, 'https://a/iso/isodistort.php')
+    assert key == cache_key(parent, child, P, None, 'https://a/iso/isodistort.php ')
+    assert key != cache_key(parent, child, P, None, 'https://b/iso/isodistort.php') # another server
+    assert key != cache_key(parent, child, 2 * P, None, 'https://a/iso/isodistort.php')
+    assert key != cache_key(parent, child, P, np.zeros(3), 'https://a/iso/isodistort.php') # automatic and explicit origin
+    assert cache_key(parent, child, P, None) != cache_key(parent, child, P, None, 'https://a/iso/isodistort.php')
+    assert basis_key(parent, P, None) != cache_key(parent, child, P, None)
+    (tmp_path / 'child.cif').write_text('data_child\n_cell_length_a 8.1\n')
+    assert key != cache_key(parent, child, P, None, 'https://a/iso/isodistort.php')
+
+def test_prune_cache(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    for k in range(4):
+        store_cached(f'key{k}', {'GM1+' : {'info' : {}, 'components' : {'A' : 0.1 * k}}}, {'GM1+' : {'A' : 'mode0001'}}, cache_dir)
+        os.utime(tmp_path / 'cache' / f'key{k}.yaml', (1000 + k, 1000 + k)) # key0 least recently used
+    load_cached('key0', cache_dir) # used again, now the most recent
+    (tmp_path / 'cache' / 'old.tmp').write_text('crashed write')
+    os.utime(tmp_path / 'cache' / 'old.tmp', (1000, 1000))
+    (tmp_path / 'cache' / 'new.tmp').write_text('write in progress')
+    size = cache_entries(cache_dir)[0]['size']
+    assert prune_cache(cache_dir, max_size=2.5 * size / 1e6) == 3 # two entries and the stale temporary file
+    assert sorted(e['key'] for e in cache_entries(cache_dir)) == ['key0', 'key3']
+    assert sorted(p.name for p in (tmp_path / 'cache').glob('*.tmp')) == ['new.tmp']
+
+def test_track_size(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    for k in range(3):
+        path = tmp_path / 'cache' / f'key{k}.cif'
+        path.write_text('x' * 1000)
+        os.utime(path, (time.time() - 10 + k,) * 2)
+        track_size(cache_dir, path, max_size=5e-3) # nothing to prune
+    assert len(cache_entries(cache_dir)) == 3
+    path = tmp_path / 'cache' / 'key3.cif'
+    path.write_text('x' * 1000)
+    track_size(cache_dir, path, max_size=2.5e-3) # over the limit only now
+    assert sorted(e['key'] for e in cache_entries(cache_dir)) == ['key2', 'key3']
@@ -0,0 +1,47 @@
+import pytest # type: ignore
+from automate_isodistort.mode_scaling import parse_scan_ranges, count_scan_points, scan_points
+
+
+"""
+Scan points of the linear, cartesian and list grids.
+"""
+
+RANGES : str = 'GM1+ 0 1 3, X3- -1 1 3'
+
+def test_parse_scan_ranges():
+    assert parse_scan_ranges(RANGES) == {'GM1+' : (0.0, 1.0, 3), 'X3-' : (-1.0, 1.0, 3)}
+    with pytest.raises(KeyError):
+        parse_scan_ranges('GM1+ 0 1')
+    with pytest.raises(AttributeError):
+        parse_scan_ranges('GM1+ 1 0 3')
+
+def test_linear():
+    ranges = parse_scan_ranges(RANGES)
+    points = list(scan_points(ranges, 'linear'))
+    assert points == [{'GM1+' : 0.0, 'X3-' : -1.0}, {'GM1+' : 0.5, 'X3-' : 0.0}, {'GM1+' : 1.0, 'X3-' : 1.0}]
+    assert count_scan_points(ranges, 'linear') == len(points)
+    with pytest.raises(AttributeError):
+        list(scan_points(parse_scan_ranges('GM1+ 0 1 3, X3- -1 1 5'), 'linear'))
+
+def test_cartesian():
+    ranges = parse_scan_ranges('GM1+ 0 1 2, X3- -1 1 3')
+    points = list(scan_points(ranges, 'cartesian'))
+    assert len(points) == count_scan_points(ranges, 'cartesian') == 6
+    assert points[:3] == [{'GM1+' : 0.0, 'X3-' : -1.0}, {'GM1+' : 0.0, 'X3-' : 0.0}, {'GM1+' : 0.0, 'X3-' : 1.0}]
+    assert points[-1] == {'GM1+' : 1.0, 'X3-' : 1.0}
+
+def test_list(tmp_path):
+    grid_file = tmp_path / 'points.txt'
+    grid_file.write_text('# GM1+ X3-\n0.5 1\n\n0.25, -0.5 # comma separated\n')
+    ranges = parse_scan_ranges(RANGES)
+    assert count_scan_points(ranges, 'list') is None
+    assert list(scan_points(ranges, 'list', str(grid_file))) == [{'GM1+' : 0.5, 'X3-' : 1.0}, {'GM1+' : 0.25, 'X3-' : -0.5}]
+    grid_file.write_text('0.5 1\n0.5\n')
+    with pytest.raises(ValueError):
+        list(scan_points(ranges, 'list', str(grid_file)))
+    with pytest.raises(AttributeError):
+        list(scan_points(ranges, 'list'))
+
+def test_unknown_grid():
+    with pytest.raises(KeyError):
+        list(scan_points(parse_scan_ranges(RANGES), 'spiral'))
@@ -0,0 +1,47 @@
+import numpy as np # type: ignore
+import pytest # type: ignore
+from automate_isodistort.mode_store import append_to_store, append_series_to_store, read_store, read_store_row, read_store_column
+
+
+"""
+Rows of the column-wise mode amplitude store.
+"""
+
+LABELS : dict = {'GM1+(a)' : {'A1' : 'mode0001', 'strain1(a)' : 'strain1'}, 'X3-(a)' : {'A2' : 'mode0002'}}
+
+def amplitudes(a1 : float, strain : float, a2 : float) -> dict:
+    return {
+        'GM1+(a)' : {'info' : {'direction' : 'P1'}, 'components' : {'A1' : a1, 'strain1(a)' : strain}},
+        'X3-(a)' : {'info' : {'direction' : 'P1'}, 'components' : {'A2' : a2}},
+        }
+
+def test_append_and_replace(tmp_path):
+    store = str(tmp_path / 'store')
+    assert append_to_store(store, 'a.cif', amplitudes(0.1, 0.01, 0.2), LABELS) == 0
+    assert append_to_store(store, 'b.cif', amplitudes(0.3, 0.02, 0.4), LABELS) == 1
+    assert append_to_store(store, 'a.cif', amplitudes(0.5, 0.03, 0.6), LABELS) == 0 # e.g. decomposed again after a resume
+    names, columns, matrix = read_store(store)
+    assert names == ['a.cif', 'b.cif']
+    assert columns == [['GM1+(a)', 'A1'], ['GM1+(a)', 'strain1(a)'], ['X3-(a)', 'A2']]
+    np.testing.assert_array_equal(matrix, [[0.5, 0.03, 0.6], [0.3, 0.02, 0.4]])
+    results, labels = read_store_row(store, 0)
+    assert results == amplitudes(0.5, 0.03, 0.6) and labels == LABELS
+
+def test_append_series(tmp_path):
+    store = str(tmp_path / 'store')
+    append_to_store(store, 'a.cif', amplitudes(0.1, 0.01, 0.2), LABELS)
+    series = {'b.cif' : amplitudes(0.3, 0.02, 0.4), 'a.cif' : amplitudes(0.5, 0.03, 0.6), 'c.cif' : amplitudes(0.7, 0.04, 0.8)}
+    assert append_series_to_store(store, series, {name : LABELS for name in series}) == [1, 0, 2]
+    np.testing.assert_array_equal(read_store_column(store, 'X3-(a)', 'A2'), [0.6, 0.4, 0.8])
+
+def test_mode_mismatch(tmp_path):
+    store = str(tmp_path / 'store')
+    append_to_store(store, 'a.cif', amplitudes(0.1, 0.01, 0.2), LABELS)
+    other = amplitudes(0.3, 0.02, 0.4)
+    other['X3-(a)']['components'] = {'A3' : 0.4}
+    series = {'b.cif' : amplitudes(0.3, 0.02, 0.4), 'c.cif' : other}
+    with pytest.raises(ValueError, match='c.cif'):
+        append_series_to_store(store, series, {name : LABELS for name in series})
+    names, _, matrix = read_store(store) # nothing written, not even the matching structure
+    assert names == ['a.cif']
+    np.testing.assert_array_equal(matrix, [[0.1, 0.01, 0.2]])
@@ -0,0 +1,61 @@
+import numpy as np # type: ignore
+import pytest # type: ignore
+from automate_isodistort.cif_tools import read_cif
+from automate_isodistort.preflight import check_basis, check_cells, check_atoms, check_origin_shift, count_atoms
+
+
+"""
+Problems the preflight checks find before anything is sent to ISODISTORT.
+"""
+
+def cell_cif(a : float, b : float, c : float, gamma : float = 90.0, sites : str = '') -> dict:
+    return read_cif(f'''data_test
+_cell_length_a {a}
+_cell_length_b {b}
+_cell_length_c {c}
+_cell_angle_alpha 90
+_cell_angle_beta 90
+_cell_angle_gamma {gamma}
+loop_
+_space_group_symop_operation_xyz
+x,y,z
+-x,-y,-z
+loop_
+_atom_site_label
+_atom_site_type_symbol
+_atom_site_fract_x
+_atom_site_fract_y
+_atom_site_fract_z
+{sites or 'Sr1 Sr 0 0 0'}
+''')
+
+def test_check_basis():
+    errors, index = check_basis(np.array([[1, 1, 0], [-1, 1, 0], [0, 0, 2]]))
+    assert errors == [] and index == 4
+    errors, index = check_basis(np.array([[1, 1, 0], [1, 1, 0], [0, 0, 1]]))
+    assert index == 0 and 'singular' in errors[0]
+    errors, index = check_basis(np.array([[0, 1, 0], [1, 0, 0], [0, 0, 1]]))
+    assert index == 1 and 'left-handed' in errors[0]
+    with pytest.warns(UserWarning, match='unusually large'):
+        assert check_basis(4 * np.eye(3)) == ([], 64)
+
+def test_check_cells():
+    parent = cell_cif(4, 4, 4)
+    child = cell_cif(4 * np.sqrt(2), 4 * np.sqrt(2), 8)
+    P = np.array([[1, 1, 0], [-1, 1, 0], [0, 0, 2]])
+    assert check_cells(parent, child, P) == []
+    assert check_cells(parent, cell_cif(4 * np.sqrt(2), 4 * np.sqrt(2), 8, gamma=120), P) != [] # same lengths, other angle
+    errors = check_cells(parent, child, 2 * np.eye(3))
+    assert len(errors) == 1 and 'does not match' in errors[0]
+
+def test_check_atoms():
+    parent = cell_cif(4, 4, 4, sites='Sr1 Sr 0 0 0\nO1 O 0.2 0.2 0.2') # O on a general position, two atoms
+    assert count_atoms(parent) == {'Sr' : 1, 'O' : 2}
+    assert check_atoms(count_atoms(parent), {'Sr' : 2, 'O' : 4}, 2) == []
+    assert 'expected 6' in check_atoms(count_atoms(parent), {'Sr' : 2, 'O' : 3}, 2)[0]
+    assert 'expected' in check_atoms(count_atoms(parent), {'Sr' : 3, 'O' : 3}, 2)[0]
+
+def test_check_origin_shift():
+    assert check_origin_shift(None) == []
+    assert check_origin_shift(np.array([0.5, 0, 0])) == []
+    assert check_origin_shift(np.array([0.5, np.nan, 0])) != []
@@ -0,0 +1,28 @@
+import os
+import numpy as np # type: ignore
+from automate_isodistort.results_archive import archive_text, archive_entries, entry_names, read_archived, reparse_archive
+
+
+"""
+Archived results pages of one child structure decomposed with two origin shifts.
+"""
+
+def test_two_settings(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    for name in ['parent.cif', 'a.cif', 'b.cif']:
+        (tmp_path / name).write_text(f'data_{name}\n_cell_length_a 4\n')
+    parent, a, b = (str(tmp_path / name) for name in ['parent.cif', 'a.cif', 'b.cif'])
+    P = np.eye(3, dtype=int)
+    first = archive_text(archive_dir, parent, a, P, None, '<html>a, automatic origin</html>')
+    second = archive_text(archive_dir, parent, a, P, np.array([0.5, 0, 0]), '<html>a, origin 1/2 0 0</html>')
+    archive_text(archive_dir, parent, b, P, None, '<html>b, first try</html>')
+    third = archive_text(archive_dir, parent, b, P, None, '<html>b</html>') # same settings again, replaces the first try
+    entries = archive_entries(archive_dir)
+    assert [e['key'] for e in entries] == [first, second, third]
+    assert read_archived(archive_dir, third) == '<html>b</html>'
+    names = entry_names(entries)
+    assert names[third] == os.path.abspath(b)
+    assert names[first] != names[second] and names[first].startswith(os.path.abspath(a))
+    reparsed = reparse_archive(archive_dir, parser=len)
+    assert reparsed == {key : len(read_archived(archive_dir, key)) for key in [first, second, third]}
+    assert reparse_archive(archive_dir, parser=len, workers=2) == reparsed
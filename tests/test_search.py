@@ -0,0 +1,63 @@
+import numpy as np # type: ignore
+from automate_isodistort.basis_search import find_basis, metric_tensor
+from automate_isodistort.origin_search import find_origin
+from automate_isodistort.cif_tools import read_cif, cell_parameters
+
+
+"""
+Basis and origin search on a cubic perovskite and its sqrt(2) x sqrt(2) x 1 supercell.
+"""
+
+PARENT_SITES : list = [('Sr', (0, 0, 0)), ('Ti', (0.5, 0.5, 0.5)), ('O', (0.5, 0.5, 0)), ('O', (0.5, 0, 0.5)), ('O', (0, 0.5, 0.5))]
+P = np.array([[1, 1, 0], [-1, 1, 0], [0, 0, 1]])
+
+def structure_cif(cell : tuple, sites : list) -> str:
+    lines = ['data_test']
+    lines += [f'_cell_length_{axis} {value:.6f}' for axis, value in zip('abc', cell[:3])]
+    lines += [f'_cell_angle_{axis} {value:.6f}' for axis, value in zip(['alpha', 'beta', 'gamma'], cell[3:])]
+    lines += ['loop_', '_space_group_symop_operation_xyz', 'x,y,z']
+    lines += ['loop_', '_atom_site_label', '_atom_site_type_symbol', '_atom_site_fract_x', '_atom_site_fract_y', '_atom_site_fract_z']
+    lines += [f'{element}{k+1} {element} {x:.6f} {y:.6f} {z:.6f}' for k, (element, (x, y, z)) in enumerate(sites)]
+    return '\n'.join(lines) + '\n'
+
+def child_sites(origin : np.ndarray, polar : float = 0.0, antiphase : bool = True) -> list:
+    '''the parent atoms in the child basis, x -> (x - origin) P^-1, Ti displaced along z (in antiphase in the two parent cells)'''
+    inverse = np.linalg.inv(P)
+    sites : list = []
+    for sign, translation in [(1, np.array([0, 0, 0])), (-1 if antiphase else 1, np.array([1, 0, 0]))]: # the two parent cells of the child cell
+        for element, xyz in PARENT_SITES:
+            position = ((np.array(xyz) + translation - origin) @ inverse) % 1.0
+            if element == 'Ti':
+                position[2] += sign * polar
+            sites.append((element, tuple(position)))
+    return sites
+
+def write_structures(tmp_path, origin : np.ndarray, polar : float = 0.0, antiphase : bool = True) -> tuple[str, str]:
+    parent, child = tmp_path / 'parent.cif', tmp_path / 'child.cif'
+    parent.write_text(structure_cif((4, 4, 4, 90, 90, 90), PARENT_SITES))
+    child.write_text(structure_cif((4 * np.sqrt(2), 4 * np.sqrt(2), 4, 90, 90, 90), child_sites(origin, polar, antiphase)))
+    return str(parent), str(child)
+
+def test_find_basis(tmp_path):
+    parent, child = write_structures(tmp_path, np.zeros(3))
+    candidates = find_basis(parent, child)
+    matrix, score = candidates[0]
+    assert score < 1e-6
+    assert round(np.linalg.det(matrix)) == 2
+    parent_metric = metric_tensor(cell_parameters(read_cif(parent)))
+    np.testing.assert_allclose(matrix @ parent_metric @ matrix.T, metric_tensor(cell_parameters(read_cif(child))), atol=1e-4)
+    assert any(np.array_equal(m, P) for m, s in candidates if s < 1e-6)
+
+def test_find_origin(tmp_path):
+    parent, child = write_structures(tmp_path, np.array([0.5, 0.5, 0.5]), polar=0.01)
+    origin, per_child = find_origin(parent, [child], P)
+    np.testing.assert_allclose(origin, [0.5, 0.5, 0.5])
+    own, own_score, common_score = per_child[child]
+    np.testing.assert_allclose(own, origin)
+    assert np.isclose(common_score, 2 * (0.01 * 4)**2 / 10) # two of ten atoms displaced by 0.04 A
+
+def test_refine_polar_origin(tmp_path):
+    parent, child = write_structures(tmp_path, np.array([0.5, 0.5, 0.5]), polar=0.01, antiphase=False)
+    origin, _ = find_origin(parent, [child], P)
+    # both Ti move up, which is the same as a lower origin with all atoms moving down a little
+    np.testing.assert_allclose(origin, [0.5, 0.5, 0.5 - 2 * 0.01 / 10], atol=1e-5)